@@ -0,0 +1,46 @@
+"""Micro-benchmarks for matrix-monzo's hot paths.
+
+Each module in this package can be run from the root of the repository, e.g.:
+
+    python -m benchmarks.matcher
+"""
+import time
+import timeit
+from typing import Awaitable, Callable
+
+
+def measure(func: Callable, min_time: float = 0.2) -> float:
+    """Return the average duration of a call to the given function, in microseconds.
+
+    The number of calls is picked so that the measurement lasts at least min_time
+    seconds, and the best of 3 measurements is kept.
+    """
+    timer = timeit.Timer(func)
+    number, _ = timer.autorange()
+    number = max(number, int(number * min_time / 0.2))
+
+    return min(timer.repeat(repeat=3, number=number)) / number * 1e6
+
+
+async def measure_async(func: Callable[[], Awaitable], number: int = 1000) -> float:
+    """Return the average duration of an awaited call to the given coroutine function,
+    in microseconds.
+    """
+    # Warm up, e.g. so that connections are opened before measuring.
+    for _ in range(min(number, 10)):
+        await func()
+
+    start = time.perf_counter()
+    for _ in range(number):
+        await func()
+
+    return (time.perf_counter() - start) / number * 1e6
+
+
+def print_table(headers, rows):
+    widths = [
+        max(len(str(row[i])) for row in [headers] + rows) for i in range(len(headers))
+    ]
+
+    for row in [headers, ["-" * w for w in widths]] + rows:
+        print("  ".join(str(cell).rjust(width) for cell, width in zip(row, widths)))
@@ -0,0 +1,105 @@
+"""Measure the memory held by Monzo clients, cached tokens and cached snapshots, and
+the time it takes to get a user's client, as the number of users served by the bot
+grows.
+
+Tokens are stored in a temporary SQLite database. Users are accessed in a loop, so
+most of them have to be loaded from the database again once the pool is full. Each
+user also caches a snapshot and invalidates another one, as a command moving money
+would.
+
+Memory mostly grows until the store's token cache is full (CACHE_SIZE users), then
+levels off.
+
+    python -m benchmarks.clients
+"""
+import asyncio
+import os
+import tempfile
+import time
+import tracemalloc
+
+from benchmarks import print_table
+from matrix_monzo.monzo_api import MonzoClientPool, MonzoSession
+from matrix_monzo.storage import Storage
+from matrix_monzo.utils.cache import SnapshotCache
+
+USER_COUNTS = [10, 100, 1000, 10000, 20000]
+MAX_CLIENTS = 100
+CACHE_SIZE = 1000
+
+
+async def open_storage(tmp_dir: str, users: int) -> Storage:
+    storage = Storage({
+        "engine": "sqlite",
+        "path": os.path.join(tmp_dir, f"{users}.db"),
+        "cache_size": CACHE_SIZE,
+    })
+    await storage.setup()
+    return storage
+
+
+async def bench_users(tmp_dir: str, users: int) -> list:
+    storage = await open_storage(tmp_dir, users)
+    user_ids = [f"@user{i}:example.com" for i in range(users)]
+    for user_id in user_ids:
+        await storage.token_store.store_token(user_id, {"access_token": "a" * 200})
+    storage.close()
+
+    # Start from an empty token cache, as after a restart, so the tokens cached while
+    # getting the clients are measured.
+    storage = await open_storage(tmp_dir, users)
+
+    tracemalloc.start()
+    before = tracemalloc.get_traced_memory()[0]
+
+    snapshots = SnapshotCache(ttl=60)
+    pool = MonzoClientPool(
+        session=MonzoSession(),
+        client_id="client_id",
+        client_secret="client_secret",
+        load_token=storage.token_store.get_token,
+        save_token=storage.token_store.store_token,
+        max_clients=MAX_CLIENTS,
+        on_evict=snapshots.invalidate_user,
+    )
+
+    duration = 0.0
+    for user_id in user_ids:
+        start = time.perf_counter()
+        await pool.get(user_id)
+        duration += time.perf_counter() - start
+
+        snapshots.set(user_id, ("accounts",), {}, snapshots.generation(user_id))
+        snapshots.invalidate(user_id, ("pots",))
+
+    memory = tracemalloc.get_traced_memory()[0] - before
+    tracemalloc.stop()
+
+    storage.close()
+
+    return [
+        users,
+        len(pool),
+        len(snapshots),
+        "%.1f" % (duration / users * 1e6),
+        "%d" % (memory / 1024),
+    ]
+
+
+async def main():
+    rows = []
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        for users in USER_COUNTS:
+            rows.append(await bench_users(tmp_dir, users))
+
+    print_table(
+        [
+            "users", "clients in memory", "users with snapshots", "get (us)",
+            "memory (KiB)",
+        ],
+        rows,
+    )
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
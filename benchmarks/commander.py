@@ -0,0 +1,91 @@
+"""Measure the cost of routing a message to a command, compared with scanning the list
+of commands, and the time it takes to import and set up the Commander with lazy and
+eager loading of the command modules.
+"""
+import subprocess
+import sys
+
+from benchmarks import measure, print_table
+from matrix_monzo import bot_commands
+from matrix_monzo.commander import Commander
+
+MESSAGES = [
+    "login",
+    "show all accounts",
+    "show my pots",
+    "move 10 GBP from savings to holidays",
+    "verify device ABCDEFGHIJ",
+    "logout",
+    "unknown command",
+]
+
+SETUP_SCRIPT = """
+import importlib, time
+start = time.perf_counter()
+from matrix_monzo import bot_commands
+from matrix_monzo.commander import Commander
+commander = Commander(None)
+if {eager}:
+    for prefix in bot_commands.COMMANDS:
+        command = commander._get_command(prefix)
+        if isinstance(command, bot_commands.MetaCommand):
+            for sub_command in command.SUB_COMMANDS:
+                command.get_sub_command(sub_command)
+print(time.perf_counter() - start)
+"""
+
+
+def linear_dispatch(prefixes, sub_prefixes, body):
+    """The routing strategy used before the router: scan the commands in order, then
+    the meta-command's sub-commands.
+    """
+    for prefix in prefixes:
+        if body.startswith(prefix):
+            if prefix == "show":
+                params = body[len(prefix):].replace(" my", "").strip()
+                for sub_prefix in sub_prefixes:
+                    if params.startswith(sub_prefix):
+                        return prefix, sub_prefix
+            return prefix, None
+
+    return None
+
+
+def setup_time(eager: bool) -> float:
+    # Run in a fresh interpreter, so that modules aren't already imported.
+    output = subprocess.check_output(
+        [sys.executable, "-c", SETUP_SCRIPT.format(eager=eager)],
+    )
+    return float(output) * 1e3
+
+
+def main():
+    commander = Commander(None)
+    # Load the meta-commands so their sub-commands are routed.
+    commander._get_command("show")
+
+    prefixes = list(bot_commands.COMMANDS.keys())
+    sub_prefixes = list(commander.commands["show"].SUB_COMMANDS.keys())
+
+    rows = []
+    for body in MESSAGES:
+        rows.append([
+            body,
+            "%.2f" % measure(lambda: linear_dispatch(prefixes, sub_prefixes, body)),
+            "%.2f" % measure(lambda: commander.router.resolve(body)),
+        ])
+
+    print_table(["message", "linear scan (us)", "router (us)"], rows)
+    print()
+
+    print_table(
+        ["loading", "import and setup (ms)"],
+        [
+            ["lazy", "%.1f" % min(setup_time(False) for _ in range(3))],
+            ["eager", "%.1f" % min(setup_time(True) for _ in range(3))],
+        ],
+    )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,736 @@
+"""Measure the bot's end-to-end throughput and latency, by driving an Instance with
+scripted commands through a fake homeserver, with a fake Monzo API behind it.
+
+Both fakes are aiohttp applications served from the same process and event loop as the
+bot, so no real homeserver or Monzo account is involved. Each simulated user has their
+own room, and sends their commands one at a time, waiting for the bot's reply to a
+command before sending the next one. The latency of a command is the time between the
+homeserver receiving it and the bot sending its reply.
+
+Every user but the first one starts with a stored token. The first one logs in through
+the bot's HTTP server before the commands are sent, the way a browser would after the
+user authorised the bot on Monzo's website.
+
+The event loop's lag is measured by a task sleeping for a fixed interval and recording
+how late it wakes up. Since the fakes share the event loop with the bot, their work
+shows up in it too.
+
+    python -m benchmarks.load
+    python -m benchmarks.load --users 500 --commands 10 --monzo-latency 50
+"""
+import argparse
+import asyncio
+import itertools
+import os
+import secrets
+import socket
+import tempfile
+import time
+from typing import Dict, List, Tuple
+from urllib.parse import parse_qs, urlparse
+
+import aiohttp
+import yaml
+from aiohttp import web
+from nio import InviteMemberEvent, MatrixRoom, RoomMemberEvent, RoomMessageText
+
+from benchmarks import print_table
+from matrix_monzo import metrics
+from matrix_monzo.callbacks import Callbacks
+from matrix_monzo.config import Config
+from matrix_monzo.http import start_http
+from matrix_monzo.messages import messages
+from matrix_monzo.utils.instance import Instance
+
+BOT_USER_ID = "@bot:example.com"
+USER_COUNTS = [10, 50, 200]
+COMMANDS_PER_USER = 20
+
+# Number of seconds to wait for the reply to a command before giving up on it.
+REPLY_TIMEOUT = 30
+
+# Number of seconds between two measurements of the event loop's lag.
+LAG_INTERVAL = 0.01
+
+# Each user has two accounts, one owned by each of these people, and these pots in the
+# first one.
+OWNERS = ["alice", "bob"]
+POT_NAMES = ["holidays", "savings", "rent", "bills", "groceries", "presents"]
+
+# Balance of every account and pot at the start of a run, in pennies.
+INITIAL_BALANCE = 10 ** 9
+
+# The commands each user sends, in a loop, with the first account selected.
+COMMANDS = [
+    "show my pots",
+    "move 10 GBP from holidays to savings",
+    "show accounts",
+    "move £5 from alice to rent",
+    "show pot bills",
+    "say hello",
+]
+
+
+def percentile(values: List[float], share: float) -> float:
+    if not values:
+        return 0.0
+
+    values = sorted(values)
+    return values[min(int(len(values) * share), len(values) - 1)]
+
+
+class FakeMonzo:
+    """Serves the parts of the Monzo API the bot uses: OAuth2 tokens, accounts,
+    balances, pots and moving money in and out of pots, for any number of users.
+
+    Args:
+        latency: Number of seconds to wait before answering each request, to mimic the
+            round trip to the real API.
+    """
+    def __init__(self, latency: float = 0.0):
+        self.latency = latency
+
+        self.accounts = {}  # type: Dict[str, dict]
+        self.balances = {}  # type: Dict[str, int]
+        self.pots = {}  # type: Dict[str, dict]
+        # The user each object, authorization code, access token and refresh token
+        # belongs to.
+        self.owners = {}  # type: Dict[str, str]
+        self.codes = {}  # type: Dict[str, str]
+        self.access_tokens = {}  # type: Dict[str, str]
+        self.refresh_tokens = {}  # type: Dict[str, str]
+
+        self.requests = 0
+        self.tokens_issued = 0
+
+    def add_user(self, user_id: str) -> Tuple[dict, str]:
+        """Create the accounts and pots of a user.
+
+        Returns:
+            An expired token for the user, so the bot exchanges it for a new one before
+            its first request, and the ID of the account the pots are in.
+        """
+        for owner in reversed(OWNERS):
+            account_id = f"acc_{secrets.token_hex(8)}"
+            self.accounts[account_id] = {
+                "id": account_id,
+                "closed": False,
+                "currency": "GBP",
+                "description": f"user_{account_id}",
+                "owners": [{"preferred_name": owner}],
+                "type": "uk_retail",
+            }
+            self.balances[account_id] = INITIAL_BALANCE
+            self.owners[account_id] = user_id
+
+        for name in POT_NAMES:
+            pot_id = f"pot_{secrets.token_hex(8)}"
+            self.pots[pot_id] = {
+                "id": pot_id,
+                "name": name,
+                "balance": INITIAL_BALANCE,
+                "currency": "GBP",
+                "deleted": False,
+                "current_account_id": account_id,
+                "type": "default",
+                "isa_wrapper": "",
+                "round_up": False,
+                "locked": False,
+                "available_for_bills": False,
+                "created": "2020-05-17T13:45:12.345Z",
+                "updated": "2020-05-17T13:45:12.345Z",
+            }
+            self.owners[pot_id] = user_id
+
+        refresh_token = secrets.token_hex(16)
+        self.refresh_tokens[refresh_token] = user_id
+
+        token = {
+            "access_token": secrets.token_hex(16),
+            "refresh_token": refresh_token,
+            "expires_at": time.time() - 1,
+        }
+
+        return token, account_id
+
+    def authorize(self, user_id: str) -> str:
+        """Authorise the bot to access the user's accounts, as the user would on Monzo's
+        website.
+
+        Returns:
+            The authorization code Monzo would redirect the user's browser to the bot
+            with.
+        """
+        code = secrets.token_hex(16)
+        self.codes[code] = user_id
+        return code
+
+    def make_app(self) -> web.Application:
+        app = web.Application(middlewares=[self._middleware])
+        app.router.add_post("/oauth2/token", self.token)
+        app.router.add_post("/oauth2/logout", self.logout)
+        app.router.add_get("/accounts", self.get_accounts)
+        app.router.add_get("/balance", self.get_balance)
+        app.router.add_get("/pots", self.get_pots)
+        app.router.add_put("/pots/{pot_id}/deposit", self.deposit)
+        app.router.add_put("/pots/{pot_id}/withdraw", self.withdraw)
+        app.router.add_get("/transactions", self.get_transactions)
+        app.router.add_get("/webhooks", self.get_webhooks)
+        return app
+
+    @web.middleware
+    async def _middleware(self, request: web.Request, handler) -> web.Response:
+        self.requests += 1
+        if self.latency:
+            await asyncio.sleep(self.latency)
+
+        if request.path != "/oauth2/token":
+            header = request.headers.get("Authorization", "")
+            user_id = self.access_tokens.get(header[len("Bearer "):])
+            if user_id is None:
+                return self._error(401, "unauthorized.bad_access_token")
+
+            request["user_id"] = user_id
+
+        return await handler(request)
+
+    @staticmethod
+    def _error(status: int, code: str) -> web.Response:
+        return web.json_response({"code": code, "message": code}, status=status)
+
+    def _get_owned(self, request: web.Request, objects: Dict[str, dict], object_id: str):
+        if self.owners.get(object_id) != request["user_id"] or object_id not in objects:
+            raise web.HTTPForbidden()
+
+        return objects[object_id]
+
+    async def token(self, request: web.Request) -> web.Response:
+        data = await request.post()
+        grant_type = data.get("grant_type")
+        if grant_type == "authorization_code":
+            user_id = self.codes.pop(data.get("code"), None)
+            if user_id is None:
+                return self._error(401, "unauthorized.bad_authorization_code")
+        elif grant_type == "refresh_token":
+            user_id = self.refresh_tokens.pop(data.get("refresh_token"), None)
+            if user_id is None:
+                return self._error(401, "unauthorized.bad_refresh_token")
+        else:
+            return self._error(400, "bad_request.unsupported_grant_type")
+
+        self.tokens_issued += 1
+        access_token = secrets.token_hex(16)
+        refresh_token = secrets.token_hex(16)
+        self.access_tokens[access_token] = user_id
+        self.refresh_tokens[refresh_token] = user_id
+
+        return web.json_response({
+            "access_token": access_token,
+            "refresh_token": refresh_token,
+            "expires_in": 21600,
+            "token_type": "Bearer",
+            "user_id": user_id,
+        })
+
+    async def logout(self, request: web.Request) -> web.Response:
+        header = request.headers["Authorization"]
+        del self.access_tokens[header[len("Bearer "):]]
+        return web.json_response({})
+
+    async def get_accounts(self, request: web.Request) -> web.Response:
+        return web.json_response({"accounts": [
+            account for account_id, account in self.accounts.items()
+            if self.owners[account_id] == request["user_id"]
+        ]})
+
+    async def get_balance(self, request: web.Request) -> web.Response:
+        account_id = request.query.get("account_id")
+        self._get_owned(request, self.accounts, account_id)
+        return web.json_response({
+            "balance": self.balances[account_id],
+            "total_balance": self.balances[account_id],
+            "currency": "GBP",
+            "spend_today": 0,
+        })
+
+    async def get_pots(self, request: web.Request) -> web.Response:
+        account_id = request.query.get("current_account_id")
+        self._get_owned(request, self.accounts, account_id)
+        return web.json_response({"pots": [
+            pot for pot in self.pots.values() if pot["current_account_id"] == account_id
+        ]})
+
+    async def deposit(self, request: web.Request) -> web.Response:
+        data = await request.post()
+        return self._move(
+            request, data["source_account_id"], request.match_info["pot_id"],
+            int(data["amount"]),
+        )
+
+    async def withdraw(self, request: web.Request) -> web.Response:
+        data = await request.post()
+        return self._move(
+            request, data["destination_account_id"], request.match_info["pot_id"],
+            -int(data["amount"]),
+        )
+
+    def _move(
+        self, request: web.Request, account_id: str, pot_id: str, amount: int,
+    ) -> web.Response:
+        """Move the given amount from an account to a pot, or the other way around if
+        it's negative.
+        """
+        self._get_owned(request, self.accounts, account_id)
+        pot = self._get_owned(request, self.pots, pot_id)
+
+        if self.balances[account_id] < amount or pot["balance"] < -amount:
+            return self._error(400, "bad_request.insufficient_funds")
+
+        self.balances[account_id] -= amount
+        pot["balance"] += amount
+        return web.json_response(pot)
+
+    async def get_transactions(self, request: web.Request) -> web.Response:
+        return web.json_response({"transactions": []})
+
+    async def get_webhooks(self, request: web.Request) -> web.Response:
+        return web.json_response({"webhooks": []})
+
+
+class FakeHomeserver:
+    """Serves the parts of the Matrix client-server API the bot uses, with the bot in
+    one unencrypted room per user.
+
+    Commands are delivered to the bot through its sync requests, which are held until
+    there's a command to deliver or they time out, as on a real homeserver.
+    """
+    def __init__(self):
+        # The user in each room, besides the bot.
+        self.rooms = {}  # type: Dict[str, str]
+
+        # Events waiting to be delivered to the bot, by room.
+        self._timeline = {}  # type: Dict[str, List[dict]]
+        self._new_events = asyncio.Event()
+        self._batch = 0
+        self._event_count = 0
+
+        # The reply the bot is expected to send next in each room.
+        self._replies = {}  # type: Dict[str, asyncio.Future]
+
+        # Set once the bot has caught up with the homeserver and syncs continuously.
+        self.syncing = asyncio.Event()
+
+        self.sent_events = 0
+        self.unexpected_events = 0
+        self.unknown_requests = 0
+
+    def add_user(self, user_id: str) -> str:
+        """Create a room with the bot and the given user in it.
+
+        Returns:
+            The ID of the room.
+        """
+        room_id = f"!room{len(self.rooms)}:example.com"
+        self.rooms[room_id] = user_id
+        return room_id
+
+    def send_command(self, room_id: str, body: str) -> asyncio.Future:
+        """Send a message to the bot in the given room.
+
+        Returns:
+            A future resolved with the content of the bot's reply.
+        """
+        self._event_count += 1
+        self._timeline.setdefault(room_id, []).append({
+            "type": "m.room.message",
+            "sender": self.rooms[room_id],
+            "event_id": f"$event{self._event_count}",
+            "origin_server_ts": int(time.time() * 1000),
+            "content": {"msgtype": "m.text", "body": body},
+        })
+        self._new_events.set()
+
+        return self.expect_reply(room_id)
+
+    def expect_reply(self, room_id: str) -> asyncio.Future:
+        """Wait for the bot to send a message in the given room.
+
+        Returns:
+            A future resolved with the content of the message.
+        """
+        reply = self._replies[room_id] = asyncio.get_running_loop().create_future()
+        return reply
+
+    def make_app(self) -> web.Application:
+        prefix = "/_matrix/client/v3"
+
+        app = web.Application()
+        app.router.add_post(prefix + "/login", self.login)
+        app.router.add_post(prefix + "/user/{user_id}/filter", self.upload_filter)
+        app.router.add_get(prefix + "/sync", self.sync)
+        app.router.add_put(
+            prefix + "/rooms/{room_id}/send/{event_type}/{txn_id}", self.room_send,
+        )
+        app.router.add_put(prefix + "/rooms/{room_id}/typing/{user_id}", self.ok)
+        app.router.add_post(prefix + "/keys/upload", self.keys_upload)
+        app.router.add_post(prefix + "/keys/query", self.keys_query)
+        app.router.add_route("*", "/{path:.*}", self.unknown)
+        return app
+
+    def _member_event(self, room_id: str, user_id: str) -> dict:
+        return {
+            "type": "m.room.member",
+            "state_key": user_id,
+            "sender": user_id,
+            "event_id": f"$member_{user_id}_{room_id}",
+            "origin_server_ts": 0,
+            "content": {"membership": "join"},
+        }
+
+    async def login(self, request: web.Request) -> web.Response:
+        return web.json_response({
+            "user_id": BOT_USER_ID,
+            "access_token": "token",
+            "device_id": "LOAD",
+        })
+
+    async def upload_filter(self, request: web.Request) -> web.Response:
+        return web.json_response({"filter_id": "0"})
+
+    async def sync(self, request: web.Request) -> web.Response:
+        if "since" not in request.query or request.query.get("full_state") == "true":
+            return web.json_response({
+                "next_batch": str(self._batch),
+                "rooms": {"join": {
+                    room_id: {
+                        "state": {"events": [
+                            {
+                                "type": "m.room.create",
+                                "state_key": "",
+                                "sender": BOT_USER_ID,
+                                "event_id": f"$create_{room_id}",
+                                "origin_server_ts": 0,
+                                "content": {"creator": BOT_USER_ID},
+                            },
+                            self._member_event(room_id, BOT_USER_ID),
+                            self._member_event(room_id, user_id),
+                        ]},
+                        "timeline": {"events": [], "limited": False},
+                    }
+                    for room_id, user_id in self.rooms.items()
+                }},
+            })
+
+        self.syncing.set()
+
+        if not self._timeline:
+            self._new_events.clear()
+            timeout = int(request.query.get("timeout", 0)) / 1000
+            try:
+                await asyncio.wait_for(self._new_events.wait(), timeout)
+            except asyncio.TimeoutError:
+                pass
+
+        timeline, self._timeline = self._timeline, {}
+        self._batch += 1
+
+        return web.json_response({
+            "next_batch": str(self._batch),
+            "rooms": {"join": {
+                room_id: {"timeline": {"events": events, "limited": False}}
+                for room_id, events in timeline.items()
+            }},
+        })
+
+    async def room_send(self, request: web.Request) -> web.Response:
+        room_id = request.match_info["room_id"]
+        content = await request.json()
+
+        self.sent_events += 1
+        reply = self._replies.pop(room_id, None)
+        if reply is None or reply.done():
+            self.unexpected_events += 1
+        else:
+            reply.set_result(content)
+
+        return web.json_response({"event_id": f"$reply{self.sent_events}"})
+
+    async def ok(self, request: web.Request) -> web.Response:
+        return web.json_response({})
+
+    async def keys_upload(self, request: web.Request) -> web.Response:
+        return web.json_response({"one_time_key_counts": {"signed_curve25519": 50}})
+
+    async def keys_query(self, request: web.Request) -> web.Response:
+        return web.json_response({"device_keys": {}, "failures": {}})
+
+    async def unknown(self, request: web.Request) -> web.Response:
+        self.unknown_requests += 1
+        return web.json_response(
+            {"errcode": "M_UNRECOGNIZED", "error": "Unrecognized request"}, status=404,
+        )
+
+
+class LoadCallbacks(Callbacks):
+    """The bot's callbacks, minus the check of the device commands are sent from, as
+    the simulated users send unencrypted messages which don't come from any device.
+    """
+    def _check_device(self, room: MatrixRoom, event: RoomMessageText) -> bool:
+        return True
+
+
+async def serve(app: web.Application) -> web.AppRunner:
+    runner = web.AppRunner(app)
+    await runner.setup()
+    site = web.TCPSite(runner, "127.0.0.1", 0)
+    await site.start()
+    return runner
+
+
+def url(runner: web.AppRunner) -> str:
+    port = runner.addresses[0][1]
+    return f"http://127.0.0.1:{port}"
+
+
+def free_port() -> int:
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+def write_config(
+    tmp_dir: str,
+    homeserver_url: str,
+    monzo_url: str,
+    user_ids: List[str],
+    http_port: int,
+) -> str:
+    path = os.path.join(tmp_dir, "config.yaml")
+    with open(path, "w") as f:
+        yaml.dump({
+            "matrix": {
+                "user_id": BOT_USER_ID,
+                "password": "password",
+                "device_id": "LOAD",
+                "homeserver_url": homeserver_url,
+                "owner_ids": user_ids,
+                "store_path": tmp_dir,
+            },
+            # Syncing transactions in the background would compete with the commands.
+            "monzo": {"api_url": monzo_url, "transactions_sync_interval": 0},
+            "database": {"engine": "sqlite", "path": os.path.join(tmp_dir, "load.db")},
+            "http": {
+                "bind_address": "127.0.0.1",
+                "port": http_port,
+                "public_baseurl": f"http://127.0.0.1:{http_port}",
+            },
+            "logging": {"level": "ERROR", "console_logging": {"enabled": False}},
+        }, f)
+
+    return path
+
+
+async def monitor_loop_lag(samples: List[float]):
+    loop = asyncio.get_running_loop()
+    while True:
+        start = loop.time()
+        await asyncio.sleep(LAG_INTERVAL)
+        samples.append(loop.time() - start - LAG_INTERVAL)
+
+
+async def log_in(
+    instance: Instance,
+    monzo: FakeMonzo,
+    homeserver: FakeHomeserver,
+    user_id: str,
+    room_id: str,
+    failures: List[str],
+) -> float:
+    """Log the user in through the bot's HTTP server.
+
+    Returns:
+        The number of seconds between the browser being redirected to the bot and the
+        bot telling the user they're logged in.
+    """
+    login_url = await instance.get_monzo_login_url(user_id, room_id)
+    state = parse_qs(urlparse(login_url).query)["state"][0]
+    code = monzo.authorize(user_id)
+
+    reply = homeserver.expect_reply(room_id)
+    start = time.perf_counter()
+    async with aiohttp.ClientSession() as session:
+        async with session.get(
+            instance.monzo_redirect_uri, params={"code": code, "state": state},
+        ) as res:
+            await res.read()
+
+    try:
+        content = await asyncio.wait_for(reply, REPLY_TIMEOUT)
+    except asyncio.TimeoutError:
+        failures.append("login: no reply")
+        return 0.0
+
+    if content.get("body") != messages.get_content("login_success")["body"]:
+        failures.append("login: unexpected reply")
+
+    return time.perf_counter() - start
+
+
+async def run_user(
+    homeserver: FakeHomeserver,
+    room_id: str,
+    script: List[str],
+    latencies: List[float],
+    failures: List[str],
+):
+    error_body = messages.get_content("unknown_error")["body"]
+
+    for body in script:
+        start = time.perf_counter()
+        try:
+            reply = await asyncio.wait_for(
+                homeserver.send_command(room_id, body), REPLY_TIMEOUT,
+            )
+        except asyncio.TimeoutError:
+            failures.append(f"{body!r}: no reply")
+            continue
+
+        latencies.append(time.perf_counter() - start)
+        if reply.get("body") == error_body:
+            failures.append(f"{body!r}: unknown error")
+
+
+def command_errors() -> float:
+    return sum(child.value for child in metrics.command_errors._children.values())
+
+
+async def bench_users(
+    tmp_dir: str, users: int, commands: int, monzo_latency: float,
+) -> list:
+    monzo = FakeMonzo(latency=monzo_latency)
+    homeserver = FakeHomeserver()
+
+    user_ids = [f"@user{i}:example.com" for i in range(users)]
+    monzo_users = {user_id: monzo.add_user(user_id) for user_id in user_ids}
+    room_ids = [homeserver.add_user(user_id) for user_id in user_ids]
+
+    monzo_runner = await serve(monzo.make_app())
+    homeserver_runner = await serve(homeserver.make_app())
+
+    config = Config(write_config(
+        tmp_dir, url(homeserver_runner), url(monzo_runner), user_ids, free_port(),
+    ))
+
+    # Same as main.py.
+    instance = Instance(config)
+    await instance.setup()
+    http_runner = await start_http(instance)
+
+    # As if each user had selected an account, and all but the first one had logged in.
+    for i, (user_id, (token, account_id)) in enumerate(monzo_users.items()):
+        if i:
+            await instance.storage.token_store.store_token(user_id, token)
+        await instance.storage.selected_account_store.set_selected_account(
+            user_id, account_id,
+        )
+
+    await instance.nio_client.login(config.password, "monzo_bot")
+
+    callbacks = LoadCallbacks(instance)
+    instance.nio_client.add_event_callback(callbacks.message, (RoomMessageText,))
+    instance.nio_client.add_event_callback(callbacks.invite, (InviteMemberEvent,))
+    instance.nio_client.add_event_callback(callbacks.member, (RoomMemberEvent,))
+
+    run_task = asyncio.ensure_future(instance.run())
+    await homeserver.syncing.wait()
+
+    latencies = []  # type: List[float]
+    failures = []  # type: List[str]
+    lags = []  # type: List[float]
+    errors_before = command_errors()
+
+    login_duration = await log_in(
+        instance, monzo, homeserver, user_ids[0], room_ids[0], failures,
+    )
+
+    lag_task = asyncio.ensure_future(monitor_loop_lag(lags))
+    start = time.perf_counter()
+    await asyncio.gather(*[
+        run_user(
+            homeserver,
+            room_id,
+            # Users don't all send the same command at the same time.
+            list(itertools.islice(itertools.cycle(COMMANDS), i, i + commands)),
+            latencies,
+            failures,
+        )
+        for i, room_id in enumerate(room_ids)
+    ])
+    duration = time.perf_counter() - start
+    lag_task.cancel()
+
+    run_task.cancel()
+    await http_runner.cleanup()
+    await instance.close()
+    await monzo_runner.cleanup()
+    await homeserver_runner.cleanup()
+
+    for failure in sorted(set(failures)):
+        print(f"[{users} users] {failures.count(failure)} x {failure}")
+    if homeserver.unknown_requests:
+        print(
+            f"[{users} users] {homeserver.unknown_requests} requests to unknown"
+            f" homeserver endpoints"
+        )
+
+    return [
+        users,
+        len(latencies),
+        "%.1f" % (len(latencies) / duration),
+        "%.1f" % (percentile(latencies, 0.5) * 1e3),
+        "%.1f" % (percentile(latencies, 0.99) * 1e3),
+        "%.1f" % (percentile(lags, 0.5) * 1e3),
+        "%.1f" % (percentile(lags, 0.99) * 1e3),
+        "%.1f" % (max(lags, default=0) * 1e3),
+        "%.1f" % (login_duration * 1e3),
+        int(command_errors() - errors_before) + len(failures),
+        monzo.requests,
+        monzo.tokens_issued,
+        homeserver.sent_events,
+    ]
+
+
+async def main(args: argparse.Namespace):
+    rows = []
+    for users in args.users:
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            rows.append(await bench_users(
+                tmp_dir, users, args.commands, args.monzo_latency / 1000,
+            ))
+
+    print_table(
+        [
+            "users", "commands", "commands/s", "p50 (ms)", "p99 (ms)",
+            "lag p50 (ms)", "lag p99 (ms)", "lag max (ms)", "login (ms)",
+            "errors",
+            "monzo requests", "tokens issued", "events sent",
+        ],
+        rows,
+    )
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument(
+        "--users", type=int, nargs="+", default=USER_COUNTS,
+        help="numbers of simultaneous users to simulate, one run per number",
+    )
+    parser.add_argument(
+        "--commands", type=int, default=COMMANDS_PER_USER,
+        help="number of commands each user sends",
+    )
+    parser.add_argument(
+        "--monzo-latency", type=float, default=0,
+        help="number of milliseconds the fake Monzo API takes to answer",
+    )
+    asyncio.run(main(parser.parse_args()))
@@ -0,0 +1,87 @@
+"""Compare resolving pots and accounts in a command with the precompiled search index
+against scanning the command once per pot and account name.
+"""
+import random
+import string
+
+from benchmarks import measure, print_table
+from matrix_monzo.utils import find_search_term_in_string
+from matrix_monzo.utils.snapshots import AccountsSnapshot, PotsSnapshot, SearchIndex
+
+POT_COUNTS = [10, 100, 1000]
+ACCOUNT_COUNT = 20
+
+
+def random_name(rand: random.Random) -> str:
+    return " ".join(
+        "".join(rand.choices(string.ascii_lowercase, k=rand.randint(4, 9)))
+        for _ in range(rand.randint(1, 2))
+    )
+
+
+def build_snapshots(
+    pot_count: int, rand: random.Random, account_count: int = ACCOUNT_COUNT,
+):
+    pots = PotsSnapshot({"pots": [
+        {"id": f"pot_{i:08d}", "name": random_name(rand), "deleted": False}
+        for i in range(pot_count)
+    ]})
+    accounts = AccountsSnapshot({"accounts": [
+        {
+            "id": f"acc_{i:08d}",
+            "closed": False,
+            "owners": [{"preferred_name": random_name(rand)} for _ in range(2)],
+        }
+        for i in range(account_count)
+    ]})
+
+    return pots, accounts
+
+
+def naive_search(s: str, pots: dict, accounts: dict) -> int:
+    """The matching strategy used before the search index: one scan of the string per
+    pot and per account owner.
+    """
+    hits = 0
+
+    for name, pot_id in pots.items():
+        if find_search_term_in_string(name, s) >= 0 or pot_id in s:
+            hits += 1
+
+    for search_params, account_id in accounts.items():
+        for term in search_params:
+            if find_search_term_in_string(term, s) >= 0 or account_id.casefold() in s:
+                hits += 1
+
+    return hits
+
+
+def main():
+    rand = random.Random(42)
+    rows = []
+
+    for pot_count in POT_COUNTS:
+        pots, accounts = build_snapshots(pot_count, rand)
+        names = list(pots.pots.keys())
+        command = f"10 gbp from {rand.choice(names)} to {rand.choice(names)}"
+
+        naive = measure(lambda: naive_search(command, pots.pots, accounts.accounts))
+        build = measure(lambda: SearchIndex(accounts, pots))
+        index = accounts.search_index(pots)
+        indexed = measure(lambda: index.search(command))
+
+        rows.append([
+            pot_count,
+            "%.1f" % naive,
+            "%.1f" % indexed,
+            "%.1fx" % (naive / indexed),
+            "%.1f" % build,
+        ])
+
+    print_table(
+        ["pots", "naive (us)", "indexed (us)", "speed-up", "index build (us)"], rows,
+    )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,69 @@
+"""Measure the cost of recording metrics and tracing spans, and the time it takes to
+render metrics for a scrape.
+
+    python -m benchmarks.metrics
+"""
+from benchmarks import measure, print_table
+from matrix_monzo import metrics, tracing
+
+COMMANDS = ["show balance", "show pots", "move", "search", "use"]
+ENDPOINTS = ["/accounts", "/balance", "/pots", "/transactions", "/pots/{id}/deposit"]
+
+
+def main():
+    # Don't keep any trace, to only measure recording them.
+    tracing.tracer.configure(sample_rate=0, slow_threshold=float("inf"))
+
+    histogram = metrics.command_duration.labels("show balance")
+    counter = metrics.sync_iterations
+
+    def observe():
+        histogram.observe(0.042)
+
+    def labels_and_observe():
+        metrics.command_duration.labels("show balance").observe(0.042)
+
+    def time_block():
+        with histogram.time():
+            pass
+
+    def inc():
+        counter.inc()
+
+    def untraced_span():
+        with tracing.span("monzo", method="GET", endpoint="/balance"):
+            pass
+
+    def traced_span():
+        # Spans are only recorded within a trace, so start a new one each time to
+        # include the cost of finishing it too.
+        with tracing.tracer.activate(tracing.tracer.start_trace("message")):
+            with tracing.span("monzo", method="GET", endpoint="/balance"):
+                pass
+
+    # Fill every metric with realistic label sets before measuring rendering.
+    for command in COMMANDS:
+        for i in range(100):
+            metrics.command_duration.labels(command).observe(i / 100)
+        metrics.command_errors.labels(command, "ProcessingError").inc()
+    for endpoint in ENDPOINTS:
+        metrics.monzo_request_duration.labels("GET", endpoint).observe(0.2)
+    for store in ["TokensStore", "TransactionsStore", "SelectedAccountsStore"]:
+        metrics.storage_query_duration.labels(store).observe(0.001)
+
+    print_table(
+        ["operation", "duration (us)"],
+        [
+            ["histogram observe", "%.3f" % measure(observe)],
+            ["histogram labels + observe", "%.3f" % measure(labels_and_observe)],
+            ["histogram time() block", "%.3f" % measure(time_block)],
+            ["counter inc", "%.3f" % measure(inc)],
+            ["span outside of a trace", "%.3f" % measure(untraced_span)],
+            ["trace with a single span", "%.3f" % measure(traced_span)],
+            ["render all metrics", "%.1f" % measure(metrics.registry.render)],
+        ],
+    )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,176 @@
+"""Measure how long the initial sync takes when the bot restarts, depending on whether it
+resumes from the sync token stored by the previous run or retrieves the full state of
+every room, against a fake homeserver serving a bot in a growing number of rooms.
+
+    python -m benchmarks.restart
+"""
+import asyncio
+import os
+import tempfile
+import time
+
+import yaml
+from aiohttp import web
+
+from benchmarks import print_table
+from matrix_monzo.config import Config
+from matrix_monzo.utils.instance import Instance
+
+BOT_USER_ID = "@bot:example.com"
+ROOM_COUNTS = [10, 100, 1000]
+MEMBERS_PER_ROOM = 20
+REPETITIONS = 5
+
+VALID_TOKEN = "s_valid"
+EXPIRED_TOKEN = "s_expired"
+
+
+def make_room_state(room_id: str) -> list:
+    state = [
+        {
+            "type": "m.room.create",
+            "state_key": "",
+            "sender": BOT_USER_ID,
+            "event_id": f"$create_{room_id}",
+            "origin_server_ts": 0,
+            "content": {"creator": BOT_USER_ID},
+        },
+        {
+            "type": "m.room.power_levels",
+            "state_key": "",
+            "sender": BOT_USER_ID,
+            "event_id": f"$pl_{room_id}",
+            "origin_server_ts": 0,
+            "content": {"users": {BOT_USER_ID: 100}},
+        },
+    ]
+
+    members = [BOT_USER_ID] + [
+        f"@user{i}:example.com" for i in range(MEMBERS_PER_ROOM - 1)
+    ]
+    for member in members:
+        state.append({
+            "type": "m.room.member",
+            "state_key": member,
+            "sender": member,
+            "event_id": f"$member_{member}_{room_id}",
+            "origin_server_ts": 0,
+            "content": {"membership": "join", "displayname": member[1:]},
+        })
+
+    return state
+
+
+def make_homeserver(rooms: int) -> web.Application:
+    full_state = {
+        "next_batch": VALID_TOKEN,
+        "rooms": {
+            "join": {
+                f"!room{i}:example.com": {
+                    "state": {"events": make_room_state(f"!room{i}:example.com")},
+                    "timeline": {"events": [], "limited": False},
+                }
+                for i in range(rooms)
+            },
+        },
+    }
+    # Nothing happened while the bot was offline.
+    resumed = {"next_batch": VALID_TOKEN, "rooms": {}}
+
+    async def sync(request: web.Request) -> web.Response:
+        since = request.query.get("since")
+        if since == EXPIRED_TOKEN:
+            return web.json_response(
+                {"errcode": "M_UNKNOWN", "error": "Invalid stream token"}, status=400,
+            )
+
+        if since is None or request.query.get("full_state") == "true":
+            return web.json_response(full_state)
+
+        return web.json_response(resumed)
+
+    app = web.Application()
+    app.router.add_get("/_matrix/client/v3/sync", sync)
+    return app
+
+
+def write_config(tmp_dir: str, homeserver_url: str, resume_sync: bool) -> str:
+    path = os.path.join(tmp_dir, f"config_{resume_sync}.yaml")
+    with open(path, "w") as f:
+        yaml.dump({
+            "matrix": {
+                "user_id": BOT_USER_ID,
+                "password": "password",
+                "device_id": "BENCH",
+                "homeserver_url": homeserver_url,
+                "owner_ids": ["@owner:example.com"],
+                "store_path": tmp_dir,
+                "resume_sync": resume_sync,
+            },
+            "database": {"engine": "sqlite", "path": os.path.join(tmp_dir, "bench.db")},
+            "http": {
+                "bind_address": "127.0.0.1",
+                "port": 8080,
+                "public_baseurl": "http://127.0.0.1:8080",
+            },
+            "logging": {"level": "ERROR", "console_logging": {"enabled": False}},
+        }, f)
+
+    return path
+
+
+async def measure_restart(config_path: str, token: str) -> float:
+    """Return the average duration of the initial sync, in milliseconds."""
+    total = 0.0
+    for _ in range(REPETITIONS):
+        # A new instance each time, so no room is known before the initial sync, as
+        # after a restart.
+        instance = Instance(Config(config_path))
+        instance.nio_client.access_token = "token"
+        instance.nio_client.loaded_sync_token = token
+
+        start = time.perf_counter()
+        await instance._initial_sync()
+        total += time.perf_counter() - start
+
+        await instance.nio_client.close()
+        await instance.monzo_session.close()
+        instance.storage.close()
+
+    return total / REPETITIONS * 1e3
+
+
+async def bench_rooms(tmp_dir: str, rooms: int) -> list:
+    runner = web.AppRunner(make_homeserver(rooms))
+    await runner.setup()
+    site = web.TCPSite(runner, "127.0.0.1", 0)
+    await site.start()
+    port = site._server.sockets[0].getsockname()[1]
+    homeserver_url = f"http://127.0.0.1:{port}"
+
+    resume = write_config(tmp_dir, homeserver_url, resume_sync=True)
+    no_resume = write_config(tmp_dir, homeserver_url, resume_sync=False)
+
+    row = [
+        rooms,
+        "%.1f" % await measure_restart(no_resume, VALID_TOKEN),
+        "%.1f" % await measure_restart(resume, VALID_TOKEN),
+        "%.1f" % await measure_restart(resume, EXPIRED_TOKEN),
+    ]
+
+    await runner.cleanup()
+
+    return row
+
+
+async def main():
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        rows = [await bench_rooms(tmp_dir, rooms) for rooms in ROOM_COUNTS]
+
+    print_table(
+        ["rooms", "full state (ms)", "resumed (ms)", "expired token (ms)"], rows,
+    )
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,75 @@
+"""Compare the latency of searching transactions through the full-text index with a
+linear scan of the ledger, as the transaction history grows, using SQLite.
+
+Searches look at the most recent transactions first, so a frequent term is found
+without going through all of its matches. A rare term is then looked up in the whole
+index, which costs time proportional to its number of matches.
+
+    python -m benchmarks.search
+"""
+import asyncio
+import os
+import tempfile
+
+from benchmarks import measure_async, print_table
+from benchmarks.transactions import ACCOUNT_ID, make_transactions
+from matrix_monzo.storage import Storage
+
+HISTORY_SIZES = [1000, 10000, 100000]
+
+# A rare term, which only matches the transaction given this note, and a frequent
+# one, which matches about a sixth of the transactions.
+NOTE = "birthday present"
+SEARCHES = ["birthday", "tesco"]
+
+
+async def bench_history(tmp_dir: str, size: int) -> list:
+    storage = Storage({"engine": "sqlite", "path": os.path.join(tmp_dir, f"{size}.db")})
+    await storage.setup()
+
+    transactions = make_transactions(size)
+    transactions[size // 2]["notes"] = NOTE
+    await storage.transactions_store.add_transactions(ACCOUNT_ID, transactions)
+
+    store = storage.transactions_store
+
+    row = [size]
+    for text in SEARCHES:
+        async def search():
+            await store.search_transactions(ACCOUNT_ID, text, limit=11)
+
+        async def scan():
+            await store.execute_read(
+                """
+                SELECT transaction_json FROM transactions
+                WHERE account_id = %s AND (
+                    merchant_name LIKE %s OR description LIKE %s OR notes LIKE %s
+                )
+                ORDER BY created DESC
+                LIMIT 11;
+                """,
+                (ACCOUNT_ID,) + (f"%{text}%",) * 3,
+            )
+
+        row.append("%.1f" % await measure_async(search, 20))
+        row.append("%.1f" % await measure_async(scan, 20))
+
+    storage.close()
+    return row
+
+
+async def main():
+    rows = []
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        for size in HISTORY_SIZES:
+            rows.append(await bench_history(tmp_dir, size))
+
+    headers = ["transactions"]
+    for text in SEARCHES:
+        headers += [f'"{text}" index (us)', f'"{text}" scan (us)']
+
+    print_table(headers, rows)
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
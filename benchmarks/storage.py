@@ -0,0 +1,70 @@
+"""Compare the latency of token and selected account lookups between the storage
+engines, bypassing the stores' in-memory caches.
+
+SQLite is always benchmarked, using a temporary database. To also benchmark
+PostgreSQL, set the MATRIX_MONZO_BENCH_POSTGRES_DSN environment variable to the DSN of
+a database the benchmark can write to, e.g.:
+
+    MATRIX_MONZO_BENCH_POSTGRES_DSN="dbname=matrix_monzo_bench" python -m benchmarks.storage
+"""
+import asyncio
+import os
+import tempfile
+
+from benchmarks import measure_async, print_table
+from matrix_monzo.storage import Storage
+
+USER_ID = "@bench:example.com"
+NUMBER = 2000
+
+
+async def bench_storage(name: str, db_config: dict) -> list:
+    storage = Storage(db_config)
+    await storage.setup()
+
+    await storage.token_store.store_token(USER_ID, {"access_token": "a" * 200})
+    await storage.selected_account_store.set_selected_account(USER_ID, "acc_bench")
+
+    async def get_token():
+        storage.token_store.cache.invalidate(USER_ID)
+        await storage.token_store.get_token(USER_ID)
+
+    async def get_selected_account():
+        storage.selected_account_store.cache.invalidate(USER_ID)
+        await storage.selected_account_store.get_selected_account(USER_ID)
+
+    async def get_token_cached():
+        await storage.token_store.get_token(USER_ID)
+
+    row = [
+        name,
+        "%.1f" % await measure_async(get_token, NUMBER),
+        "%.1f" % await measure_async(get_selected_account, NUMBER),
+        "%.2f" % await measure_async(get_token_cached, NUMBER),
+    ]
+
+    storage.close()
+    return row
+
+
+async def main():
+    rows = []
+
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        rows.append(await bench_storage(
+            "sqlite", {"engine": "sqlite", "path": os.path.join(tmp_dir, "bench.db")},
+        ))
+
+    dsn = os.environ.get("MATRIX_MONZO_BENCH_POSTGRES_DSN")
+    if dsn:
+        rows.append(await bench_storage("postgres", {"engine": "postgres", "dsn": dsn}))
+    else:
+        print("MATRIX_MONZO_BENCH_POSTGRES_DSN isn't set, skipping PostgreSQL\n")
+
+    print_table(
+        ["engine", "get_token (us)", "get_selected_account (us)", "cached (us)"], rows,
+    )
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,273 @@
+"""Benchmark the hot paths of parsing and matching commands, over synthetic accounts and
+pots of growing size, and store the results so they can be compared between commits.
+
+Results are written to benchmarks/results/<commit>.json, where <commit> is the output
+of "git describe --always --dirty". To compare with the results of another commit
+(which must have been benchmarked on the same machine):
+
+    python -m benchmarks.suite --compare <commit>
+"""
+import argparse
+import asyncio
+import json
+import os
+import platform
+import random
+import subprocess
+import sys
+import time
+from types import SimpleNamespace
+from typing import Callable, Dict, List, Optional, Tuple
+
+from benchmarks import measure, measure_async, print_table
+from benchmarks.matcher import build_snapshots
+from matrix_monzo.bot_commands.move import MoveCommand
+from matrix_monzo.commander import Commander
+from matrix_monzo.messages import messages
+from matrix_monzo.utils import (
+    find_search_term_in_string,
+    format_date,
+    search_through_accounts,
+)
+from matrix_monzo.utils.errors import InvalidParamsError
+from matrix_monzo.utils.snapshots import AccountsSnapshot, PotsSnapshot
+
+RESULTS_DIR = os.path.join(os.path.dirname(__file__), "results")
+
+# (number of accounts, number of pots) of each synthetic user.
+SIZES = [(2, 10), (10, 100), (50, 1000)]
+
+# Changes bigger than this share of the previous duration are flagged when comparing.
+REGRESSION_THRESHOLD = 0.1
+
+# Number of awaited calls per measurement of coroutines.
+ASYNC_NUMBER = 2000
+
+SHOW_MESSAGES = ["show my pots", "show all accounts", "show spending by week"]
+
+
+class FakeInstance:
+    """Serves the synthetic pots to the commands run through the Commander."""
+    def __init__(self, pots: PotsSnapshot):
+        self.pots_raw = {"pots": [
+            dict(pot, balance=1000 * i, currency="GBP")
+            for i, pot in enumerate(pots.raw["pots"])
+        ]}
+
+    async def get_monzo_pots_for_selected_account(self, user_id: str) -> dict:
+        return self.pots_raw
+
+
+def event(body: str):
+    return SimpleNamespace(body=body, sender="@bench:example.com")
+
+
+def move_bodies(
+    pots: PotsSnapshot, accounts: AccountsSnapshot, rand: random.Random,
+) -> Tuple[str, str]:
+    """Pick two pots the move command can tell apart in both grammars."""
+    command = MoveCommand(None)
+    index = accounts.search_index(pots)
+    names = list(pots.pots.keys())
+
+    while True:
+        source, destination = rand.sample(names, 2)
+        basic = f"move 10 GBP {source} {destination}"
+        to_from = f"move £10 from {source} to {destination}"
+        try:
+            command._get_params(basic, pots.pots, index)
+            command._get_params(to_from, pots.pots, index)
+        except InvalidParamsError:
+            continue
+
+        return basic, to_from
+
+
+def size_cases(accounts_count: int, pots_count: int) -> List[Tuple[str, Callable]]:
+    rand = random.Random(42)
+    pots, accounts = build_snapshots(pots_count, rand, accounts_count)
+    index = accounts.search_index(pots)
+    command = MoveCommand(None)
+
+    basic, to_from = move_bodies(pots, accounts, rand)
+    owner = rand.choice(list(accounts.accounts.keys()))[0]
+    s = f"10 gbp from {owner} to {rand.choice(list(pots.pots.keys()))}"
+
+    return [
+        ("move params (basic)", lambda: command._get_params(basic, pots.pots, index)),
+        ("move params (to/from)", lambda: command._get_params(to_from, pots.pots, index)),
+        ("search_through_accounts", lambda: search_through_accounts(s, index)),
+    ]
+
+
+def fixed_cases() -> List[Tuple[str, Callable]]:
+    amounts = iter(range(10 ** 9))
+
+    # Loading "show" adds the routes to its sub-commands.
+    commander = Commander(None)
+    commander._get_command("show")
+
+    return [
+        (f"route \"{body}\"", lambda body=body: commander.router.resolve(body))
+        for body in SHOW_MESSAGES
+    ] + [
+        ("find_search_term_in_string (hit)", lambda: find_search_term_in_string(
+            "holidays", "10 gbp from savings to holidays",
+        )),
+        ("find_search_term_in_string (miss)", lambda: find_search_term_in_string(
+            "holiday", "10 gbp from savings to holidays",
+        )),
+        ("format_date", lambda: format_date("2020-05-17T13:45:12.345Z")),
+        ("get_content (static)", lambda: messages.get_content("unknown_command")),
+        ("get_content (markdown, cached)", lambda: messages.get_content(
+            "move_success",
+            format_markdown=True,
+            amount="10.00",
+            currency="GBP",
+            source="savings",
+            destination="holidays",
+        )),
+        ("get_content (markdown, uncached)", lambda: messages.get_content(
+            "move_success",
+            format_markdown=True,
+            amount="%d.00" % next(amounts),
+            currency="GBP",
+            source="savings",
+            destination="holidays",
+        )),
+    ]
+
+
+async def dispatch_cases(pots_count: int) -> Dict[str, float]:
+    rand = random.Random(42)
+    pots, _ = build_snapshots(pots_count, rand, 1)
+    commander = Commander(FakeInstance(pots))
+
+    results = {}
+
+    for body in ["say hello", "unknown command", "show my pots"]:
+        results[f"dispatch \"{body}\""] = await measure_async(
+            lambda: commander.dispatch(event(body), None), ASYNC_NUMBER,
+        )
+
+    return results
+
+
+def run_suite() -> Dict[str, float]:
+    results = {}
+
+    for name, func in fixed_cases():
+        results[name] = measure(func)
+
+    for accounts_count, pots_count in SIZES:
+        for name, func in size_cases(accounts_count, pots_count):
+            results[f"{name} [{accounts_count}a/{pots_count}p]"] = measure(func)
+
+        for name, duration in asyncio.run(dispatch_cases(pots_count)).items():
+            results[f"{name} [{pots_count}p]"] = duration
+
+    return results
+
+
+def git_describe() -> str:
+    try:
+        return subprocess.check_output(
+            ["git", "describe", "--always", "--dirty"],
+            cwd=os.path.dirname(__file__),
+            stderr=subprocess.DEVNULL,
+            text=True,
+        ).strip()
+    except (OSError, subprocess.CalledProcessError):
+        return "unknown"
+
+
+def results_path(commit: str) -> str:
+    return os.path.join(RESULTS_DIR, f"{commit}.json")
+
+
+def save_results(commit: str, results: Dict[str, float]) -> str:
+    os.makedirs(RESULTS_DIR, exist_ok=True)
+    path = results_path(commit)
+    with open(path, "w") as f:
+        json.dump({
+            "commit": commit,
+            "date": time.strftime("%Y-%m-%dT%H:%M:%S%z"),
+            "python": platform.python_version(),
+            "machine": platform.node(),
+            "results_us": results,
+        }, f, indent=2)
+
+    return path
+
+
+def load_results(commit: str) -> Optional[Dict[str, float]]:
+    try:
+        with open(results_path(commit)) as f:
+            return json.load(f)["results_us"]
+    except FileNotFoundError:
+        return None
+
+
+def compare(baseline: Dict[str, float], results: Dict[str, float]) -> int:
+    """Print the results next to the baseline, and return the number of regressions."""
+    rows = []
+    regressions = 0
+    for name, duration in results.items():
+        previous = baseline.get(name)
+        if previous is None:
+            rows.append([name, "-", "%.2f" % duration, "new", ""])
+            continue
+
+        change = duration / previous - 1
+        flag = ""
+        if change > REGRESSION_THRESHOLD:
+            flag = "SLOWER"
+            regressions += 1
+        elif change < -REGRESSION_THRESHOLD:
+            flag = "faster"
+
+        rows.append([
+            name, "%.2f" % previous, "%.2f" % duration, "%+.1f%%" % (change * 100), flag,
+        ])
+
+    print_table(["benchmark", "baseline (us)", "current (us)", "change", ""], rows)
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument(
+        "--compare", metavar="COMMIT", help="commit to compare the results with",
+    )
+    parser.add_argument(
+        "--no-save", action="store_true", help="don't store the results",
+    )
+    args = parser.parse_args()
+
+    baseline = None
+    if args.compare:
+        baseline = load_results(args.compare)
+        if baseline is None:
+            sys.exit(f"No results stored for {args.compare} in {RESULTS_DIR}")
+
+    commit = git_describe()
+    results = run_suite()
+
+    if not args.no_save:
+        print(f"Results stored in {save_results(commit, results)}\n")
+
+    if baseline is None:
+        print_table(
+            ["benchmark", "duration (us)"],
+            [[name, "%.2f" % duration] for name, duration in results.items()],
+        )
+        return
+
+    regressions = compare(baseline, results)
+    if regressions:
+        sys.exit(f"\n{regressions} benchmark(s) more than"
+                 f" {REGRESSION_THRESHOLD:.0%} slower than {args.compare}")
+
+
+if __name__ == "__main__":
+    main()
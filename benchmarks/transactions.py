@@ -0,0 +1,183 @@
+"""Measure how fast the transactions syncer ingests 100k synthetic transactions, spread
+over 4 years, into an SQLite ledger, depending on the number of transactions written
+per database transaction. Then measure how long it takes to read transactions back
+from the ledger, and to compute spending over the whole history.
+
+    python -m benchmarks.transactions
+"""
+import asyncio
+import bisect
+import os
+import random
+import tempfile
+import time
+from datetime import date, datetime, timedelta, timezone
+from typing import Dict, List, Optional
+
+from benchmarks import measure_async, print_table
+from matrix_monzo.storage import Storage
+from matrix_monzo.utils.spending import (
+    MONTH,
+    bucket_daily_totals,
+    period_start,
+    rolling_averages,
+)
+from matrix_monzo.utils.transactions import PAGE_SIZE, TransactionsSyncer
+
+ACCOUNT_ID = "acc_bench"
+TRANSACTIONS = 100000
+HISTORY_DAYS = 4 * 365
+BATCH_SIZES = [PAGE_SIZE, 1000, 10000]
+
+MERCHANTS = ["Tesco", "Pret A Manger", "TfL", "Amazon", "Spotify", "Deliveroo"]
+CATEGORIES = ["groceries", "eating_out", "transport", "shopping", "entertainment"]
+
+
+def make_transactions(number: int) -> List[dict]:
+    rand = random.Random(42)
+    start = datetime.now(timezone.utc) - timedelta(days=HISTORY_DAYS)
+    interval = HISTORY_DAYS * 24 * 3600 / number
+
+    transactions = []
+    for i in range(number):
+        created = start + timedelta(seconds=i * interval)
+        merchant = rand.choice(MERCHANTS)
+        transactions.append({
+            "id": f"tx_{i:08d}",
+            "account_id": ACCOUNT_ID,
+            "created": created.strftime("%Y-%m-%dT%H:%M:%S.000Z"),
+            "amount": -rand.randint(100, 10000),
+            "currency": "GBP",
+            "description": merchant.upper(),
+            "merchant": {"id": f"merch_{merchant}", "name": merchant},
+            "category": rand.choice(CATEGORIES),
+            "settled": "",
+        })
+
+    return transactions
+
+
+class FakeMonzoClient:
+    """Serves pages of transactions the way the Monzo API does."""
+    def __init__(self, transactions: List[dict]):
+        self.transactions = transactions
+        self._positions = {
+            transaction["id"]: i for i, transaction in enumerate(transactions)
+        }  # type: Dict[str, int]
+        self._created = [transaction["created"] for transaction in transactions]
+
+    async def get_transactions(
+        self, account_id: str, since: Optional[str] = None, limit: int = 100,
+    ) -> dict:
+        if since is None:
+            start = 0
+        elif since in self._positions:
+            start = self._positions[since] + 1
+        else:
+            start = bisect.bisect_left(self._created, since)
+
+        return {"transactions": self.transactions[start:start + limit]}
+
+
+async def bench_ingest(tmp_dir: str, transactions: List[dict], batch_size: int):
+    storage = Storage({
+        "engine": "sqlite", "path": os.path.join(tmp_dir, f"ingest_{batch_size}.db"),
+    })
+    await storage.setup()
+
+    client = FakeMonzoClient(transactions)
+    syncer = TransactionsSyncer(
+        storage.transactions_store, batch_size, initial_sync_days=HISTORY_DAYS + 1,
+    )
+
+    start = time.perf_counter()
+    count = await syncer.sync_account(client, ACCOUNT_ID)
+    duration = time.perf_counter() - start
+
+    # Nothing new to retrieve, so only the cursor lookup and retrieving again the last
+    # few days of transactions.
+    async def sync_again():
+        await syncer.sync_account(client, ACCOUNT_ID)
+
+    row = [
+        batch_size,
+        count,
+        "%.2f" % duration,
+        "%d" % (count / duration),
+        "%.1f" % await measure_async(sync_again, 50),
+    ]
+
+    return storage, row
+
+
+async def main():
+    transactions = make_transactions(TRANSACTIONS)
+
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        rows = []
+        storage = None
+        for batch_size in BATCH_SIZES:
+            if storage is not None:
+                storage.close()
+
+            storage, row = await bench_ingest(tmp_dir, transactions, batch_size)
+            rows.append(row)
+
+        print_table(
+            ["batch size", "transactions", "ingest (s)", "tx/s", "re-sync (us)"],
+            rows,
+        )
+        print()
+
+        store = storage.transactions_store
+        middle = transactions[TRANSACTIONS // 2]["created"]
+
+        async def latest():
+            await store.get_transactions(ACCOUNT_ID)
+
+        async def page_before():
+            await store.get_transactions(ACCOUNT_ID, before=middle)
+
+        since = transactions[0]["created"]
+
+        async def spending_by_category():
+            await store.get_spending_by(ACCOUNT_ID, "category", since)
+
+        async def spending_by_merchant():
+            await store.get_spending_by(ACCOUNT_ID, "merchant", since)
+
+        async def spending_by_month():
+            res = await store.get_daily_spending(ACCOUNT_ID, since)
+            buckets = bucket_daily_totals(
+                [(day, amount) for day, _, amount in res],
+                MONTH,
+                period_start(date.fromisoformat(since[:10]), MONTH),
+                date.today(),
+            )
+            rolling_averages([amount for _, amount in buckets], 3)
+
+        print_table(
+            ["query", "latency (us)"],
+            [
+                ["latest 20", "%.1f" % await measure_async(latest)],
+                ["20 before a date", "%.1f" % await measure_async(page_before)],
+                [
+                    "spending by category (all history)",
+                    "%.1f" % await measure_async(spending_by_category, 20),
+                ],
+                [
+                    "spending by merchant (all history)",
+                    "%.1f" % await measure_async(spending_by_merchant, 20),
+                ],
+                [
+                    "spending by month (all history)",
+                    "%.1f" % await measure_async(spending_by_month, 20),
+                ],
+            ],
+        )
+
+        storage.close()
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
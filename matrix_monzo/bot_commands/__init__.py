@@ -1,33 +1,59 @@
 import abc
+import importlib
 from typing import Dict, List
 
-from monzo.errors import BadRequestError, ForbiddenError, UnauthorizedError
 from nio import MatrixRoom, RoomMessageText
-from oauthlib.oauth2.rfc6749.errors import MissingTokenError
 
+from matrix_monzo import metrics
 from matrix_monzo.messages import messages
 from matrix_monzo.utils import to_event_content
-from matrix_monzo.utils.errors import InvalidParamsError, ProcessingError
+from matrix_monzo.utils.errors import (
+    InvalidParamsError,
+    MonzoBadRequestError,
+    MonzoForbiddenError,
+    MonzoUnauthorizedError,
+    ProcessingError,
+)
 from matrix_monzo.utils.instance import Instance
 
-COMMANDS = ["login", "show", "use", "move", "transfer", "verify_device", "say", "logout"]
+# Maps the prefix of each command to the name of the module implementing it. Modules
+# are only imported the first time their command is used.
+COMMANDS = {
+    "login": "login",
+    "show": "show",
+    "use": "use",
+    "move": "move",
+    "transfer": "transfer",
+    "search": "search",
+    "verify device": "verify_device",
+    "say": "say",
+    "logout": "logout",
+}
 COMMON_WORDS = ["of", "my"]
 
 
+def _count_error(command: "Command", error: Exception):
+    metrics.command_errors.labels(command.name, type(error).__name__).inc()
+
+
 def runner(f):
-    async def wrapped(*args, **kwargs):
+    async def wrapped(self, *args, **kwargs):
         try:
-            res = await f(*args, **kwargs)
+            res = await f(self, *args, **kwargs)
             if not isinstance(res, dict):
                 return to_event_content(res)
             return res
         except (InvalidParamsError, ProcessingError) as e:
+            _count_error(self, e)
             return e.message_content
-        except ForbiddenError:
+        except MonzoForbiddenError as e:
+            _count_error(self, e)
             return messages.get_content("monzo_token_insufficient_permissions")
-        except BadRequestError as e:
+        except MonzoBadRequestError as e:
+            _count_error(self, e)
             return messages.get_content("monzo_api_error", error=e)
-        except (UnauthorizedError, MissingTokenError):
+        except MonzoUnauthorizedError as e:
+            _count_error(self, e)
             return messages.get_content("monzo_missing_token")
 
     return wrapped
@@ -56,6 +82,11 @@ class Command(abc.ABC):
     async def run(self, event: RoomMessageText, room: MatrixRoom) -> Dict[str, str]:
         pass
 
+    @property
+    def name(self) -> str:
+        """The full prefix the command is routed with, used to label its metrics."""
+        return self.PREFIX
+
     def _body_to_params_dict(self, body: str, case_sensitive=False) -> Dict[str, str]:
         params_l = self._body_to_list(body, case_sensitive)
 
@@ -103,15 +134,46 @@ class Command(abc.ABC):
 
 
 class MetaCommand(Command, abc.ABC):
+    def __init__(self, instance: Instance):
+        super(MetaCommand, self).__init__(instance)
+
+        self._sub_commands = {}  # type: Dict[str, SubCommand]
+
     @property
     @abc.abstractmethod
-    def SUB_COMMANDS(self) -> List[str]:
+    def SUB_COMMANDS(self) -> Dict[str, str]:
+        """Maps the prefix of each sub-command to the name of the module implementing
+        it, in the meta-command's package.
+        """
         pass
 
     @abc.abstractmethod
     def get_help_content(self) -> Dict[str, str]:
         pass
 
+    async def run(self, event: RoomMessageText, room: MatrixRoom) -> Dict[str, str]:
+        # Sub-commands are routed by the Commander, so we only get there if the message
+        # doesn't match any of them.
+        return messages.get_content("unknown_command")
+
+    @runner
+    async def run_sub_command(
+        self, prefix: str, event: RoomMessageText, room: MatrixRoom,
+    ) -> Dict[str, str]:
+        body = self._strip_common_words(event.body)
+        params = body[len(self.PREFIX):].strip()
+
+        return await self.get_sub_command(prefix).run_with_params(params, event, room)
+
+    def get_sub_command(self, prefix: str) -> "SubCommand":
+        if prefix not in self._sub_commands:
+            module = importlib.import_module(
+                f'{type(self).__module__}.{self.SUB_COMMANDS[prefix]}'
+            )
+            self._sub_commands[prefix] = module.command_class(self.instance)
+
+        return self._sub_commands[prefix]
+
 
 class SubCommand(Command, abc.ABC):
     @property
@@ -125,5 +187,9 @@ class SubCommand(Command, abc.ABC):
     ) -> Dict[str, str]:
         pass
 
+    @property
+    def name(self) -> str:
+        return f'{self.PARENT} {self.PREFIX}'
+
     def usage(self):
         return f'{self.PARENT} {super().usage()}'
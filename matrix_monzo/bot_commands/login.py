@@ -11,13 +11,13 @@ class LoginCommand(Command):
 
     @runner
     async def run(self, event: RoomMessageText, room: MatrixRoom):
-        if self.instance.is_logged_in():
+        if await self.instance.is_logged_in(event.sender):
             return messages.get_content("login_already_logged_in")
 
         return messages.get_content(
             message_id="login",
             format_markdown=True,
-            login_url=self.instance.get_monzo_login_url(room.room_id),
+            login_url=await self.instance.get_monzo_login_url(event.sender, room.room_id),
         )
 
 
@@ -13,7 +13,7 @@ class LogoutCommand(Command):
 
     @runner
     async def run(self, event: RoomMessageText, room: MatrixRoom) -> Dict[str, str]:
-        self.instance.invalidate_monzo_token()
+        await self.instance.invalidate_monzo_token(event.sender)
         return messages.get_content("logout_success")
 
 
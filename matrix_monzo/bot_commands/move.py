@@ -4,12 +4,9 @@ from nio import MatrixRoom, RoomMessageText
 
 from matrix_monzo.bot_commands import Command, runner
 from matrix_monzo.messages import messages
-from matrix_monzo.utils import (
-    build_account_description,
-    find_search_term_in_string,
-    search_through_accounts
-)
+from matrix_monzo.utils import build_account_description
 from matrix_monzo.utils.errors import InvalidParamsError, ProcessingError
+from matrix_monzo.utils.snapshots import SearchIndex, SearchResult
 
 # TODO: we currently only support GBP, however Monzo is currently opening branches in the
 #  US so supporting USD as well would be nice.
@@ -29,21 +26,27 @@ class MoveCommand(Command):
     @runner
     async def run(self, event: RoomMessageText, room: MatrixRoom):
         # Get the pots and accounts for this user from the API.
-        pots, _ = self.instance.get_monzo_pots_for_search()
-        # We also get the raw response from the accounts retrieval query so that we can
+        pots_snapshot = await self.instance.get_monzo_pots_for_search(event.sender)
+        accounts_snapshot = await self.instance.get_monzo_accounts_for_search(
+            event.sender,
+        )
+        pots = pots_snapshot.pots
+        # We also keep the raw response from the accounts retrieval query so that we can
         # compute a nice name for the account when telling the user the command
         # succeeded.
-        accounts, raw_account_res = self.instance.get_monzo_accounts_for_search()
+        raw_account_res = accounts_snapshot.raw
 
         # We need at least one account to move the amount, even if the transfer is
         # between two pots as the Monzo API doesn't support direct transfers between
         # pots.
-        if len(accounts) == 0:
+        if len(accounts_snapshot.accounts) == 0:
             raise ProcessingError(messages.get_content("account_no_accounts_error"))
 
         # Parse the event body to extract the amount to transfer, as well as the IDs of
         # the pots and/or accounts to transfer from and to.
-        params = self._get_params(event.body, pots, accounts)
+        params = self._get_params(
+            event.body, pots, accounts_snapshot.search_index(pots_snapshot),
+        )
 
         # We don't want to deal with transfers where the destination and the source are
         # the same. We could, if it's a pot, but it's better to just raise an error here.
@@ -52,8 +55,20 @@ class MoveCommand(Command):
                 messages.get_content("move_same_account_pot_error")
             )
 
-        # Actually do the transfer.
-        self._do_transfer(params, pots, event.sender)
+        # Actually do the transfer. Whether it succeeds or fails half-way through, the
+        # cached pots and balances of the accounts involved can't be trusted anymore.
+        try:
+            await self._do_transfer(params, pots, event.sender)
+        finally:
+            self.instance.invalidate_monzo_snapshots(
+                event.sender,
+                pots=True,
+                account_ids=[
+                    params[direction]["id"]
+                    for direction in ("source", "destination")
+                    if params[direction]["type"] == DirectionTypes.ACCOUNT
+                ],
+            )
 
         # Build a user-friendly description for the source and the destination.
         source_name = self._build_direction_description(
@@ -108,17 +123,19 @@ class MoveCommand(Command):
         # just use the ID.
         return direction["id"]
 
-    def _do_transfer(self, params: dict, pots, user_id):
+    async def _do_transfer(self, params: dict, pots, user_id):
         # Convert the amount into pennies/cents, as that's what the Monzo API expects.
         amount_in_pennies = int(params["amount"] * 100)
 
+        client = await self.instance.get_monzo_client(user_id)
+
         if (
             params["source"]["type"] == DirectionTypes.POT
             and params["destination"]["type"] == DirectionTypes.ACCOUNT
         ):
             # If the transfer is from a pot to an account, withdraw from the pot to the
             # account.
-            self.instance.monzo_client.withdraw_from_pot(
+            await client.withdraw_from_pot(
                 account_id=params["destination"]["id"],
                 pot_id=params["source"]["id"],
                 amount_in_pennies=amount_in_pennies,
@@ -129,7 +146,7 @@ class MoveCommand(Command):
         ):
             # If the transfer is from an account to a pot, deposit from the account to
             # the pot.
-            self.instance.monzo_client.deposit_into_pot(
+            await client.deposit_into_pot(
                 pot_id=params["destination"]["id"],
                 account_id=params["source"]["id"],
                 amount_in_pennies=amount_in_pennies,
@@ -143,7 +160,7 @@ class MoveCommand(Command):
             # account, and finally deposit to the second pot from the account.
             # We use this kind of convoluted way of doing things because Monzo doesn't
             # allow direct pot to pot transfers.
-            res = (
+            res = await (
                 self.instance.storage.selected_account_store.get_selected_account(
                     user_id,
                 )
@@ -154,13 +171,13 @@ class MoveCommand(Command):
 
             account_id = res[0][0]
 
-            self.instance.monzo_client.withdraw_from_pot(
+            await client.withdraw_from_pot(
                 account_id=account_id,
                 pot_id=params["source"]["id"],
                 amount_in_pennies=amount_in_pennies,
             )
 
-            self.instance.monzo_client.deposit_into_pot(
+            await client.deposit_into_pot(
                 pot_id=params["destination"]["id"],
                 account_id=account_id,
                 amount_in_pennies=amount_in_pennies,
@@ -176,19 +193,19 @@ class MoveCommand(Command):
             # allow direct account to account transfers.
             pot_id = pots[list(pots.keys())[0]]
 
-            self.instance.monzo_client.deposit_into_pot(
+            await client.deposit_into_pot(
                 pot_id=pot_id,
                 account_id=params["destination"]["id"],
                 amount_in_pennies=amount_in_pennies,
             )
 
-            self.instance.monzo_client.withdraw_from_pot(
+            await client.withdraw_from_pot(
                 account_id=params["source"]["id"],
                 pot_id=pot_id,
                 amount_in_pennies=amount_in_pennies,
             )
 
-    def _get_params(self, body: str, pots: dict, accounts: dict) -> dict:
+    def _get_params(self, body: str, pots: dict, search_index: SearchIndex) -> dict:
         # This is a long command that doesn't use commas in its grammar, so just to
         # ensure none get in the way we replace it with a space, so str.split() does the
         # right thing.
@@ -196,11 +213,11 @@ class MoveCommand(Command):
         params_l = self._body_to_list(body)
 
         if "from" in params_l or "to" in params_l:
-            return self._get_to_from_params(params_l, pots, accounts)
+            return self._get_to_from_params(params_l, pots, search_index)
         else:
-            return self._get_basic_params(params_l, pots, accounts)
+            return self._get_basic_params(params_l, search_index)
 
-    def _get_basic_params(self, params_l: list, pots: dict, accounts: dict) -> dict:
+    def _get_basic_params(self, params_l: list, search_index: SearchIndex) -> dict:
         # Retrieve the amount to transfer.
         params = {"amount": self._process_amount(params_l[0])}
 
@@ -221,28 +238,20 @@ class MoveCommand(Command):
         # (i.e. pot vs account) so we can figure out which API calls to make.
         matches: List[dict] = []
 
-        # Attempt to match a pot's name or ID with a section of the params string.
-        for name, pot_id in pots.items():
-            index = None
+        # Retrieve the pots and accounts whose name or ID match a section of the params
+        # string.
+        result = search_index.search(params_s)
 
-            name_index = find_search_term_in_string(name, params_s)
-            if name_index >= 0:
-                index = name_index
-            elif pot_id in params_s:
-                index = params_s.index(pot_id)
-
-            if index is not None:
-                matches.append(
-                    {
-                        "id": pot_id,
-                        "type": DirectionTypes.POT,
-                        "index": index,
-                    }
-                )
+        for pot_id, index, _ in result.pots:
+            matches.append(
+                {
+                    "id": pot_id,
+                    "type": DirectionTypes.POT,
+                    "index": index,
+                }
+            )
 
-        # Retrieve the accounts that might have a match in the params string.
-        account_matches = search_through_accounts(params_s, pots, accounts)
-        for account_id, index in account_matches:
+        for account_id, index, _ in result.accounts:
             matches.append(
                 {
                     "id": account_id,
@@ -280,7 +289,9 @@ class MoveCommand(Command):
 
         return params
 
-    def _get_to_from_params(self, params_l: list, pots: dict, accounts: dict) -> dict:
+    def _get_to_from_params(
+        self, params_l: list, pots: dict, search_index: SearchIndex,
+    ) -> dict:
         # Make sure we have both a "from" and a "to".
         err_content = None
         if "from" in params_l and "to" not in params_l:
@@ -332,7 +343,13 @@ class MoveCommand(Command):
         amount_with_maybe_currency = "".join(params_l[:first_direction_index])
         params["amount"] = self._process_amount(amount_with_maybe_currency)
 
-        def _search_in_pots(s, param_key):
+        # Search for pots and accounts in both the source and the destination.
+        results = {
+            "source": search_index.search(source),
+            "destination": search_index.search(destination),
+        }
+
+        def _search_in_pots(s, result: SearchResult, param_key):
             # Check if the param is a perfect match with the name of a pot.
             if s in pots.keys():
                 params[param_key] = {
@@ -343,16 +360,11 @@ class MoveCommand(Command):
                 return
 
             # Check if at least one pot could be matched against the param.
-            # We also check whether the ID of a pot is mentioned in the param, in which
-            # case we consider it a perfect match and return immediately.
+            # If the ID of a pot is mentioned in the param, we consider it a perfect
+            # match and return immediately.
             match_ids = []
-            for name, pot_id in pots.items():
-                if name in s:
-                    # Don't match the name of the pot if it's part of a word.
-                    index = find_search_term_in_string(name, s)
-                    if index >= 0:
-                        match_ids.append(pot_id)
-                elif pot_id.casefold() in s:
+            for pot_id, _, exact in result.pots:
+                if exact:
                     params[param_key] = {
                         "id": pot_id,
                         "type": DirectionTypes.POT,
@@ -360,6 +372,8 @@ class MoveCommand(Command):
 
                     return
 
+                match_ids.append(pot_id)
+
             # If we got more than one match, then the command is too ambiguous for us.
             # Tell the user that, and also tell them they can use IDs (which this error
             # message does).
@@ -382,12 +396,12 @@ class MoveCommand(Command):
                 }
 
         # Try to match the source and the destination against pot names and IDs.
-        _search_in_pots(source, "source")
-        _search_in_pots(destination, "destination")
+        _search_in_pots(source, results["source"], "source")
+        _search_in_pots(destination, results["destination"], "destination")
 
-        def _search_in_accounts(s, param_key):
+        def _search_in_accounts(result: SearchResult, param_key):
             # Try to match the param to an account.
-            account_matches = search_through_accounts(s, pots, accounts)
+            account_matches = [(hit.id, hit.index) for hit in result.accounts]
 
             # If we got more than one match, or we got a match but we've already matched
             # a pot, then raise an error.
@@ -415,8 +429,8 @@ class MoveCommand(Command):
                 }
 
         # Try to match the source and the destination against account names and IDs.
-        _search_in_accounts(source, "source")
-        _search_in_accounts(destination, "destination")
+        _search_in_accounts(results["source"], "source")
+        _search_in_accounts(results["destination"], "destination")
 
         return params
 
@@ -0,0 +1,80 @@
+import re
+from typing import Dict
+
+from nio import MatrixRoom, RoomMessageText
+
+from matrix_monzo.bot_commands import Command, runner
+from matrix_monzo.messages import messages
+from matrix_monzo.utils import format_date
+from matrix_monzo.utils.errors import InvalidParamsError, ProcessingError
+
+# Number of transactions shown in a page of results.
+RESULTS_PER_PAGE = 10
+
+# Matches the search text, and the page of results to show if there's one.
+SEARCH_REGEX = re.compile(r"^(?P<text>.*?)(?:\s+page\s+(?P<page>\d+))?$", re.DOTALL)
+
+
+class SearchCommand(Command):
+    PREFIX = "search"
+    PARAMS = ["text"]
+    HELP_DOC = "Search the transactions of the selected account by merchant, description or notes. Add \"page [number]\" at the end to see more results."
+
+    @runner
+    async def run(self, event: RoomMessageText, room: MatrixRoom) -> Dict[str, str]:
+        match = SEARCH_REGEX.match(event.body[len(self.PREFIX):].strip())
+        text = match.group("text")
+        page = int(match.group("page") or 1)
+
+        if not text or page < 1:
+            raise InvalidParamsError(messages.get_content("search_invalid_params"))
+
+        account_id = await self.instance.get_selected_account_id(event.sender)
+
+        # Retrieve one more transaction than needed to know if there's a next page.
+        transactions = await self.instance.storage.transactions_store.search_transactions(
+            account_id,
+            text,
+            limit=RESULTS_PER_PAGE + 1,
+            offset=(page - 1) * RESULTS_PER_PAGE,
+        )
+
+        if not transactions:
+            raise ProcessingError(
+                messages.get_content("search_no_results", text=text, page=page),
+            )
+
+        entries = []
+        for transaction in transactions[:RESULTS_PER_PAGE]:
+            merchant = transaction.get("merchant")
+            if isinstance(merchant, dict) and merchant.get("name"):
+                description = merchant["name"]
+            else:
+                description = transaction["description"]
+
+            entries.append(messages.get(
+                message_id="search_result_entry",
+                date=format_date(transaction["created"]),
+                description=description,
+                amount="%.2f" % (transaction["amount"] / 100),
+                currency=transaction["currency"],
+                id=transaction["id"],
+            ))
+
+        next_page = ""
+        if len(transactions) > RESULTS_PER_PAGE:
+            next_page = "\n\n" + messages.get(
+                message_id="search_next_page", text=text, next_page=page + 1,
+            )
+
+        return messages.get_content(
+            message_id="search_results",
+            format_markdown=True,
+            text=text,
+            page=page,
+            entries="\n".join(entries),
+            next_page=next_page,
+        )
+
+
+command_class = SearchCommand
@@ -1,49 +1,39 @@
-import importlib
 from typing import Dict
 
-from nio import MatrixRoom, RoomMessageText
-
-from matrix_monzo.bot_commands import MetaCommand, SubCommand, runner
+from matrix_monzo.bot_commands import MetaCommand
 from matrix_monzo.messages import messages
-from matrix_monzo.utils.instance import Instance
 
 
 class ShowCommand(MetaCommand):
     PREFIX = "show"
     PARAMS = ["entity"]
-    SUB_COMMANDS = ["accounts", "account", "all_accounts", "pots", "pot"]
+    SUB_COMMANDS = {
+        "accounts": "accounts",
+        "account": "account",
+        "all accounts": "all_accounts",
+        "pots": "pots",
+        "pot": "pot",
+        "spending": "spending",
+        "spending by merchant": "spending_by_merchant",
+        "spending by week": "spending_by_week",
+        "spending by month": "spending_by_month",
+    }
     HELP_DOC = "Show the desired entity."
 
-    def __init__(self, instance: Instance):
-        super(ShowCommand, self).__init__(instance)
-
-        self.help = {}
-
-        self.sub_commands = {}  # type: Dict[str, SubCommand]
-        for sub_command in self.SUB_COMMANDS:
-            module = importlib.import_module(f'{__name__}.{sub_command}')
-            command = module.command_class(instance)
-            self.sub_commands[command.PREFIX] = command
-
-        self._build_help()
+    _help = None
 
     def get_help_content(self) -> Dict[str, str]:
-        return self.help
-
-    @runner
-    async def run(self, event: RoomMessageText, room: MatrixRoom) -> Dict[str, str]:
-        body = self._strip_common_words(event.body)
-        params = body[len(self.PREFIX):].strip()
-
-        for name, sub_command in self.sub_commands.items():
-            if params.startswith(name):
-                return await sub_command.run_with_params(params, event, room)
+        # Building the help requires importing every sub-command, so only do it when
+        # it's needed.
+        if self._help is None:
+            self._help = self._build_help()
 
-        return messages.get_content("unknown_command")
+        return self._help
 
-    def _build_help(self):
+    def _build_help(self) -> Dict[str, str]:
         sub_commands_help = []
-        for name, sub_command in self.sub_commands.items():
+        for prefix in self.SUB_COMMANDS.keys():
+            sub_command = self.get_sub_command(prefix)
             sub_commands_help.append(messages.get(
                 message_id="help_entry",
                 prefix=f'{sub_command.PARENT} {sub_command.PREFIX}',
@@ -51,7 +41,7 @@ class ShowCommand(MetaCommand):
                 usage=sub_command.usage(),
             ))
 
-        self.help = messages.get_content(
+        return messages.get_content(
             message_id="help_meta_command",
             format_markdown=True,
             prefix=self.PREFIX,
@@ -10,6 +10,7 @@ from matrix_monzo.utils import (
     search_through_accounts,
 )
 from matrix_monzo.utils.errors import InvalidParamsError
+from matrix_monzo.utils.snapshots import AccountsSnapshot
 
 
 class AccountCommand(SubCommand):
@@ -25,15 +26,15 @@ class AccountCommand(SubCommand):
     async def run_with_params(
         self, params: str, event: RoomMessageText, room: MatrixRoom,
     ) -> Dict[str, str]:
-        accounts, raw_res = self.instance.get_monzo_accounts_for_search()
+        accounts = await self.instance.get_monzo_accounts_for_search(event.sender)
 
-        if len(accounts) == 1:
-            account_id = list(accounts.values())[0]
-            account = self._get_account_from_id(account_id, raw_res)
+        if len(accounts.accounts) == 1:
+            account_id = list(accounts.accounts.values())[0]
+            account = self._get_account_from_id(account_id, accounts.raw)
         else:
-            account = self._get_account_from_params(params, accounts, raw_res)
+            account = self._get_account_from_params(params, accounts)
 
-        balance_res = self.instance.monzo_client.get_balance(account["id"])
+        balance_res = await self.instance.get_monzo_balance(event.sender, account["id"])
         balance_formatted = "%.2f %s" % (
             balance_res["balance"] / 100,
             account["currency"],
@@ -59,10 +60,8 @@ class AccountCommand(SubCommand):
             id=account["id"],
         )
 
-    def _get_account_from_params(
-        self, params: str, accounts: dict, raw_res: dict,
-    ) -> dict:
-        matches = search_through_accounts(params, {}, accounts)
+    def _get_account_from_params(self, params: str, accounts: AccountsSnapshot) -> dict:
+        matches = search_through_accounts(params, accounts.search_index())
 
         if not matches:
             raise InvalidParamsError(
@@ -82,7 +81,7 @@ class AccountCommand(SubCommand):
 
         account_id, _ = matches[0]
 
-        return self._get_account_from_id(account_id, raw_res)
+        return self._get_account_from_id(account_id, accounts.raw)
 
     def _get_account_from_id(self, account_id: str, raw_res: dict) -> dict:
         for account in raw_res["accounts"]:
@@ -21,10 +21,10 @@ class AccountsCommand(SubCommand):
     async def run_with_params(
             self, params: str, event: RoomMessageText, room: MatrixRoom,
     ) -> Dict[str, str]:
-        return self.get_accounts()
+        return await self.get_accounts(event.sender)
 
-    def get_accounts(self, include_closed: bool = False):
-        accounts_res = self.instance.monzo_client.get_accounts()  # type: Dict[str, List[Dict[Any]]]
+    async def get_accounts(self, user_id: str, include_closed: bool = False):
+        accounts_res = await self.instance.get_monzo_accounts(user_id)  # type: Dict[str, List[Dict[Any]]]
 
         if len(accounts_res["accounts"]) == 0:
             raise ProcessingError(messages.get_content("account_no_accounts_error"))
@@ -34,7 +34,7 @@ class AccountsCommand(SubCommand):
             if account["closed"] and not include_closed:
                 continue
 
-            balance_res = self.instance.monzo_client.get_balance(account["id"])
+            balance_res = await self.instance.get_monzo_balance(user_id, account["id"])
             balance_formatted = "%.2f" % (balance_res["balance"] / 100)
 
             message_id = "account_entry"
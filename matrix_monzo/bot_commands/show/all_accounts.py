@@ -17,7 +17,7 @@ class AllAccountsCommand(AccountsCommand):
     async def run_with_params(
             self, params: str, event: RoomMessageText, room: MatrixRoom,
     ) -> Dict[str, str]:
-        return self.get_accounts(include_closed=True)
+        return await self.get_accounts(event.sender, include_closed=True)
 
 
 command_class = AllAccountsCommand
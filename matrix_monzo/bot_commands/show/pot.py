@@ -24,9 +24,9 @@ class PotCommand(SubCommand):
     async def run_with_params(
         self, params: str, event: RoomMessageText, room: MatrixRoom,
     ) -> Dict[str, str]:
-        pots, raw_res = self.instance.get_monzo_pots_for_search()
+        pots = await self.instance.get_monzo_pots_for_search(event.sender)
 
-        pot = self._get_pot_from_params(params, pots, raw_res)
+        pot = self._get_pot_from_params(params, pots.pots, pots.raw)
 
         balance_formatted = "%.2f %s" % (
             pot["balance"] / 100,
@@ -0,0 +1,66 @@
+from datetime import date, timedelta
+from typing import Dict
+
+from nio import MatrixRoom, RoomMessageText
+
+from matrix_monzo.bot_commands import runner, SubCommand
+from matrix_monzo.messages import messages
+from matrix_monzo.utils.errors import ProcessingError
+
+# Number of days to compute the spending over.
+SPENDING_DAYS = 30
+
+
+class SpendingCommand(SubCommand):
+    PARENT = "show"
+    PREFIX = "spending"
+    PARAMS = []
+    HELP_DOC = f"Show how much was spent from the selected account in each category over the last {SPENDING_DAYS} days."
+
+    GROUP_BY = "category"
+
+    async def run(self, event: RoomMessageText, room: MatrixRoom) -> Dict[str, str]:
+        raise NotImplementedError()
+
+    @runner
+    async def run_with_params(
+            self, params: str, event: RoomMessageText, room: MatrixRoom,
+    ) -> Dict[str, str]:
+        account_id = await self.instance.get_selected_account_id(event.sender)
+
+        since = date.today() - timedelta(days=SPENDING_DAYS)
+        res = await self.instance.storage.transactions_store.get_spending_by(
+            account_id, self.GROUP_BY, since.isoformat(),
+        )
+
+        if not res:
+            raise ProcessingError(messages.get_content("spending_no_transactions_error"))
+
+        entries = []
+        for name, currency, amount, count in res:
+            entries.append(messages.get(
+                message_id="spending_entry",
+                name=self.format_name(name),
+                amount="%.2f" % (amount / 100),
+                currency=currency,
+                count=count,
+            ))
+
+        return messages.get_content(
+            message_id="spending",
+            format_markdown=True,
+            days=SPENDING_DAYS,
+            group=self.GROUP_BY,
+            entries="\n".join(entries),
+        )
+
+    @staticmethod
+    def format_name(name: str) -> str:
+        if not name:
+            return messages.get("spending_uncategorised")
+
+        # Monzo's categories are in snake case, e.g. "eating_out".
+        return name.replace("_", " ").capitalize()
+
+
+command_class = SpendingCommand
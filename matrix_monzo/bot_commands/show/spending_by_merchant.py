@@ -0,0 +1,15 @@
+from matrix_monzo.bot_commands.show.spending import SPENDING_DAYS, SpendingCommand
+
+
+class SpendingByMerchantCommand(SpendingCommand):
+    PREFIX = "spending by merchant"
+    HELP_DOC = f"Show how much was spent from the selected account at each merchant over the last {SPENDING_DAYS} days."
+
+    GROUP_BY = "merchant"
+
+    @staticmethod
+    def format_name(name: str) -> str:
+        return name
+
+
+command_class = SpendingByMerchantCommand
@@ -0,0 +1,15 @@
+from matrix_monzo.bot_commands.show.spending_by_week import SpendingByWeekCommand
+from matrix_monzo.utils.spending import MONTH
+
+
+class SpendingByMonthCommand(SpendingByWeekCommand):
+    PREFIX = "spending by month"
+    HELP_DOC = "Show how much was spent from the selected account each month over the last 12 months, along with the average over 3 months."
+
+    PERIOD = MONTH
+    PERIODS = 12
+    AVERAGE_WINDOW = 3
+    DATE_FORMAT = "%B %Y"
+
+
+command_class = SpendingByMonthCommand
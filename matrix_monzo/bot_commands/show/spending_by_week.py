@@ -0,0 +1,92 @@
+from datetime import date
+from typing import Dict, List, Tuple
+
+from nio import MatrixRoom, RoomMessageText
+
+from matrix_monzo.bot_commands import runner, SubCommand
+from matrix_monzo.messages import messages
+from matrix_monzo.utils.errors import ProcessingError
+from matrix_monzo.utils.spending import (
+    WEEK,
+    bucket_daily_totals,
+    period_start,
+    rolling_averages,
+    shift_period_start,
+)
+
+
+class SpendingByWeekCommand(SubCommand):
+    PARENT = "show"
+    PREFIX = "spending by week"
+    PARAMS = []
+    HELP_DOC = "Show how much was spent from the selected account each week over the last 12 weeks, along with the average over 4 weeks."
+
+    PERIOD = WEEK
+    # Number of periods to show.
+    PERIODS = 12
+    # Number of periods to average the spending over.
+    AVERAGE_WINDOW = 4
+    # Format of the first day of each period.
+    DATE_FORMAT = "%d/%m/%Y"
+
+    async def run(self, event: RoomMessageText, room: MatrixRoom) -> Dict[str, str]:
+        raise NotImplementedError()
+
+    @runner
+    async def run_with_params(
+            self, params: str, event: RoomMessageText, room: MatrixRoom,
+    ) -> Dict[str, str]:
+        account_id = await self.instance.get_selected_account_id(event.sender)
+
+        # Retrieve the periods before the first one shown too, so that its average is
+        # computed over a full window.
+        today = date.today()
+        last = period_start(today, self.PERIOD)
+        first = shift_period_start(
+            last, -(self.PERIODS + self.AVERAGE_WINDOW - 2), self.PERIOD,
+        )
+
+        res = await self.instance.storage.transactions_store.get_daily_spending(
+            account_id, first.isoformat(),
+        )
+
+        if not res:
+            raise ProcessingError(messages.get_content("spending_no_transactions_error"))
+
+        # Amounts in different currencies can't be added up, so total each currency
+        # separately.
+        daily_totals = {}  # type: Dict[str, List[Tuple[str, int]]]
+        for day, currency, amount in res:
+            daily_totals.setdefault(currency, []).append((day, amount))
+
+        periods = {}  # type: Dict[str, List[Tuple[Tuple[date, int], float]]]
+        for currency, totals in sorted(daily_totals.items()):
+            buckets = bucket_daily_totals(totals, self.PERIOD, first, today)
+            averages = rolling_averages(
+                [amount for _, amount in buckets], self.AVERAGE_WINDOW,
+            )
+            periods[currency] = list(zip(buckets, averages))[-self.PERIODS:]
+
+        entries = []
+        for i in range(self.PERIODS):
+            for currency, currency_periods in periods.items():
+                (start, amount), average = currency_periods[i]
+                entries.append(messages.get(
+                    message_id="spending_period_entry",
+                    start=start.strftime(self.DATE_FORMAT),
+                    amount="%.2f" % (amount / 100),
+                    average="%.2f" % (average / 100),
+                    currency=currency,
+                ))
+
+        return messages.get_content(
+            message_id="spending_per_period",
+            format_markdown=True,
+            period=self.PERIOD,
+            periods=self.PERIODS,
+            window=self.AVERAGE_WINDOW,
+            entries="\n".join(entries),
+        )
+
+
+command_class = SpendingByWeekCommand
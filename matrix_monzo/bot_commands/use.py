@@ -15,8 +15,8 @@ class UseCommand(Command):
     async def run(self, event: RoomMessageText, room: MatrixRoom):
         params = self._body_to_list(event.body)
 
-        accounts, _ = self.instance.get_monzo_accounts_for_search()
-        matches = search_through_accounts("".join(params[1:]), {}, accounts)
+        accounts = await self.instance.get_monzo_accounts_for_search(event.sender)
+        matches = search_through_accounts("".join(params[1:]), accounts.search_index())
 
         if len(matches) == 0:
             raise InvalidParamsError(
@@ -35,9 +35,13 @@ class UseCommand(Command):
             )
 
         account_id = matches[0][0]
-        self.instance.storage.selected_account_store.set_selected_account(
+        await self.instance.storage.selected_account_store.set_selected_account(
             event.sender, account_id,
         )
+        # The cached pots were the ones of the previously selected account.
+        self.instance.invalidate_monzo_snapshots(event.sender, pots=True)
+
+        await self.instance.register_monzo_webhook(event.sender)
 
         return messages.get("use_success", account_id=account_id)
 
@@ -17,19 +17,14 @@ class VerifyDeviceCommand(Command):
 
         device_id = params["device_id"]
 
-        devices = self.instance.nio_client.store.load_device_keys()
-        device = None
-        for device in devices.active_user_devices(event.sender):
-            if device.device_id == device_id:
-                device = device
-                break
-
-        if not device:
+        device = self.instance.nio_client.device_store[event.sender].get(device_id)
+
+        if not device or device.deleted:
             return messages.get_content(
                 "device_unknown", user_id=event.sender, device_id=device_id,
             )
 
-        self.instance.nio_client.verify_device(device)
+        self.instance.verified_devices.verify(device)
 
         return messages.get_content("device_verified", device_id=device_id)
 
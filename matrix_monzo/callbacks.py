@@ -1,7 +1,9 @@
 import logging
+from typing import Dict, Optional
 
 from nio import InviteMemberEvent, JoinError, MatrixRoom, RoomMemberEvent, RoomMessageText
 
+from matrix_monzo import tracing
 from matrix_monzo.commander import Commander
 from matrix_monzo.messages import messages
 from matrix_monzo.utils.instance import Instance
@@ -19,59 +21,88 @@ class Callbacks:
         # being sent twice.
         self.welcomed = []
 
+        # Maps the ID of each room we've been invited to, and haven't sent the welcome
+        # message to yet, to the user who invited us.
+        self.inviters = {}  # type: Dict[str, str]
+
     async def message(self, room: MatrixRoom, event: RoomMessageText) -> None:
-        if event.sender != self.instance.config.owner_id:
+        if event.sender not in self.instance.config.owner_ids:
             return
 
-        try:
-            await self.instance.nio_client.room_typing(room.room_id)
-
-            device = self.instance.nio_client.device_store.device_from_sender_key(
-                event.sender, event.sender_key,
-            )
-            if not self._user_has_verified_device(event.sender):
-                self.instance.nio_client.verify_device(device)
-            elif not self.instance.nio_client.store.is_device_verified(device):
-                await self.instance.nio_client.room_send(
-                    room.room_id,
-                    "m.room.message",
-                    messages.get_content("unverified_device", device_id=device.device_id),
-                )
-                return
+        ignore_before = self.instance.ignore_messages_before
+        if ignore_before is not None and event.server_timestamp < ignore_before:
+            logger.info(f"Ignoring message {event.event_id} sent before the restart")
+            return
 
-            res = await self.commander.dispatch(event, room)
-        except Exception as e:
-            logger.exception(e)
-            res = messages.get_content("unknown_error")
-        finally:
-            await self.instance.nio_client.room_typing(room.room_id, typing_state=False)
+        # Start tracing now so the time spent waiting for the command to run is included.
+        trace = tracing.tracer.start_trace(
+            "message", sender=event.sender, room_id=room.room_id,
+        )
 
-        await self.instance.nio_client.room_send(
-            room.room_id, "m.room.message", res, ignore_unverified_devices=True,
+        # Don't hold up the sync loop while the command runs.
+        self.instance.command_scheduler.submit(
+            event.sender, lambda: self._handle_message(room, event, trace),
         )
 
-    def _user_has_verified_device(self, user_id: str):
-        devices = self.instance.nio_client.store.load_device_keys()
-        verified = False
-        for device in devices.active_user_devices(user_id):
-            if device.verified:
-                verified = True
-                break
+    async def _handle_message(
+        self,
+        room: MatrixRoom,
+        event: RoomMessageText,
+        trace: Optional[tracing.Trace] = None,
+    ) -> None:
+        with tracing.tracer.activate(trace):
+            await self._run_command(room, event)
+
+    async def _run_command(self, room: MatrixRoom, event: RoomMessageText) -> None:
+        sender = self.instance.message_sender
+
+        async with sender.typing(room.room_id):
+            try:
+                if not self._check_device(room, event):
+                    return
+
+                res = await self.commander.dispatch(event, room)
+            except Exception as e:
+                logger.exception(e)
+                res = messages.get_content("unknown_error")
+
+        sender.send(room.room_id, res)
 
-        return verified
+    def _check_device(self, room: MatrixRoom, event: RoomMessageText) -> bool:
+        """Check that the message was sent from a verified device. The first device a
+        user sends a message from is verified automatically.
+
+        Returns:
+            Whether to run the command. If not, the user has been told why.
+        """
+        device = self.instance.nio_client.device_store.device_from_sender_key(
+            event.sender, event.sender_key,
+        )
+        verified_devices = self.instance.verified_devices
+        if not verified_devices.has_verified_device(event.sender):
+            verified_devices.verify(device)
+        elif not verified_devices.is_verified(event.sender, device.device_id):
+            self.instance.message_sender.send(
+                room.room_id,
+                messages.get_content("unverified_device", device_id=device.device_id),
+            )
+            return False
+
+        return True
 
     async def invite(self, room: MatrixRoom, event: InviteMemberEvent) -> None:
         """Callback for when an invite is received. Join the room specified in the invite
         """
-        # Only react to invites to us from the configured user.
+        # Only react to invites to us from the configured users.
         if (
             event.membership != "invite"
-            or event.sender != self.instance.config.owner_id
+            or event.sender not in self.instance.config.owner_ids
             or event.state_key != self.instance.config.user_id
         ):
             return
 
         logger.info(f"Got invite to {room.room_id} from {event.sender}.")
+        self.inviters[room.room_id] = event.sender
 
         # Attempt to join 3 times before giving up
         for attempt in range(3):
@@ -94,24 +125,18 @@ class Callbacks:
 
         self.welcomed.append(room.room_id)
 
-        await self.instance.nio_client.room_send(
-            room.room_id,
-            "m.room.message",
-            messages.get_content("welcome_message_p1", format_markdown=True),
-            ignore_unverified_devices=True,
+        # Our own join event was sent by us, so check whether the user who invited us
+        # is logged in. This is done before queueing the welcome message so all of its
+        # parts can be sent as a single event. The inviter isn't known if we were
+        # restarted between the invite and the join, in which case ask them to log in
+        # anyway rather than leave them without any instructions.
+        inviter = self.inviters.pop(room.room_id, None)
+        need_login = inviter is None or not await self.instance.is_logged_in(inviter)
+
+        sender = self.instance.message_sender
+        sender.send(
+            room.room_id, messages.get_content("welcome_message_p1", format_markdown=True),
         )
-
-        await self.instance.nio_client.room_send(
-            room.room_id,
-            "m.room.message",
-            messages.get_content("welcome_message_p2"),
-            ignore_unverified_devices=True,
-        )
-
-        if not self.instance.is_logged_in():
-            await self.instance.nio_client.room_send(
-                room.room_id,
-                "m.room.message",
-                messages.get_content("welcome_message_p3"),
-                ignore_unverified_devices=True,
-            )
+        sender.send(room.room_id, messages.get_content("welcome_message_p2"))
+        if need_login:
+            sender.send(room.room_id, messages.get_content("welcome_message_p3"))
@@ -1,53 +1,107 @@
 import importlib
-from typing import Dict, List
+from typing import Dict, List, Optional
 
 from nio import MatrixRoom, RoomMessageText
 
-from matrix_monzo import bot_commands
+from matrix_monzo import bot_commands, metrics, tracing
 from matrix_monzo.messages import messages
 from matrix_monzo.utils.instance import Instance
+from matrix_monzo.utils.router import CommandRouter
 
 
 class Commander:
     def __init__(self, instance: Instance):
         self.instance = instance
-        self.help_doc = {}
+        self._help_doc = None  # type: Optional[Dict[str, str]]
 
-        self.commands = []  # type: List[bot_commands.Command]
-        for command_name in bot_commands.COMMANDS:
-            module = importlib.import_module(f'{bot_commands.__name__}.{command_name}')
-            self.commands.append(module.command_class(instance))
+        # Commands are only imported and instantiated the first time they're used.
+        self.commands = {}  # type: Dict[str, bot_commands.Command]
 
-        self._build_help_doc()
+        # Routes map a message to the prefix of a command and, if it's a meta-command,
+        # the prefix of one of its sub-commands. Sub-commands are added to the router
+        # when their meta-command is loaded.
+        self.router = CommandRouter()
+        for prefix in bot_commands.COMMANDS.keys():
+            self.router.add(prefix, (prefix, None))
 
     async def dispatch(self, event: RoomMessageText, room: MatrixRoom) -> Dict[str, str]:
+        with tracing.span("dispatch"):
+            return await self._dispatch(event, room)
+
+    async def _dispatch(self, event: RoomMessageText, room: MatrixRoom) -> Dict[str, str]:
         if event.body.startswith("help"):
             return self._dispatch_help(event)
 
-        for command in self.commands:
-            if event.body.startswith(command.PREFIX):
-                return await command.run(event, room)
+        route = self.router.resolve(event.body)
+        if route is None:
+            return messages.get_content("unknown_command")
+
+        command_prefix, sub_command_prefix = route.value
+        if command_prefix not in self.commands:
+            self._load_command(command_prefix)
+            # Loading a meta-command registers its sub-commands, so the message might
+            # now match a longer prefix.
+            command_prefix, sub_command_prefix = self.router.resolve(event.body).value
+
+        command = self.commands[command_prefix]
+        if sub_command_prefix is not None:
+            name = command.get_sub_command(sub_command_prefix).name
+        else:
+            name = command.name
+
+        with metrics.command_duration.labels(name).time(), tracing.span(
+            "command", command=name,
+        ):
+            if sub_command_prefix is not None:
+                return await command.run_sub_command(sub_command_prefix, event, room)
+
+            return await command.run(event, room)
+
+    def _load_command(self, prefix: str) -> bot_commands.Command:
+        module = importlib.import_module(
+            f'{bot_commands.__name__}.{bot_commands.COMMANDS[prefix]}'
+        )
+        command = module.command_class(self.instance)
+        self.commands[prefix] = command
+
+        if isinstance(command, bot_commands.MetaCommand):
+            self.router.add(prefix, (prefix, None), skip_words=bot_commands.COMMON_WORDS)
+            for sub_command_prefix in command.SUB_COMMANDS.keys():
+                self.router.add(
+                    f'{prefix} {sub_command_prefix}', (prefix, sub_command_prefix),
+                )
 
-        return messages.get_content("unknown_command")
+        return command
+
+    def _get_command(self, prefix: str) -> bot_commands.Command:
+        if prefix in self.commands:
+            return self.commands[prefix]
+
+        return self._load_command(prefix)
 
     def _dispatch_help(self, event: RoomMessageText) -> Dict[str, str]:
         if event.body == "help":
-            return self.help_doc
+            # Building the help requires importing every command, so only do it when
+            # it's needed.
+            if self._help_doc is None:
+                self._help_doc = self._build_help_doc()
+
+            return self._help_doc
 
         target = event.body.replace("help ", "")
-        for command in self.commands:
-            if not isinstance(command, bot_commands.MetaCommand):
-                continue
-            if command.PREFIX == target:
+        if target in bot_commands.COMMANDS:
+            command = self._get_command(target)
+            if isinstance(command, bot_commands.MetaCommand):
                 return command.get_help_content()
 
         return messages.get_content("unknown_command")
 
-    def _build_help_doc(self):
+    def _build_help_doc(self) -> Dict[str, str]:
         commands = []
         meta_commands = []
 
-        for command in self.commands:
+        for prefix in bot_commands.COMMANDS.keys():
+            command = self._get_command(prefix)
             if isinstance(command, bot_commands.MetaCommand):
                 meta_commands.append(command)
             else:
@@ -56,7 +110,7 @@ class Commander:
         commands_help_doc = "\n".join(self._build_help_list(commands))
         meta_commands_help_doc = "\n".join(self._build_help_list(meta_commands))
 
-        self.help_doc = messages.get_content(
+        return messages.get_content(
             message_id="help",
             format_markdown=True,
             commands=commands_help_doc,
@@ -5,6 +5,7 @@ import sys
 
 import yaml
 
+from matrix_monzo.monzo_api import API_URL
 from matrix_monzo.utils.errors import ConfigError
 
 logger = logging.getLogger()
@@ -91,18 +92,42 @@ class Config(object):
         if not self.homeserver_url:
             raise ConfigError("matrix.homeserver_url is a required field")
 
-        # Configure the bot's owner, i.e. the only user the bot will interact with.
-        self.owner_id = matrix.get("owner_id")
-        if not self.owner_id:
-            raise ConfigError("matrix.owner_id is a required field")
-        elif not re.match("@.*:.*", self.user_id):
-            raise ConfigError("matrix.owner_id must be in the form @name:domain")
+        # Configure the bot's owners, i.e. the only users the bot will interact with.
+        # matrix.owner_id is still supported for deployments with a single owner.
+        owner_ids = matrix.get("owner_ids")
+        if owner_ids is None and matrix.get("owner_id"):
+            owner_ids = [matrix["owner_id"]]
+        if not owner_ids:
+            raise ConfigError("matrix.owner_ids is a required field")
+        for owner_id in owner_ids:
+            if not re.match("@.*:.*", owner_id):
+                raise ConfigError("matrix.owner_ids must be in the form @name:domain")
+        self.owner_ids = frozenset(owner_ids)
 
         # Configure the path where nio will store encryption and sync data.
         self.store_path = matrix.get("store_path")
         if not self.store_path:
             raise ConfigError("matrix.store_path is a required field")
 
+        # Whether to resume syncing from the sync token stored in store_path on startup,
+        # rather than retrieving the full state of every room again.
+        self.resume_sync = matrix.get("resume_sync", True)
+
+        # Whether to ask the homeserver to only send the events the bot handles when
+        # syncing, and how many events to send at most per room and sync.
+        self.sync_filter = matrix.get("sync_filter", True)
+        self.sync_timeline_limit = matrix.get("sync_timeline_limit", 10)
+        # Whether to only sync the members of a room who sent the events being synced,
+        # rather than all of them.
+        self.sync_lazy_load_members = matrix.get("sync_lazy_load_members", True)
+
+        # Maximum number of commands running at the same time. Commands from the same
+        # user always run one after the other.
+        self.command_workers = matrix.get("command_workers", 10)
+
+        # Number of seconds a command needs to run for before the bot is shown as typing.
+        self.typing_delay = matrix.get("typing_delay", 1.0)
+
         # Monzo setup.
         monzo = config.get("monzo", {})
 
@@ -110,6 +135,26 @@ class Config(object):
         self.monzo_client_id = monzo.get("client_id", self.DEFAULT_CLIENT_ID)
         self.monzo_client_secret = monzo.get("client_secret", self.DEFAULT_CLIENT_SECRET)
 
+        # Base URL of the Monzo API, only worth changing to test against a fake one.
+        self.monzo_api_url = monzo.get("api_url", API_URL).rstrip("/")
+
+        # Maximum number of simultaneous connections to the Monzo API. Connections are
+        # kept alive and reused between requests.
+        self.monzo_max_connections = monzo.get("max_connections", 10)
+
+        # Maximum number of users whose Monzo client is kept in memory.
+        self.monzo_max_clients = monzo.get("max_clients", 100)
+
+        # Number of seconds during which accounts, pots and balances retrieved from the
+        # Monzo API are reused instead of being fetched again. 0 disables caching.
+        self.monzo_cache_ttl = monzo.get("cache_ttl", 60)
+
+        # Number of seconds between two syncs of the selected account's transactions
+        # into the local ledger. 0 disables syncing.
+        self.monzo_transactions_sync_interval = monzo.get(
+            "transactions_sync_interval", 300,
+        )
+
         # HTTP setup.
         http = config.get("http", {})
 
@@ -128,3 +173,31 @@ class Config(object):
         self.http_baseurl = http.get("public_baseurl")
         if not self.http_port:
             raise ConfigError("http.public_baseurl is a required field")
+
+        # The secret part of the URL Monzo sends webhooks to, which prevents anyone else
+        # from sending fake events to the bot. Webhooks are disabled if it isn't set.
+        self.http_webhook_secret = http.get("webhook_secret")
+
+        # Whether to expose metrics about the bot's performance at /metrics, in the
+        # Prometheus text format, and the most recent traces at /traces. Off by default,
+        # as they're served on the same listener as the auth callback, and traces show
+        # user IDs, room IDs and SQL statements.
+        self.http_metrics_enabled = http.get("metrics_enabled", False)
+
+        # Tracing setup.
+        tracing = config.get("tracing", {})
+
+        # Whether to record a trace of the work done to handle each message.
+        self.tracing_enabled = tracing.get("enabled", True)
+
+        # Share of the traces to keep, between 0 and 1. Slow traces are always kept.
+        self.tracing_sample_rate = tracing.get("sample_rate", 0.1)
+
+        # Number of seconds after which a trace is logged as slow.
+        self.tracing_slow_threshold = tracing.get("slow_threshold", 2.0)
+
+        # Number of traces kept in memory.
+        self.tracing_buffer_size = tracing.get("buffer_size", 100)
+
+        # Path of a file to append the traces kept to, as JSON lines.
+        self.tracing_export_path = tracing.get("export_path")
@@ -1,31 +1,64 @@
 import logging
 import os
+import re
 
 from aiohttp import web
+from aiohttp.abc import AbstractAccessLogger
 
 from matrix_monzo.http.handlers.auth_callback import AuthCallbackHandler
+from matrix_monzo.http.handlers.metrics import MetricsHandler
+from matrix_monzo.http.handlers.webhook import WebhookHandler
 from matrix_monzo.utils.instance import Instance
 
 logger = logging.getLogger(__name__)
 
+# Matches the secret in the path of webhooks. Monzo can't send it any other way than in
+# the URL, so it's left out of access logs instead.
+WEBHOOK_SECRET_REGEX = re.compile(r"^/webhook/[^/?]+")
 
-async def start_http(instance: Instance):
+
+class AccessLogger(AbstractAccessLogger):
+    """Logs the requests to the HTTP server, without the webhook secret."""
+    def log(self, request: web.BaseRequest, response: web.StreamResponse, time: float):
+        path = WEBHOOK_SECRET_REGEX.sub("/webhook/<secret>", request.path_qs)
+        self.logger.info(
+            f'{request.remote} "{request.method} {path}" {response.status}'
+            f' {response.body_length} {time:.3f}s'
+        )
+
+    @property
+    def enabled(self) -> bool:
+        return self.logger.isEnabledFor(logging.INFO)
+
+
+async def start_http(instance: Instance) -> web.AppRunner:
     app = web.Application()
 
     current_dir = os.path.dirname(__file__)
     static_path = os.path.join(current_dir, "../../res/static")
 
     auth_callback = AuthCallbackHandler(instance)
+    webhook = WebhookHandler(instance)
 
     app.add_routes([
         web.static("/static", static_path),
         web.get("/auth_callback", auth_callback.handler),
+        web.post("/webhook/{secret}", webhook.handler),
     ])
 
-    runner = web.AppRunner(app)
+    if instance.config.http_metrics_enabled:
+        metrics = MetricsHandler(instance)
+        app.add_routes([
+            web.get("/metrics", metrics.handler),
+            web.get("/traces", metrics.traces_handler),
+        ])
+
+    runner = web.AppRunner(app, access_log_class=AccessLogger)
     await runner.setup()
 
     site = web.TCPSite(runner, instance.config.http_address, instance.config.http_port)
     await site.start()
 
     logger.info("Started HTTP site")
+
+    return runner
@@ -24,22 +24,13 @@ class AuthCallbackHandler:
         code = request.query.get("code")
         state = request.query.get("state")
         try:
-            token, room_id = self.instance.get_monzo_access_token(code, state)
+            token, room_id = await self.instance.get_monzo_access_token(code, state)
 
-            await self.instance.nio_client.room_send(
-                room_id,
-                "m.room.message",
-                messages.get_content("login_success"),
-                ignore_unverified_devices=True,
-            )
+            sender = self.instance.message_sender
+            sender.send(room_id, messages.get_content("login_success"))
 
             if 'third_party_developer_app.pre_verification' in token.get('scope', []):
-                await self.instance.nio_client.room_send(
-                    room_id,
-                    "m.room.message",
-                    messages.get_content("login_need_app_action"),
-                    ignore_unverified_devices=True,
-                )
+                sender.send(room_id, messages.get_content("login_need_app_action"))
 
             return web.Response(text=self.success_html, content_type="text/html")
         except Exception:
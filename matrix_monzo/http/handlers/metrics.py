@@ -0,0 +1,92 @@
+import json
+from typing import List, Union
+
+from aiohttp import web
+
+from matrix_monzo import metrics, tracing
+from matrix_monzo.messages import messages
+from matrix_monzo.utils.instance import Instance
+
+
+def _ratio(hits: int, misses: int) -> float:
+    total = hits + misses
+    return hits / total if total else 0.0
+
+
+class MetricsHandler:
+    def __init__(self, instance: Instance):
+        self.instance = instance
+
+        # Statistics the instance's components already keep track of, read when the
+        # metrics are collected so they don't cost anything the rest of the time.
+        scheduler = instance.command_scheduler
+        sender = instance.message_sender
+        clients = instance.monzo_clients
+        self.component_metrics = [
+            metrics.Gauge(
+                "matrix_monzo_command_queue_depth",
+                "Commands waiting to run or running.",
+                lambda: scheduler.queue_depth,
+            ),
+            metrics.Gauge(
+                "matrix_monzo_command_wait_seconds_average",
+                "Average time commands waited for before running.",
+                lambda: scheduler.average_wait_time,
+            ),
+            metrics.Gauge(
+                "matrix_monzo_command_wait_seconds_max",
+                "Longest time a command waited for before running.",
+                lambda: scheduler.max_wait_time,
+            ),
+            metrics.Gauge(
+                "matrix_monzo_snapshot_cache_hit_ratio",
+                "Share of Monzo snapshot lookups served from the cache.",
+                lambda: instance.monzo_snapshots.hit_rate,
+            ),
+            metrics.Gauge(
+                "matrix_monzo_monzo_clients",
+                "Monzo clients kept in memory.",
+                lambda: len(clients),
+            ),
+            metrics.Gauge(
+                "matrix_monzo_monzo_client_pool_hit_ratio",
+                "Share of Monzo client lookups served from memory.",
+                lambda: _ratio(clients.hits, clients.misses),
+            ),
+            metrics.FunctionCounter(
+                "matrix_monzo_message_renders_total",
+                "Messages rendered with markdown.",
+                lambda: messages.render_count,
+            ),
+            metrics.FunctionCounter(
+                "matrix_monzo_message_render_seconds_total",
+                "Time spent rendering messages with markdown.",
+                lambda: messages.render_time,
+            ),
+            metrics.FunctionCounter(
+                "matrix_monzo_sent_events_total",
+                "Events sent to rooms, after merging messages.",
+                lambda: sender.sent_events,
+            ),
+            metrics.FunctionCounter(
+                "matrix_monzo_rate_limited_sends_total",
+                "Times sending an event was rate limited by the homeserver.",
+                lambda: sender.rate_limited,
+            ),
+        ]  # type: List[Union[metrics.Gauge, metrics.FunctionCounter]]
+
+    async def handler(self, request: web.Request):
+        body = metrics.registry.render() + "".join(
+            metric.render() for metric in self.component_metrics
+        )
+
+        return web.Response(
+            text=body, content_type="text/plain", headers={"Cache-Control": "no-store"},
+        )
+
+    async def traces_handler(self, request: web.Request):
+        return web.json_response(
+            list(reversed(tracing.tracer.recent_traces)),
+            dumps=lambda obj: json.dumps(obj, default=str),
+            headers={"Cache-Control": "no-store"},
+        )
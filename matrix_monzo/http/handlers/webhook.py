@@ -0,0 +1,62 @@
+import hmac
+import logging
+from typing import Any
+
+from aiohttp import web
+
+from matrix_monzo.utils.instance import Instance
+
+logger = logging.getLogger(__name__)
+
+# The keys a transaction needs to have to be stored, and their types.
+TRANSACTION_KEYS = {
+    "id": str,
+    "account_id": str,
+    "created": str,
+    "amount": int,
+    "currency": str,
+}
+
+
+def _is_valid_transaction(transaction: Any) -> bool:
+    return isinstance(transaction, dict) and all(
+        isinstance(transaction.get(key), expected_type)
+        for key, expected_type in TRANSACTION_KEYS.items()
+    )
+
+
+class WebhookHandler:
+    def __init__(self, instance: Instance):
+        self.instance = instance
+
+    async def handler(self, request: web.Request):
+        secret = self.instance.config.http_webhook_secret
+        # compare_digest only accepts ASCII strings, so compare bytes instead, as the
+        # path can contain anything.
+        if not secret or not hmac.compare_digest(
+            request.match_info["secret"].encode("utf-8"), secret.encode("utf-8"),
+        ):
+            raise web.HTTPNotFound()
+
+        try:
+            event = await request.json()
+        except ValueError:
+            raise web.HTTPBadRequest()
+
+        # Monzo sends webhooks again until they succeed, so fail malformed ones with a
+        # 400 rather than a 500 from a missing key.
+        if not isinstance(event, dict):
+            raise web.HTTPBadRequest()
+
+        logger.debug(f"Received webhook of type {event.get('type')}")
+
+        if event.get("type") == "transaction.created":
+            if not _is_valid_transaction(event.get("data")):
+                logger.warning("Received a malformed transaction.created webhook")
+                raise web.HTTPBadRequest()
+
+            await self.instance.handle_monzo_transaction(event["data"])
+
+        # Any response other than a 200 makes Monzo send the webhook again, so don't
+        # complain about event types we don't know about.
+        return web.Response()
@@ -1,13 +1,46 @@
 import json
-from typing import Dict, Optional
+import os
+import string
+import time
+from collections import OrderedDict
+from typing import Dict, Hashable, Optional, Tuple
 
 from matrix_monzo.utils import to_event_content
 
+# Maximum number of rendered templated messages to keep in memory.
+RENDER_CACHE_SIZE = 256
+
 
 class _Messages:
-    def __init__(self, path):
-        with open(path) as fp:
-            self._dict = json.load(fp)  # type: Dict[str, str]
+    def __init__(self, path, render_cache_size: int = RENDER_CACHE_SIZE):
+        self._path = path
+        self._messages = None  # type: Optional[Dict[str, str]]
+
+        # Whether each message doesn't take any parameter, and the contents of the
+        # ones that don't, for each value of format_markdown. Both are filled in the
+        # first time a message is requested, so messages that are only ever sent as
+        # plain text aren't rendered with markdown.
+        self._is_static = {}  # type: Dict[str, bool]
+        self._static_contents = {}  # type: Dict[Tuple[str, bool], Dict[str, str]]
+
+        # Contents of templated messages formatted with markdown, keyed by message ID
+        # and parameters, least recently used first.
+        self._render_cache = OrderedDict()  # type: OrderedDict
+        self._render_cache_size = render_cache_size
+
+        # Number of times a message has been rendered with markdown, and time spent
+        # doing it.
+        self.render_count = 0
+        self.render_time = 0.0
+
+    @property
+    def _dict(self) -> Dict[str, str]:
+        # Only read the file when the first message is needed, rather than on import.
+        if self._messages is None:
+            with open(self._path) as fp:
+                self._messages = json.load(fp)
+
+        return self._messages
 
     def get(self, message_id: str, **kwargs) -> str:
         if message_id in self._dict:
@@ -24,9 +57,72 @@ class _Messages:
     def get_content(
             self, message_id: str, format_markdown=False, **kwargs,
     ) -> Dict[str, str]:
-        return to_event_content(
-            self.get(message_id, **kwargs), format_markdown=format_markdown,
-        )
+        messages = self._dict
+
+        # Contents are copied before being returned so callers can't alter the cache.
+        content = self._static_contents.get((message_id, format_markdown))
+        if content is not None:
+            return dict(content)
+
+        if message_id not in messages:
+            return to_event_content(
+                self.get(message_id, **kwargs), format_markdown=format_markdown,
+            )
+
+        if self._static(message_id):
+            body = messages[message_id].format()
+            content = self._render(body) if format_markdown else to_event_content(body)
+            self._static_contents[(message_id, format_markdown)] = content
+            return dict(content)
+
+        if not format_markdown:
+            return to_event_content(self.get(message_id, **kwargs))
+
+        # Exceptions are rendered as their string, and keying on them would keep them
+        # and their traceback alive for as long as they're in the cache.
+        key = (message_id, tuple(sorted(
+            (name, str(value) if isinstance(value, BaseException) else value)
+            for name, value in kwargs.items()
+        )))  # type: Hashable
+        try:
+            content = self._render_cache.get(key)
+        except TypeError:
+            # Some parameters can't be hashed, don't cache this message.
+            return self._render(self.get(message_id, **kwargs))
+
+        if content is not None:
+            self._render_cache.move_to_end(key)
+            return dict(content)
+
+        content = self._render(self.get(message_id, **kwargs))
+
+        self._render_cache[key] = content
+        if len(self._render_cache) > self._render_cache_size:
+            self._render_cache.popitem(last=False)
+
+        return dict(content)
+
+    def _render(self, body: str) -> Dict[str, str]:
+        start = time.perf_counter()
+        content = to_event_content(body, format_markdown=True)
+
+        self.render_count += 1
+        self.render_time += time.perf_counter() - start
+
+        return content
+
+    def _static(self, message_id: str) -> bool:
+        """Whether the message doesn't have any replacement field."""
+        static = self._is_static.get(message_id)
+        if static is None:
+            static = self._is_static[message_id] = all(
+                field is None
+                for _, field, _, _ in string.Formatter().parse(self._dict[message_id])
+            )
+
+        return static
 
 
-messages = _Messages("res/messages.json")
+messages = _Messages(
+    os.path.join(os.path.dirname(__file__), "../res/messages.json"),
+)
@@ -0,0 +1,237 @@
+"""Metrics about the bot's performance, exposed in the Prometheus text format.
+
+Metrics are module-level objects updated in place by the code they measure, so
+recording a value is only a dictionary lookup and a few additions.
+"""
+import bisect
+import contextlib
+import time
+from typing import Callable, Dict, Iterator, List, Sequence, Tuple, TypeVar
+
+# Upper bounds of the buckets of histograms measuring durations, in seconds.
+DEFAULT_BUCKETS = (
+    0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0,
+)
+
+
+def _escape(value: str) -> str:
+    return value.replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _format_labels(names: Sequence[str], values: Sequence[str]) -> str:
+    if not names:
+        return ""
+
+    pairs = ",".join(f'{name}="{_escape(value)}"' for name, value in zip(names, values))
+    return "{" + pairs + "}"
+
+
+def _format_value(value: float) -> str:
+    if value == float("inf"):
+        return "+Inf"
+
+    if float(value).is_integer():
+        return str(int(value))
+
+    return repr(float(value))
+
+
+class _Metric:
+    TYPE = ""
+
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = ()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+
+        # One child per combination of label values, created on first use.
+        self._children = {}  # type: Dict[Tuple[str, ...], object]
+
+    def labels(self, *values: str):
+        """Return the child tracking the values for the given label values."""
+        if len(values) != len(self.labelnames):
+            raise ValueError(
+                f"{self.name} expects {len(self.labelnames)} label values, got "
+                f"{len(values)}"
+            )
+
+        child = self._children.get(values)
+        if child is None:
+            child = self._children[values] = self._new_child()
+
+        return child
+
+    def _new_child(self):
+        raise NotImplementedError()
+
+    def _render_samples(self) -> List[str]:
+        raise NotImplementedError()
+
+    def render(self) -> str:
+        lines = [
+            f"# HELP {self.name} {self.documentation}",
+            f"# TYPE {self.name} {self.TYPE}",
+        ]
+        lines.extend(self._render_samples())
+        return "\n".join(lines) + "\n"
+
+
+class _CounterChild:
+    __slots__ = ("value",)
+
+    def __init__(self):
+        self.value = 0.0
+
+    def inc(self, amount: float = 1):
+        self.value += amount
+
+
+class Counter(_Metric):
+    """A value that only goes up, e.g. a number of errors."""
+    TYPE = "counter"
+
+    def inc(self, amount: float = 1):
+        """Increment a counter without labels."""
+        self.labels().inc(amount)
+
+    def _new_child(self):
+        return _CounterChild()
+
+    def _render_samples(self) -> List[str]:
+        return [
+            f"{self.name}{_format_labels(self.labelnames, values)}"
+            f" {_format_value(child.value)}"
+            for values, child in self._children.items()
+        ]
+
+
+class _HistogramChild:
+    __slots__ = ("_upper_bounds", "counts", "sum")
+
+    def __init__(self, upper_bounds: Sequence[float]):
+        self._upper_bounds = upper_bounds
+        # Number of observations in each bucket, not cumulative.
+        self.counts = [0] * (len(upper_bounds) + 1)
+        self.sum = 0.0
+
+    def observe(self, value: float):
+        self.counts[bisect.bisect_left(self._upper_bounds, value)] += 1
+        self.sum += value
+
+    @contextlib.contextmanager
+    def time(self) -> Iterator[None]:
+        """Observe the duration of the block, in seconds."""
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(time.perf_counter() - start)
+
+
+class Histogram(_Metric):
+    """Counts observed values, e.g. durations, in buckets."""
+    TYPE = "histogram"
+
+    def __init__(
+        self,
+        name: str,
+        documentation: str,
+        labelnames: Sequence[str] = (),
+        buckets: Sequence[float] = DEFAULT_BUCKETS,
+    ):
+        super(Histogram, self).__init__(name, documentation, labelnames)
+        self.buckets = tuple(sorted(buckets))
+        self._formatted_buckets = tuple(
+            _format_value(upper_bound) for upper_bound in self.buckets + (float("inf"),)
+        )
+
+    def _new_child(self):
+        return _HistogramChild(self.buckets)
+
+    def _render_samples(self) -> List[str]:
+        lines = []
+        for values, child in self._children.items():
+            cumulative = 0
+            for upper_bound, count in zip(self._formatted_buckets, child.counts):
+                cumulative += count
+                labels = _format_labels(
+                    self.labelnames + ("le",), values + (upper_bound,),
+                )
+                lines.append(f"{self.name}_bucket{labels} {cumulative}")
+
+            labels = _format_labels(self.labelnames, values)
+            lines.append(f"{self.name}_sum{labels} {_format_value(child.sum)}")
+            lines.append(f"{self.name}_count{labels} {cumulative}")
+
+        return lines
+
+
+class _FunctionMetric(_Metric):
+    def __init__(self, name: str, documentation: str, func: Callable[[], float]):
+        super(_FunctionMetric, self).__init__(name, documentation)
+        self.func = func
+
+    def _render_samples(self) -> List[str]:
+        return [f"{self.name} {_format_value(self.func())}"]
+
+
+class Gauge(_FunctionMetric):
+    """A value read from the given function when the metrics are collected, e.g. the
+    size of a queue.
+    """
+    TYPE = "gauge"
+
+
+class FunctionCounter(_FunctionMetric):
+    """A total that only goes up, read from the given function when the metrics are
+    collected, e.g. a number of events a component already keeps count of.
+    """
+    TYPE = "counter"
+
+
+M = TypeVar("M", bound=_Metric)
+
+
+class Registry:
+    def __init__(self):
+        self._metrics = []  # type: List[_Metric]
+
+    def register(self, metric: M) -> M:
+        self._metrics.append(metric)
+        return metric
+
+    def render(self) -> str:
+        return "".join(metric.render() for metric in self._metrics)
+
+
+registry = Registry()
+
+command_duration = registry.register(Histogram(
+    "matrix_monzo_command_duration_seconds",
+    "Time taken to run commands, by command prefix.",
+    ["command"],
+))
+command_errors = registry.register(Counter(
+    "matrix_monzo_command_errors_total",
+    "Errors turned into replies while running commands, by command prefix and error.",
+    ["command", "error"],
+))
+monzo_request_duration = registry.register(Histogram(
+    "matrix_monzo_monzo_request_duration_seconds",
+    "Time taken by requests to the Monzo API, by endpoint.",
+    ["method", "endpoint"],
+))
+storage_query_duration = registry.register(Histogram(
+    "matrix_monzo_storage_query_duration_seconds",
+    "Time taken by database transactions, including waiting for a connection, by"
+    " store.",
+    ["store"],
+))
+sync_iterations = registry.register(Counter(
+    "matrix_monzo_sync_iterations_total",
+    "Syncs with the homeserver that succeeded.",
+))
+sync_reconnects = registry.register(Counter(
+    "matrix_monzo_sync_reconnects_total",
+    "Times the sync loop restarted after losing connectivity to the homeserver.",
+))
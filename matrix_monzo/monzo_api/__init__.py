@@ -0,0 +1,466 @@
+import asyncio
+import inspect
+import logging
+import re
+import secrets
+import time
+import uuid
+from collections import OrderedDict
+from typing import Awaitable, Callable, Optional, Tuple, Union
+from urllib.parse import urlencode
+
+import aiohttp
+
+from matrix_monzo import metrics, tracing
+from matrix_monzo.utils.errors import (
+    MonzoAPIError,
+    MonzoBadRequestError,
+    MonzoForbiddenError,
+    MonzoUnauthorizedError,
+)
+
+logger = logging.getLogger(__name__)
+
+API_URL = "https://api.monzo.com"
+AUTH_URL = "https://auth.monzo.com/"
+
+# Refresh the access token if it's going to expire within this number of seconds,
+# rather than sending a request we know will fail.
+TOKEN_EXPIRY_MARGIN = 30
+
+# Matches the IDs of Monzo objects (e.g. pot_00009...) in request paths, so requests
+# to the same endpoint are grouped together in metrics.
+ID_REGEX = re.compile(r"/[a-z]+_[0-9A-Za-z]+")
+
+# Number of seconds during which the outcome of the last request to the Monzo API is
+# trusted to tell whether the token is valid.
+AUTH_STATE_TTL = 300
+
+RefreshCallback = Callable[[dict], Union[Awaitable[None], None]]
+TokenLoader = Callable[[str], Awaitable[Optional[dict]]]
+TokenSaver = Callable[[str, dict], Awaitable[None]]
+EvictionCallback = Callable[[str], None]
+
+
+class MonzoSession:
+    """Holds the aiohttp session shared by every Monzo client, so that all requests to
+    the Monzo API go through the same pool of keep-alive connections.
+
+    The session is created lazily because aiohttp requires a running event loop.
+    """
+    def __init__(self, max_connections: int = 10, keepalive_timeout: int = 60):
+        self.max_connections = max_connections
+        self.keepalive_timeout = keepalive_timeout
+
+        self._session = None  # type: Optional[aiohttp.ClientSession]
+
+    def get(self) -> aiohttp.ClientSession:
+        if self._session is None or self._session.closed:
+            connector = aiohttp.TCPConnector(
+                limit=self.max_connections,
+                keepalive_timeout=self.keepalive_timeout,
+            )
+            self._session = aiohttp.ClientSession(
+                connector=connector,
+                timeout=aiohttp.ClientTimeout(total=30),
+            )
+
+        return self._session
+
+    async def close(self):
+        if self._session is not None and not self._session.closed:
+            await self._session.close()
+
+
+class MonzoClient:
+    """Asynchronous client for the Monzo API.
+
+    Args:
+        session: The shared HTTP session to send requests through.
+        client_id: The ID of the OAuth2 client to use.
+        client_secret: The secret of the OAuth2 client to use.
+        token: The OAuth2 token to authenticate requests with, if any.
+        refresh_callback: Function called with the new token every time it changes,
+            either because of a refresh or of a new login. Can be a coroutine function.
+        api_url: The base URL of the Monzo API.
+    """
+    def __init__(
+        self,
+        session: MonzoSession,
+        client_id: str,
+        client_secret: str,
+        token: Optional[dict] = None,
+        refresh_callback: Optional[RefreshCallback] = None,
+        api_url: str = API_URL,
+    ):
+        self.session = session
+        self.client_id = client_id
+        self.client_secret = client_secret
+        self.refresh_callback = refresh_callback
+        self.api_url = api_url
+
+        # Whether the token was accepted by the Monzo API the last time we used it (None
+        # if we don't know), and when that was.
+        self._authenticated = None  # type: Optional[bool]
+        self._authenticated_at = 0.0
+
+        self.token = token
+
+        self._redirect_uri = None  # type: Optional[str]
+        self._refresh_lock = asyncio.Lock()
+
+    @property
+    def token(self) -> Optional[dict]:
+        return self._token
+
+    @token.setter
+    def token(self, token: Optional[dict]):
+        self._token = token
+        self._set_authenticated(None)
+
+    async def is_authenticated(self) -> bool:
+        """Tell whether the current token can be used to talk to the Monzo API.
+
+        This relies on the token's expiry time and on the outcome of the last request
+        sent with it, and only asks the Monzo API if neither is conclusive.
+        """
+        if not self.token or not self.token.get("access_token"):
+            return False
+
+        expires_at = self.token.get("expires_at")
+        if (
+            expires_at is not None
+            and expires_at < time.time()
+            and not self.token.get("refresh_token")
+        ):
+            return False
+
+        if (
+            self._authenticated is not None
+            and self._authenticated_at + AUTH_STATE_TTL > time.monotonic()
+        ):
+            return self._authenticated
+
+        try:
+            res = await self._request("GET", "/ping/whoami")
+            return bool(res.get("authenticated"))
+        except MonzoUnauthorizedError:
+            return False
+        except MonzoBadRequestError:
+            # The token expired and the Monzo API refused to refresh it, e.g. because
+            # the refresh token has been revoked.
+            self._set_authenticated(False)
+            return False
+
+    def authorize_token_url(self, redirect_uri: str) -> Tuple[str, str]:
+        state = secrets.token_urlsafe(30)
+        self._redirect_uri = redirect_uri
+
+        query = urlencode({
+            "client_id": self.client_id,
+            "redirect_uri": redirect_uri,
+            "response_type": "code",
+            "state": state,
+        })
+
+        return f"{AUTH_URL}?{query}", state
+
+    async def fetch_access_token(
+        self, code: str, redirect_uri: Optional[str] = None,
+    ) -> dict:
+        token = await self._token_request({
+            "grant_type": "authorization_code",
+            "client_id": self.client_id,
+            "client_secret": self.client_secret,
+            "redirect_uri": redirect_uri or self._redirect_uri,
+            "code": code,
+        })
+
+        await self._update_token(token)
+        return token
+
+    async def invalidate_token(self):
+        try:
+            await self._request("POST", "/oauth2/logout")
+        finally:
+            self.token = None
+            self._set_authenticated(False)
+
+    async def get_accounts(self) -> dict:
+        return await self._request("GET", "/accounts")
+
+    async def get_balance(self, account_id: str) -> dict:
+        return await self._request("GET", "/balance", params={"account_id": account_id})
+
+    async def get_pots(self, account_id: str) -> dict:
+        return await self._request(
+            "GET", "/pots", params={"current_account_id": account_id},
+        )
+
+    async def get_transactions(
+        self, account_id: str, since: Optional[str] = None, limit: int = 100,
+    ) -> dict:
+        params = {
+            "account_id": account_id,
+            "limit": limit,
+            # Include the merchants' details rather than just their IDs.
+            "expand[]": "merchant",
+        }
+        if since is not None:
+            params["since"] = since
+
+        return await self._request("GET", "/transactions", params=params)
+
+    async def deposit_into_pot(
+        self, pot_id: str, account_id: str, amount_in_pennies: int,
+    ) -> dict:
+        return await self._request(
+            "PUT",
+            f"/pots/{pot_id}/deposit",
+            data={
+                "source_account_id": account_id,
+                "amount": amount_in_pennies,
+                "dedupe_id": uuid.uuid4().hex,
+            },
+        )
+
+    async def withdraw_from_pot(
+        self, account_id: str, pot_id: str, amount_in_pennies: int,
+    ) -> dict:
+        return await self._request(
+            "PUT",
+            f"/pots/{pot_id}/withdraw",
+            data={
+                "destination_account_id": account_id,
+                "amount": amount_in_pennies,
+                "dedupe_id": uuid.uuid4().hex,
+            },
+        )
+
+    async def list_webhooks(self, account_id: str) -> dict:
+        return await self._request("GET", "/webhooks", params={"account_id": account_id})
+
+    async def register_webhook(self, account_id: str, url: str) -> dict:
+        return await self._request(
+            "POST", "/webhooks", data={"account_id": account_id, "url": url},
+        )
+
+    async def _request(
+        self,
+        method: str,
+        path: str,
+        params: Optional[dict] = None,
+        data: Optional[dict] = None,
+        can_refresh: bool = True,
+    ) -> dict:
+        if not self.token or not self.token.get("access_token"):
+            self._set_authenticated(False)
+            raise MonzoUnauthorizedError("No access token")
+
+        # Don't bother sending a request with a token we know is expired if we can get
+        # a new one.
+        expires_at = self.token.get("expires_at")
+        if (
+            can_refresh
+            and self.token.get("refresh_token")
+            and expires_at is not None
+            and expires_at - TOKEN_EXPIRY_MARGIN < time.time()
+        ):
+            await self._refresh_token(self.token)
+            can_refresh = False
+
+        token = self.token
+        headers = {"Authorization": f"Bearer {token['access_token']}"}
+
+        endpoint = ID_REGEX.sub("/{id}", path)
+        with metrics.monzo_request_duration.labels(method, endpoint).time(), tracing.span(
+            "monzo", method=method, endpoint=endpoint,
+        ) as span:
+            async with self.session.get().request(
+                method, self.api_url + path, params=params, data=data, headers=headers,
+            ) as resp:
+                body = await self._read_body(resp)
+
+            span.set_attribute("status", resp.status)
+
+        if resp.status == 401 and can_refresh and token.get("refresh_token"):
+            # The token might have been revoked or have expired earlier than expected,
+            # try refreshing it once before giving up.
+            await self._refresh_token(token)
+            return await self._request(method, path, params, data, can_refresh=False)
+
+        if resp.status == 401:
+            self._set_authenticated(False)
+        elif resp.status < 400:
+            self._set_authenticated(True)
+
+        self._raise_for_status(resp.status, body)
+        return body
+
+    def _set_authenticated(self, authenticated: Optional[bool]):
+        self._authenticated = authenticated
+        self._authenticated_at = time.monotonic()
+
+    async def _refresh_token(self, expired_token: dict):
+        async with self._refresh_lock:
+            # Another request might have refreshed the token while we were waiting for
+            # the lock, in which case there's nothing to do.
+            if self.token is not expired_token:
+                return
+
+            logger.info("Refreshing Monzo access token")
+
+            token = await self._token_request({
+                "grant_type": "refresh_token",
+                "client_id": self.client_id,
+                "client_secret": self.client_secret,
+                "refresh_token": expired_token["refresh_token"],
+            })
+
+            await self._update_token(token)
+
+    async def _token_request(self, data: dict) -> dict:
+        with metrics.monzo_request_duration.labels(
+            "POST", "/oauth2/token",
+        ).time(), tracing.span("monzo", method="POST", endpoint="/oauth2/token"):
+            async with self.session.get().post(
+                self.api_url + "/oauth2/token", data=data,
+            ) as resp:
+                body = await self._read_body(resp)
+
+        self._raise_for_status(resp.status, body)
+
+        # Compute the absolute expiry time of the token so it survives being stored
+        # and loaded again.
+        if "expires_in" in body:
+            body["expires_at"] = time.time() + body["expires_in"]
+
+        return body
+
+    async def _update_token(self, token: dict):
+        # We've just been given this token by the Monzo API, so it's valid.
+        self.token = token
+        self._set_authenticated(True)
+
+        if self.refresh_callback is not None:
+            res = self.refresh_callback(token)
+            if inspect.isawaitable(res):
+                await res
+
+    @staticmethod
+    async def _read_body(resp: aiohttp.ClientResponse) -> dict:
+        try:
+            return await resp.json(content_type=None)
+        except ValueError:
+            return {"message": await resp.text()}
+
+    @staticmethod
+    def _raise_for_status(status: int, body: dict):
+        if status < 400:
+            return
+
+        message = body.get("message", "") if isinstance(body, dict) else str(body)
+
+        if status == 400:
+            raise MonzoBadRequestError(message, status)
+        elif status == 401:
+            raise MonzoUnauthorizedError(message, status)
+        elif status == 403:
+            raise MonzoForbiddenError(message, status)
+
+        raise MonzoAPIError(message, status)
+
+
+class MonzoClientPool:
+    """Holds one Monzo client per user, all sharing the same HTTP session.
+
+    Clients are created the first time they're needed, with the token loaded from
+    storage, and only the most recently used ones are kept in memory, so that the
+    memory used by the pool doesn't grow with the number of users.
+
+    Args:
+        session: The shared HTTP session to send requests through.
+        client_id: The ID of the OAuth2 client to use.
+        client_secret: The secret of the OAuth2 client to use.
+        load_token: Coroutine function returning the stored token of a user, if any.
+        save_token: Coroutine function storing a user's new token.
+        max_clients: Maximum number of clients to keep in memory.
+        on_evict: Function called with the ID of the user whose client has just been
+            evicted from the pool.
+        api_url: The base URL of the Monzo API.
+    """
+    def __init__(
+        self,
+        session: MonzoSession,
+        client_id: str,
+        client_secret: str,
+        load_token: TokenLoader,
+        save_token: TokenSaver,
+        max_clients: int = 100,
+        on_evict: Optional[EvictionCallback] = None,
+        api_url: str = API_URL,
+    ):
+        self.session = session
+        self.client_id = client_id
+        self.client_secret = client_secret
+        self.load_token = load_token
+        self.save_token = save_token
+        self.max_clients = max_clients
+        self.on_evict = on_evict
+        self.api_url = api_url
+
+        self.hits = 0
+        self.misses = 0
+
+        # Clients by user ID, least recently used first.
+        self._clients = OrderedDict()  # type: OrderedDict
+
+    def __len__(self):
+        return len(self._clients)
+
+    async def get(self, user_id: str, pool: bool = True) -> MonzoClient:
+        """Retrieve the client of a user, creating it if it isn't in memory.
+
+        Args:
+            user_id: The user to retrieve the client of.
+            pool: Whether to keep the client in the pool if it has to be created, and
+                count this as a use of the user's client. Background tasks going
+                through every user should set this to False, so they don't evict the
+                clients of the users actively using the bot.
+        """
+        client = self._clients.get(user_id)
+        if client is not None:
+            if pool:
+                self.hits += 1
+                self._clients.move_to_end(user_id)
+            return client
+
+        if pool:
+            self.misses += 1
+        token = await self.load_token(user_id)
+
+        # Another coroutine might have created the client while we were loading the
+        # token, in which case use that one so there's only one client per user.
+        client = self._clients.get(user_id)
+        if client is None:
+            client = MonzoClient(
+                session=self.session,
+                client_id=self.client_id,
+                client_secret=self.client_secret,
+                token=token,
+                refresh_callback=lambda new_token: self.save_token(user_id, new_token),
+                api_url=self.api_url,
+            )
+            if pool:
+                self._clients[user_id] = client
+                self._evict()
+
+        return client
+
+    def _evict(self):
+        while len(self._clients) > self.max_clients:
+            user_id, _ = self._clients.popitem(last=False)
+            logger.debug("Evicted Monzo client of %s", user_id)
+
+            if self.on_evict is not None:
+                self.on_evict(user_id)
@@ -0,0 +1,148 @@
+import contextlib
+import importlib.abc
+import logging
+import os
+import sys
+import time
+from typing import Dict, List, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+# Set this environment variable to a non-empty value to profile the bot's startup.
+PROFILE_STARTUP_ENV_VAR = "MATRIX_MONZO_PROFILE_STARTUP"
+
+# Number of modules to include in the report, starting with the slowest to import.
+REPORTED_IMPORTS = 25
+
+
+class _TimedLoader:
+    """Wraps a module's loader to time the execution of the module."""
+    def __init__(self, loader, profiler: "StartupProfiler"):
+        self._loader = loader
+        self._profiler = profiler
+
+    def create_module(self, spec):
+        return self._loader.create_module(spec)
+
+    def exec_module(self, module):
+        self._profiler._import_started()
+        try:
+            self._loader.exec_module(module)
+        finally:
+            self._profiler._import_finished(module.__name__)
+
+    def __getattr__(self, item):
+        return getattr(self._loader, item)
+
+
+class _ImportTimer(importlib.abc.MetaPathFinder):
+    """Finds modules using the other finders, and wraps their loaders in a _TimedLoader.
+    """
+    def __init__(self, profiler: "StartupProfiler"):
+        self._profiler = profiler
+
+    def find_spec(self, fullname, path, target=None):
+        for finder in sys.meta_path:
+            if finder is self or not hasattr(finder, "find_spec"):
+                continue
+
+            spec = finder.find_spec(fullname, path, target)
+            if spec is not None:
+                break
+        else:
+            return None
+
+        if spec.loader is not None and hasattr(spec.loader, "exec_module"):
+            spec.loader = _TimedLoader(spec.loader, self._profiler)
+
+        return spec
+
+
+class StartupProfiler:
+    """Records how long each module takes to import and each step of the startup takes,
+    until the first sync with the homeserver completes.
+
+    Profiling is only enabled if the MATRIX_MONZO_PROFILE_STARTUP environment variable
+    is set, otherwise all of this class's methods are no-ops.
+    """
+    def __init__(self):
+        self.enabled = bool(os.environ.get(PROFILE_STARTUP_ENV_VAR))
+
+        self._start = time.perf_counter()
+        self._finder = None  # type: Optional[_ImportTimer]
+
+        # Name, cumulative time and self time of each imported module.
+        self._imports = []  # type: List[Tuple[str, float, float]]
+        # Start time and time spent importing dependencies, for the imports in progress.
+        self._import_stack = []  # type: List[List[float]]
+
+        self._phases = []  # type: List[Tuple[str, float]]
+
+    def start(self):
+        """Start timing imports. Must be called before importing the modules to profile.
+        """
+        if not self.enabled or self._finder is not None:
+            return
+
+        self._start = time.perf_counter()
+        self._finder = _ImportTimer(self)
+        sys.meta_path.insert(0, self._finder)
+
+    @contextlib.contextmanager
+    def phase(self, name: str):
+        """Time a step of the startup."""
+        if not self.enabled:
+            yield
+            return
+
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self._phases.append((name, time.perf_counter() - start))
+
+    def finish(self):
+        """Stop profiling and log the report."""
+        if not self.enabled or self._finder is None:
+            return
+
+        sys.meta_path.remove(self._finder)
+        self._finder = None
+
+        total = time.perf_counter() - self._start
+
+        lines = [
+            "Startup profile (%.1f ms until the first sync completed):" % (total * 1e3),
+        ]
+
+        lines.append("  Steps:")
+        for name, duration in self._phases:
+            lines.append("    %8.1f ms  %s" % (duration * 1e3, name))
+
+        imports_total = sum(self_time for _, _, self_time in self._imports)
+        lines.append(
+            "  Imports (%d modules, %.1f ms in total), cumulative / self:"
+            % (len(self._imports), imports_total * 1e3)
+        )
+        slowest = sorted(self._imports, key=lambda i: i[1], reverse=True)
+        for name, cumulative, self_time in slowest[:REPORTED_IMPORTS]:
+            lines.append(
+                "    %8.1f ms  %8.1f ms  %s" % (cumulative * 1e3, self_time * 1e3, name)
+            )
+
+        logger.info("\n".join(lines))
+
+    def _import_started(self):
+        self._import_stack.append([time.perf_counter(), 0.0])
+
+    def _import_finished(self, name: str):
+        start, children = self._import_stack.pop()
+        cumulative = time.perf_counter() - start
+
+        if self._import_stack:
+            self._import_stack[-1][1] += cumulative
+
+        self._imports.append((name, cumulative, cumulative - children))
+
+
+startup_profiler = StartupProfiler()
@@ -1,23 +1,30 @@
 import logging
 
-import psycopg2
-from psycopg2.extras import LoggingConnection
-
+from matrix_monzo.storage.engines import create_engine
+from matrix_monzo.storage.migrations import run_migrations
 from matrix_monzo.storage.stores.selected_accounts import SelectedAccountsStore
 from matrix_monzo.storage.stores.tokens import TokensStore
+from matrix_monzo.storage.stores.transactions import TransactionsStore
 
 logger = logging.getLogger(__name__)
 
 
 class Storage:
     def __init__(self, db_config):
-        self.conn = psycopg2.connect(connection_factory=LoggingConnection, **db_config)
-        self.conn.initialize(logger)
-        self.cursor = self.conn.cursor()
+        self.engine = create_engine(db_config)
 
-        self.selected_account_store = SelectedAccountsStore(self.conn)
-        self.token_store = TokensStore(self.conn)
+        cache_ttl = db_config.get("cache_ttl")
+        cache_size = db_config.get("cache_size", 1000)
+        self.selected_account_store = SelectedAccountsStore(
+            self.engine, cache_ttl, cache_size,
+        )
+        self.token_store = TokensStore(self.engine, cache_ttl, cache_size)
+        self.transactions_store = TransactionsStore(self.engine)
 
-        logger.info("Database ready")
+    async def setup(self):
+        await run_migrations(self.engine)
 
+        logger.info("Database ready")
 
+    def close(self):
+        self.engine.close()
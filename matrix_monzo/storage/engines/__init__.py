@@ -0,0 +1,76 @@
+import abc
+from typing import Any, Callable, Iterable
+
+from matrix_monzo.utils.errors import ConfigError
+
+# The cursor given to interactions. It follows the DB-API, and statements use the
+# "format" paramstyle (i.e. "%s" placeholders) regardless of the engine.
+Cursor = Any
+
+
+class DatabaseEngine(abc.ABC):
+    """A database backend the stores can run interactions against."""
+    @property
+    @abc.abstractmethod
+    def NAME(self) -> str:
+        pass
+
+    @abc.abstractmethod
+    async def run_interaction(
+        self, f: Callable, *args, readonly: bool = False, **kwargs,
+    ) -> Any:
+        """Run the given function with a cursor on a connection to the database.
+
+        The function is called with the cursor as its first argument. Unless the
+        interaction is read-only, the transaction is committed once the function has
+        returned. Read-only interactions run outside of any transaction, so they don't
+        cost an extra round trip to the database to commit.
+        """
+        pass
+
+    @abc.abstractmethod
+    def table_exists(self, cur: Cursor, table: str) -> bool:
+        pass
+
+    def execute_batch(self, cur: Cursor, statement: str, args: Iterable[tuple]):
+        """Execute the given statement once for each set of arguments, in as few round
+        trips to the database as the engine allows.
+        """
+        cur.executemany(statement, args)
+
+    @abc.abstractmethod
+    def close(self):
+        pass
+
+
+def create_engine(db_config: dict) -> DatabaseEngine:
+    """Create the database engine described by the database section of the config.
+
+    The engine's module is only imported if it's used, so deployments don't need the
+    drivers of the engines they don't use.
+    """
+    db_config = dict(db_config)
+    engine = db_config.pop("engine", "postgres")
+    db_config.pop("cache_ttl", None)
+    db_config.pop("cache_size", None)
+
+    if engine == "postgres":
+        from matrix_monzo.storage.engines.postgres import PostgresEngine
+
+        return PostgresEngine(
+            min_connections=db_config.pop("min_connections", 1),
+            max_connections=db_config.pop("max_connections", 5),
+            **db_config,
+        )
+    elif engine == "sqlite":
+        from matrix_monzo.storage.engines.sqlite import SqliteEngine
+
+        path = db_config.get("path")
+        if not path:
+            raise ConfigError("database.path is required when using SQLite")
+
+        return SqliteEngine(
+            path=path, max_connections=db_config.get("max_connections", 5),
+        )
+
+    raise ConfigError(f"Unknown database engine '{engine}'")
@@ -0,0 +1,90 @@
+import asyncio
+import functools
+import logging
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Callable, Iterable
+
+from psycopg2.extras import LoggingConnection, execute_batch
+from psycopg2.pool import ThreadedConnectionPool
+
+from matrix_monzo.storage.engines import Cursor, DatabaseEngine
+
+logger = logging.getLogger(__name__)
+
+# Number of statements sent to the database in a single round trip by execute_batch.
+BATCH_PAGE_SIZE = 500
+
+
+class _LoggingConnection(LoggingConnection):
+    def __init__(self, *args, **kwargs):
+        super(_LoggingConnection, self).__init__(*args, **kwargs)
+        self.initialize(logger)
+
+
+class PostgresEngine(DatabaseEngine):
+    """A bounded pool of connections to a PostgreSQL database.
+
+    Queries are run on a dedicated thread pool with one thread per connection, so that
+    they never block the event loop, and so that concurrent interactions each get their
+    own connection and cursor. Interactions that can't get a connection straight away
+    wait for one to be released.
+
+    Args:
+        min_connections: Number of connections to open when creating the pool.
+        max_connections: Maximum number of connections the pool can hold.
+        conn_kwargs: Parameters to give psycopg2 to connect to the database.
+    """
+    NAME = "postgres"
+
+    def __init__(self, min_connections: int, max_connections: int, **conn_kwargs):
+        self._pool = ThreadedConnectionPool(
+            min_connections,
+            max_connections,
+            connection_factory=_LoggingConnection,
+            **conn_kwargs,
+        )
+        self._executor = ThreadPoolExecutor(
+            max_workers=max_connections, thread_name_prefix="db",
+        )
+
+    async def run_interaction(
+        self, f: Callable, *args, readonly: bool = False, **kwargs,
+    ) -> Any:
+        loop = asyncio.get_event_loop()
+        return await loop.run_in_executor(
+            self._executor,
+            functools.partial(self._run_interaction, f, readonly, args, kwargs),
+        )
+
+    def _run_interaction(self, f: Callable, readonly: bool, args, kwargs) -> Any:
+        conn = self._pool.getconn()
+        try:
+            conn.autocommit = readonly
+
+            with conn.cursor() as cursor:
+                ret = f(cursor, *args, **kwargs)
+
+            if not readonly:
+                conn.commit()
+
+            return ret
+        except Exception:
+            if not conn.closed and not conn.autocommit:
+                conn.rollback()
+            raise
+        finally:
+            # Discard connections that have been closed, e.g. because the database went
+            # away, so the pool opens a new one next time.
+            self._pool.putconn(conn, close=bool(conn.closed))
+
+    def table_exists(self, cur: Cursor, table: str) -> bool:
+        cur.execute("SELECT to_regclass(%s) IS NOT NULL;", (table,))
+        return cur.fetchone()[0]
+
+    def execute_batch(self, cur: Cursor, statement: str, args: Iterable[tuple]):
+        # psycopg2's executemany runs one round trip per set of arguments.
+        execute_batch(cur, statement, args, page_size=BATCH_PAGE_SIZE)
+
+    def close(self):
+        self._executor.shutdown(wait=True)
+        self._pool.closeall()
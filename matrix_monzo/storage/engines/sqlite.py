@@ -0,0 +1,104 @@
+import asyncio
+import functools
+import logging
+import queue
+import sqlite3
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Callable, Iterable, Optional
+
+from matrix_monzo.storage.engines import Cursor, DatabaseEngine
+
+logger = logging.getLogger(__name__)
+
+
+class _SqliteCursor:
+    """Wraps an SQLite cursor so that it understands the "%s" placeholders the stores'
+    statements use.
+    """
+    def __init__(self, cursor: sqlite3.Cursor):
+        self._cursor = cursor
+
+    def execute(self, statement: str, args: Optional[Iterable] = None):
+        return self._cursor.execute(statement.replace("%s", "?"), args or ())
+
+    def executemany(self, statement: str, args: Iterable[Iterable]):
+        return self._cursor.executemany(statement.replace("%s", "?"), args)
+
+    def __getattr__(self, item):
+        return getattr(self._cursor, item)
+
+
+class SqliteEngine(DatabaseEngine):
+    """An embedded SQLite database, for deployments that don't want to run a database
+    server.
+
+    The database is opened in WAL mode so readers don't block each other or the writer.
+    Like with PostgreSQL, interactions run on a dedicated thread pool with one
+    connection per thread.
+
+    Args:
+        path: Path to the database file.
+        max_connections: Maximum number of connections open at the same time.
+    """
+    NAME = "sqlite"
+
+    def __init__(self, path: str, max_connections: int):
+        self._connections = queue.Queue()  # type: queue.Queue
+        for _ in range(max_connections):
+            self._connections.put(self._connect(path))
+
+        self._executor = ThreadPoolExecutor(
+            max_workers=max_connections, thread_name_prefix="db",
+        )
+
+    @staticmethod
+    def _connect(path: str) -> sqlite3.Connection:
+        # Transactions are managed explicitly in _run_interaction.
+        conn = sqlite3.connect(path, isolation_level=None, check_same_thread=False)
+        conn.execute("PRAGMA journal_mode=WAL;")
+        conn.execute("PRAGMA synchronous=NORMAL;")
+        conn.execute("PRAGMA busy_timeout=5000;")
+        conn.set_trace_callback(logger.debug)
+        return conn
+
+    async def run_interaction(
+        self, f: Callable, *args, readonly: bool = False, **kwargs,
+    ) -> Any:
+        loop = asyncio.get_event_loop()
+        return await loop.run_in_executor(
+            self._executor,
+            functools.partial(self._run_interaction, f, readonly, args, kwargs),
+        )
+
+    def _run_interaction(self, f: Callable, readonly: bool, args, kwargs) -> Any:
+        conn = self._connections.get()
+        cursor = conn.cursor()
+        try:
+            if readonly:
+                return f(_SqliteCursor(cursor), *args, **kwargs)
+
+            # Take the write lock straight away rather than when the first write
+            # happens, so the transaction can't fail half-way because of another writer.
+            cursor.execute("BEGIN IMMEDIATE;")
+            try:
+                ret = f(_SqliteCursor(cursor), *args, **kwargs)
+            except Exception:
+                cursor.execute("ROLLBACK;")
+                raise
+
+            cursor.execute("COMMIT;")
+            return ret
+        finally:
+            cursor.close()
+            self._connections.put(conn)
+
+    def table_exists(self, cur: Cursor, table: str) -> bool:
+        cur.execute(
+            "SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = %s;", (table,),
+        )
+        return cur.fetchone() is not None
+
+    def close(self):
+        self._executor.shutdown(wait=True)
+        while not self._connections.empty():
+            self._connections.get().close()
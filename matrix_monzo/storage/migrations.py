@@ -0,0 +1,207 @@
+import logging
+from typing import Dict, List, Union
+
+from matrix_monzo.storage.engines import Cursor, DatabaseEngine
+
+logger = logging.getLogger(__name__)
+
+# The migrations to apply to the database schema, in order. Each migration is a list of
+# SQL statements, or, if the statements depend on the database engine, a dict mapping
+# the name of each engine to its list of statements. The schema version is the number
+# of migrations that have been applied to the database. Migrations that have been
+# released must never be modified, changes to the schema must be done by appending a
+# new migration to this list.
+MIGRATIONS = [
+    # 1: Initial schema. Databases created before migrations were introduced might
+    # already have these tables.
+    [
+        """
+        CREATE TABLE IF NOT EXISTS selected_accounts (
+            user_id TEXT PRIMARY KEY,
+            account_id TEXT NOT NULL
+        );
+        """,
+        """
+        CREATE TABLE IF NOT EXISTS tokens (
+            user_id TEXT PRIMARY KEY,
+            token_json TEXT NOT NULL
+        );
+        """,
+    ],
+    # 2: Local ledger of the transactions retrieved from the Monzo API.
+    [
+        """
+        CREATE TABLE transactions (
+            id TEXT PRIMARY KEY,
+            account_id TEXT NOT NULL,
+            -- RFC 3339 timestamp, as sent by the Monzo API, so it sorts as text.
+            created TEXT NOT NULL,
+            -- In minor units of the currency, negative for money going out.
+            amount BIGINT NOT NULL,
+            currency TEXT NOT NULL,
+            description TEXT NOT NULL,
+            merchant_name TEXT,
+            category TEXT,
+            transaction_json TEXT NOT NULL
+        );
+        """,
+        """
+        CREATE INDEX transactions_account_created_idx
+            ON transactions(account_id, created);
+        """,
+        # The ID of the last transaction retrieved for each account by the syncer.
+        """
+        CREATE TABLE transactions_sync (
+            account_id TEXT PRIMARY KEY,
+            last_transaction_id TEXT NOT NULL
+        );
+        """,
+    ],
+    # 3: Full-text index on the transactions' merchant, description and notes.
+    {
+        "postgres": [
+            "ALTER TABLE transactions ADD COLUMN notes TEXT;",
+            """
+            UPDATE transactions SET notes = transaction_json::json->>'notes';
+            """,
+            """
+            CREATE INDEX transactions_search_idx ON transactions USING GIN (
+                to_tsvector(
+                    'simple',
+                    COALESCE(merchant_name, '') || ' ' || description || ' '
+                        || COALESCE(notes, '')
+                )
+            );
+            """,
+        ],
+        "sqlite": [
+            "ALTER TABLE transactions ADD COLUMN notes TEXT;",
+            """
+            UPDATE transactions SET notes = json_extract(transaction_json, '$.notes');
+            """,
+            # An external content table, so the text isn't stored twice. It's kept in
+            # sync with the transactions table by the triggers below.
+            """
+            CREATE VIRTUAL TABLE transactions_fts USING fts5(
+                merchant_name, description, notes,
+                content='transactions', content_rowid='rowid'
+            );
+            """,
+            """
+            CREATE TRIGGER transactions_fts_insert AFTER INSERT ON transactions BEGIN
+                INSERT INTO transactions_fts(rowid, merchant_name, description, notes)
+                VALUES (new.rowid, new.merchant_name, new.description, new.notes);
+            END;
+            """,
+            """
+            CREATE TRIGGER transactions_fts_delete AFTER DELETE ON transactions BEGIN
+                INSERT INTO transactions_fts(
+                    transactions_fts, rowid, merchant_name, description, notes
+                )
+                VALUES (
+                    'delete', old.rowid, old.merchant_name, old.description, old.notes
+                );
+            END;
+            """,
+            """
+            CREATE TRIGGER transactions_fts_update AFTER UPDATE ON transactions BEGIN
+                INSERT INTO transactions_fts(
+                    transactions_fts, rowid, merchant_name, description, notes
+                )
+                VALUES (
+                    'delete', old.rowid, old.merchant_name, old.description, old.notes
+                );
+                INSERT INTO transactions_fts(rowid, merchant_name, description, notes)
+                VALUES (new.rowid, new.merchant_name, new.description, new.notes);
+            END;
+            """,
+            "INSERT INTO transactions_fts(transactions_fts) VALUES ('rebuild');",
+        ],
+    },
+    # 4: Whether each transaction counts as spending, i.e. it wasn't declined and isn't
+    # a transfer to or from a pot, or another internal transfer Monzo leaves out of
+    # spending.
+    {
+        "postgres": [
+            """
+            ALTER TABLE transactions
+                ADD COLUMN is_spending BOOLEAN NOT NULL DEFAULT TRUE;
+            """,
+            """
+            UPDATE transactions SET is_spending = (
+                COALESCE(transaction_json::json->>'decline_reason', '') = ''
+                AND COALESCE(transaction_json::json->>'include_in_spending', 'true')
+                    <> 'false'
+                AND COALESCE(transaction_json::json->'metadata'->>'pot_id', '') = ''
+            );
+            """,
+        ],
+        "sqlite": [
+            """
+            ALTER TABLE transactions
+                ADD COLUMN is_spending BOOLEAN NOT NULL DEFAULT TRUE;
+            """,
+            """
+            UPDATE transactions SET is_spending = (
+                COALESCE(json_extract(transaction_json, '$.decline_reason'), '') = ''
+                AND COALESCE(json_extract(transaction_json, '$.include_in_spending'), 1)
+                    != 0
+                AND COALESCE(json_extract(transaction_json, '$.metadata.pot_id'), '')
+                    = ''
+            );
+            """,
+        ],
+    },
+]  # type: List[Union[List[str], Dict[str, List[str]]]]
+
+
+async def run_migrations(engine: DatabaseEngine):
+    """Bring the database schema up to date.
+
+    If the schema is already up to date, this only costs a single read-only
+    interaction.
+    """
+    version = await engine.run_interaction(
+        _get_schema_version, engine, readonly=True,
+    )
+
+    if version >= len(MIGRATIONS):
+        logger.info("Database schema is up to date (version %d)", version)
+        return
+
+    await engine.run_interaction(_apply_migrations, version, engine.NAME)
+
+
+def _get_schema_version(cur: Cursor, engine: DatabaseEngine) -> int:
+    if not engine.table_exists(cur, "schema_version"):
+        return 0
+
+    cur.execute("SELECT version FROM schema_version;")
+
+    row = cur.fetchone()
+    return row[0] if row else 0
+
+
+def _apply_migrations(cur: Cursor, current_version: int, engine_name: str):
+    cur.execute("""
+        CREATE TABLE IF NOT EXISTS schema_version (
+            version INTEGER NOT NULL
+        );
+    """)
+
+    if current_version == 0:
+        cur.execute("INSERT INTO schema_version (version) VALUES (0);")
+
+    # All pending migrations are applied in the same transaction, so a failing
+    # migration leaves the schema as it was.
+    for version in range(current_version + 1, len(MIGRATIONS) + 1):
+        logger.info("Applying database migration %d", version)
+
+        statements = MIGRATIONS[version - 1]
+        if isinstance(statements, dict):
+            statements = statements[engine_name]
+
+        for statement in statements:
+            cur.execute(statement)
+
+    cur.execute("UPDATE schema_version SET version = %s;", (len(MIGRATIONS),))
@@ -1,30 +1,53 @@
 from typing import Callable, Optional
 
-import psycopg2
-from psycopg3 import Connection
-from psycopg3.cursor import Cursor
+from matrix_monzo import metrics, tracing
+from matrix_monzo.storage.engines import Cursor, DatabaseEngine
+from matrix_monzo.utils.cache import TTLCache
 
+# Returned by caches on a miss, so that None can be cached as a valid value.
+MISSING = object()
 
-class Store:
-    def __init__(self, conn: Connection):
-        self.conn = conn
 
-    def with_transaction(self, f: Callable, *args, **kwargs):
-        cursor = self.conn.cursor()
-        f(cursor, *args, **kwargs)
-        self.conn.commit()
+class Store:
+    def __init__(
+        self,
+        engine: DatabaseEngine,
+        cache_ttl: Optional[float] = None,
+        cache_size: Optional[int] = None,
+    ):
+        self.engine = engine
+
+        # Write-through cache of the rows this store manages. Stores update it whenever
+        # they write to the database, so it only needs to expire if something else
+        # writes to the same database.
+        self.cache = TTLCache(ttl=cache_ttl, max_size=cache_size)
+
+        self._query_duration = metrics.storage_query_duration.labels(type(self).__name__)
+
+    async def with_transaction(self, f: Callable, *args, **kwargs):
+        return await self._run_interaction(f.__name__, f, *args, **kwargs)
+
+    async def execute_in_transaction(
+        self, statement: str, args: Optional[tuple] = None, readonly: bool = False,
+    ):
+        def execute_statement(cur: Cursor):
+            cur.execute(statement, args)
 
-        try:
-            ret = cursor.fetchall()
-        except psycopg2.ProgrammingError:
-            ret = None
+            # Only statements returning rows have a description.
+            if cur.description is None:
+                return None
 
-        cursor.close()
+            return cur.fetchall()
 
-        return ret
+        # Only spend time making the statement readable if it's going to be recorded.
+        query = " ".join(statement.split()) if tracing.is_tracing() else ""
+        return await self._run_interaction(query, execute_statement, readonly=readonly)
 
-    def execute_in_transaction(self, statement: str, args: Optional[tuple] = None):
-        def execute_statement(cur: Cursor):
-            cur.execute(statement, args)
+    async def execute_read(self, statement: str, args: Optional[tuple] = None):
+        return await self.execute_in_transaction(statement, args, readonly=True)
 
-        return self.with_transaction(execute_statement)
+    async def _run_interaction(self, description: str, f: Callable, *args, **kwargs):
+        with self._query_duration.time(), tracing.span(
+            "storage", store=type(self).__name__, query=description,
+        ):
+            return await self.engine.run_interaction(f, *args, **kwargs)
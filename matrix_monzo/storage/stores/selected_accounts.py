@@ -1,29 +1,26 @@
-from psycopg3 import Connection
+from typing import List
 
-from matrix_monzo.storage.stores import Store
+from matrix_monzo.storage.stores import MISSING, Store
 
 
 class SelectedAccountsStore(Store):
-    def __init__(self, conn: Connection):
-        super(SelectedAccountsStore, self).__init__(conn)
-
-        self.execute_in_transaction("""
-            CREATE TABLE IF NOT EXISTS selected_accounts (
-                user_id TEXT PRIMARY KEY,
-                account_id TEXT NOT NULL
-            );
-        """)
-
-    def get_selected_account(self, user_id: str):
-        return self.execute_in_transaction(
+    async def get_selected_account(self, user_id: str):
+        rows = self.cache.get(user_id, MISSING)
+        if rows is not MISSING:
+            return rows
+
+        rows = await self.execute_read(
             """
                 SELECT account_id FROM selected_accounts WHERE user_id = %s;
             """,
             (user_id,)
         )
 
-    def set_selected_account(self, user_id: str, account_id: str):
-        self.execute_in_transaction(
+        self.cache.set(user_id, rows)
+        return rows
+
+    async def set_selected_account(self, user_id: str, account_id: str):
+        await self.execute_in_transaction(
             """
                 INSERT INTO selected_accounts(user_id, account_id)
                 VALUES (%s, %s)
@@ -33,3 +30,15 @@ class SelectedAccountsStore(Store):
             """,
             (user_id, account_id)
         )
+
+        self.cache.set(user_id, [(account_id,)])
+
+    async def get_users_for_account(self, account_id: str) -> List[str]:
+        rows = await self.execute_read(
+            """
+                SELECT user_id FROM selected_accounts WHERE account_id = %s;
+            """,
+            (account_id,)
+        )
+
+        return [row[0] for row in rows]
@@ -2,29 +2,17 @@ import json
 import logging
 from typing import Optional
 
-from psycopg3 import Connection
-
-from matrix_monzo.storage.stores import Store
+from matrix_monzo.storage.stores import MISSING, Store
 
 logger = logging.getLogger(__name__)
 
 
 class TokensStore(Store):
-    def __init__(self, conn: Connection):
-        super(TokensStore, self).__init__(conn)
-
-        self.execute_in_transaction("""
-            CREATE TABLE IF NOT EXISTS tokens (
-                user_id TEXT PRIMARY KEY,
-                token_json TEXT NOT NULL
-            );
-        """)
-
-    def store_token(self, user_id: str, token_dict: dict):
+    async def store_token(self, user_id: str, token_dict: dict):
         logger.info("Storing Monzo token for %s", user_id)
 
         token_str = json.dumps(token_dict)
-        self.execute_in_transaction(
+        await self.execute_in_transaction(
             """
             INSERT INTO tokens (user_id, token_json) VALUES(%s, %s)
             ON CONFLICT (user_id) DO UPDATE SET token_json = %s;
@@ -32,15 +20,33 @@ class TokensStore(Store):
             (user_id, token_str, token_str),
         )
 
-    def get_token(self, user_id: str) -> Optional[str]:
-        rows = self.execute_in_transaction(
+        self.cache.set(user_id, token_dict)
+
+    async def get_token(self, user_id: str) -> Optional[dict]:
+        token = self.cache.get(user_id, MISSING)
+        if token is not MISSING:
+            return token
+
+        rows = await self.execute_read(
             """
             SELECT token_json FROM tokens WHERE user_id = %s;
             """,
             (user_id,)
         )
 
-        if rows:
-            return json.loads(rows[0][0])
-        else:
-            return None
+        token = json.loads(rows[0][0]) if rows else None
+        self.cache.set(user_id, token)
+
+        return token
+
+    async def delete_token(self, user_id: str):
+        logger.info("Deleting Monzo token for %s", user_id)
+
+        await self.execute_in_transaction(
+            """
+            DELETE FROM tokens WHERE user_id = %s;
+            """,
+            (user_id,),
+        )
+
+        self.cache.set(user_id, None)
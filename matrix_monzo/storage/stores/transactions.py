@@ -0,0 +1,337 @@
+import json
+import re
+from typing import Iterable, List, Optional, Tuple
+
+from matrix_monzo.storage.engines import Cursor
+from matrix_monzo.storage.stores import Store
+
+UPSERT_TRANSACTION = """
+    INSERT INTO transactions (
+        id, account_id, created, amount, currency, description, merchant_name,
+        category, notes, is_spending, transaction_json
+    )
+    VALUES (%s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s)
+    ON CONFLICT (id) DO UPDATE SET
+        amount = EXCLUDED.amount,
+        is_spending = EXCLUDED.is_spending,
+        description = EXCLUDED.description,
+        merchant_name = EXCLUDED.merchant_name,
+        category = EXCLUDED.category,
+        notes = EXCLUDED.notes,
+        transaction_json = EXCLUDED.transaction_json;
+"""
+
+# The expressions spending can be grouped by, keyed by the name used by callers.
+SPENDING_GROUPS = {
+    "category": "category",
+    # Not every transaction has a merchant, e.g. bank transfers.
+    "merchant": "COALESCE(merchant_name, description)",
+}
+
+# The text indexed for full-text search on PostgreSQL. Must be the same expression as
+# the one the index was created on in the migrations, otherwise the index isn't used.
+POSTGRES_SEARCH_DOCUMENT = """
+    to_tsvector(
+        'simple',
+        COALESCE(merchant_name, '') || ' ' || description || ' '
+            || COALESCE(notes, '')
+    )
+"""
+
+# Number of most recent transactions of an account searches look at first. If enough of
+# them match, the rest of the history isn't looked at, so searching for a frequent term
+# doesn't get slower as the history grows.
+RECENT_SEARCH_WINDOW = 200
+
+
+def _is_spending(transaction: dict) -> bool:
+    """Whether the transaction counts towards spending, the same way it does in the
+    Monzo app.
+    """
+    if transaction.get("decline_reason"):
+        return False
+
+    if transaction.get("include_in_spending") is False:
+        return False
+
+    # Moving money to or from a pot isn't spending it.
+    metadata = transaction.get("metadata")
+    return not (isinstance(metadata, dict) and metadata.get("pot_id"))
+
+
+def _transaction_to_row(transaction: dict) -> tuple:
+    # The merchant is only an ID unless it's been expanded in the request.
+    merchant = transaction.get("merchant")
+    merchant_name = merchant.get("name") if isinstance(merchant, dict) else None
+
+    return (
+        transaction["id"],
+        transaction["account_id"],
+        transaction["created"],
+        transaction["amount"],
+        transaction["currency"],
+        transaction.get("description", ""),
+        merchant_name,
+        transaction.get("category"),
+        transaction.get("notes"),
+        _is_spending(transaction),
+        json.dumps(transaction),
+    )
+
+
+def _search_words(text: str) -> List[str]:
+    # Only keep the characters both full-text search engines consider as part of words,
+    # so the search text can't be interpreted as query syntax.
+    return re.findall(r"\w+", text.casefold())
+
+
+class TransactionsStore(Store):
+    async def add_transactions(
+        self,
+        account_id: str,
+        transactions: Iterable[dict],
+        update_sync_cursor: bool = False,
+    ) -> int:
+        """Insert the given transactions in the ledger, or update them if they're
+        already there, in a single database transaction.
+
+        Args:
+            account_id: The account the transactions belong to.
+            transactions: The transactions, as returned by the Monzo API.
+            update_sync_cursor: Whether to remember the last of these transactions as
+                the one to resume syncing the account from. Only the syncer should do
+                this, since it's the only one retrieving transactions in order and
+                without gaps.
+
+        Returns:
+            The number of transactions written.
+        """
+        rows = [_transaction_to_row(transaction) for transaction in transactions]
+        if not rows:
+            return 0
+
+        def add_transactions_txn(cur: Cursor):
+            self.engine.execute_batch(cur, UPSERT_TRANSACTION, rows)
+
+            if update_sync_cursor:
+                cur.execute(
+                    """
+                    INSERT INTO transactions_sync (account_id, last_transaction_id)
+                    VALUES (%s, %s)
+                    ON CONFLICT (account_id) DO UPDATE
+                        SET last_transaction_id = EXCLUDED.last_transaction_id;
+                    """,
+                    (account_id, rows[-1][0]),
+                )
+
+        await self.with_transaction(add_transactions_txn)
+
+        return len(rows)
+
+    async def get_sync_cursor(self, account_id: str) -> Optional[str]:
+        """Retrieve the creation time of the last transaction the syncer stored for the
+        given account, as an RFC 3339 timestamp, or None if it's never been synced.
+        """
+        rows = await self.execute_read(
+            """
+            SELECT t.created FROM transactions_sync AS s
+            INNER JOIN transactions AS t ON t.id = s.last_transaction_id
+            WHERE s.account_id = %s;
+            """,
+            (account_id,),
+        )
+
+        return rows[0][0] if rows else None
+
+    async def get_transactions(
+        self, account_id: str, limit: int = 20, before: Optional[str] = None,
+    ) -> List[dict]:
+        """Retrieve the most recent transactions of an account from the ledger.
+
+        Args:
+            account_id: The account to retrieve the transactions of.
+            limit: The maximum number of transactions to return.
+            before: If provided, only return transactions created before this
+                RFC 3339 timestamp.
+
+        Returns:
+            The transactions, as returned by the Monzo API, most recent first.
+        """
+        # Only add the condition on the date if needed, as "%s IS NULL OR ..." would
+        # keep the database from using the index on (account_id, created).
+        condition = "account_id = %s"
+        args = (account_id,)  # type: tuple
+        if before is not None:
+            condition += " AND created < %s"
+            args += (before,)
+
+        rows = await self.execute_read(
+            f"""
+            SELECT transaction_json FROM transactions
+            WHERE {condition}
+            ORDER BY created DESC
+            LIMIT %s;
+            """,
+            args + (limit,),
+        )
+
+        return [json.loads(row[0]) for row in rows]
+
+    async def get_spending_by(
+        self, account_id: str, group_by: str, since: str,
+    ) -> List[Tuple[Optional[str], str, int, int]]:
+        """Sum the money spent from an account since the given date, grouped by
+        category or merchant. Declined transactions and transfers to and from pots
+        aren't spending.
+
+        Args:
+            account_id: The account to compute the spending of.
+            group_by: What to group the spending by, one of the keys of SPENDING_GROUPS.
+            since: RFC 3339 timestamp or date (YYYY-MM-DD) to start from.
+
+        Returns:
+            A (group, currency, amount spent, number of transactions) tuple per group,
+            biggest spending first. Amounts are positive, in minor units.
+        """
+        # PostgreSQL sums BIGINTs as NUMERICs, which psycopg2 turns into Decimals, hence
+        # the casts.
+        rows = await self.execute_read(
+            f"""
+            SELECT {SPENDING_GROUPS[group_by]} AS spending_group, currency,
+                CAST(-SUM(amount) AS BIGINT), COUNT(*)
+            FROM transactions
+            WHERE account_id = %s AND created >= %s AND amount < 0 AND is_spending
+            GROUP BY spending_group, currency
+            ORDER BY 3 DESC;
+            """,
+            (account_id, since),
+        )
+
+        return [tuple(row) for row in rows]
+
+    async def get_daily_spending(
+        self, account_id: str, since: str,
+    ) -> List[Tuple[str, str, int]]:
+        """Sum the money spent from an account each day since the given date, in the
+        same way as get_spending_by.
+
+        Args:
+            account_id: The account to compute the spending of.
+            since: RFC 3339 timestamp or date (YYYY-MM-DD) to start from.
+
+        Returns:
+            A (date as YYYY-MM-DD, currency, amount spent) tuple per day with at least
+            one transaction, oldest first. Amounts are positive, in minor units.
+        """
+        # Timestamps start with the date, in UTC.
+        rows = await self.execute_read(
+            """
+            SELECT substr(created, 1, 10) AS day, currency, CAST(-SUM(amount) AS BIGINT)
+            FROM transactions
+            WHERE account_id = %s AND created >= %s AND amount < 0 AND is_spending
+            GROUP BY day, currency
+            ORDER BY day;
+            """,
+            (account_id, since),
+        )
+
+        return [tuple(row) for row in rows]
+
+    async def search_transactions(
+        self, account_id: str, text: str, limit: int, offset: int = 0,
+    ) -> List[dict]:
+        """Search the transactions of an account by merchant, description and notes.
+
+        Every word of the text must be found in the transaction, either as a whole word
+        or as the start of one.
+
+        Args:
+            account_id: The account to search the transactions of.
+            text: The text to search for.
+            limit: The maximum number of transactions to return.
+            offset: The number of matching transactions to skip.
+
+        Returns:
+            The matching transactions, as returned by the Monzo API, most recent first.
+        """
+        words = _search_words(text)
+        if not words:
+            return []
+
+        if self.engine.NAME == "sqlite":
+            # Quote each word so FTS5 doesn't interpret it, and make it a prefix query.
+            query = " ".join(f'"{word}"*' for word in words)
+            # The CROSS JOIN makes SQLite look the matches up in the full-text index
+            # first, rather than scanning the account's transactions and matching each
+            # of them against the query.
+            statement = """
+                SELECT t.transaction_json
+                FROM transactions_fts AS f
+                CROSS JOIN transactions AS t ON (t.rowid = f.rowid)
+                WHERE transactions_fts MATCH %s AND t.account_id = %s
+                ORDER BY t.created DESC
+                LIMIT %s OFFSET %s;
+            """
+            # Transactions are mostly inserted in the order they're created in, so the
+            # recent ones have the highest row IDs, and the full-text index can skip
+            # the matches with lower ones without looking them up in the ledger.
+            recent_statement = """
+                WITH recent AS (
+                    SELECT MIN(rowid) AS first_rowid, MIN(created) AS first_created
+                    FROM (
+                        SELECT rowid, created FROM transactions
+                        WHERE account_id = %s
+                        ORDER BY created DESC
+                        LIMIT %s
+                    )
+                )
+                SELECT t.transaction_json
+                FROM recent
+                CROSS JOIN transactions_fts AS f
+                CROSS JOIN transactions AS t ON (t.rowid = f.rowid)
+                WHERE transactions_fts MATCH %s
+                    AND f.rowid >= recent.first_rowid
+                    AND t.account_id = %s
+                    AND t.created >= recent.first_created
+                ORDER BY t.created DESC
+                LIMIT %s OFFSET %s;
+            """
+        else:
+            query = " & ".join(f"{word}:*" for word in words)
+            statement = f"""
+                SELECT transaction_json FROM transactions
+                WHERE {POSTGRES_SEARCH_DOCUMENT} @@ to_tsquery('simple', %s)
+                    AND account_id = %s
+                ORDER BY created DESC
+                LIMIT %s OFFSET %s;
+            """
+            recent_statement = f"""
+                WITH recent AS (
+                    SELECT MIN(created) AS first_created FROM (
+                        SELECT created FROM transactions
+                        WHERE account_id = %s
+                        ORDER BY created DESC
+                        LIMIT %s
+                    ) AS r
+                )
+                SELECT transaction_json FROM transactions, recent
+                WHERE {POSTGRES_SEARCH_DOCUMENT} @@ to_tsquery('simple', %s)
+                    AND account_id = %s
+                    AND created >= recent.first_created
+                ORDER BY created DESC
+                LIMIT %s OFFSET %s;
+            """
+
+        # If enough of the most recent transactions match, they include the most
+        # recent matches overall. Otherwise the term is rare enough for the full-text
+        # index to find all of its matches quickly.
+        rows = await self.execute_read(
+            recent_statement,
+            (account_id, RECENT_SEARCH_WINDOW, query, account_id, limit, offset),
+        )
+        if len(rows) < limit:
+            rows = await self.execute_read(
+                statement, (query, account_id, limit, offset),
+            )
+
+        return [json.loads(row[0]) for row in rows]
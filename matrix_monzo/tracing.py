@@ -0,0 +1,263 @@
+"""Lightweight tracing of the work done to handle each message sent to the bot.
+
+A trace is started when a message is received, then each step involved in handling it
+(running the command, calls to the Monzo API, database transactions, etc.) records a
+span in it. The current span is carried along in a context variable, so it follows
+the message through coroutines and tasks without being passed around.
+
+Spans are recorded for every message, which only costs a few objects per step. Once a
+trace is finished, it's kept if it was slow or if it's been sampled, in which case
+it's added to an in-memory ring buffer and, if configured so, to a JSON lines file.
+Slow traces are logged too.
+"""
+import contextlib
+import contextvars
+import json
+import logging
+import random
+import secrets
+import time
+from collections import deque
+from typing import Any, Deque, Dict, Iterator, List, Optional, TextIO
+
+logger = logging.getLogger(__name__)
+
+
+class Span:
+    """A step in the handling of a message.
+
+    Times are in seconds, from time.perf_counter.
+    """
+    __slots__ = (
+        "trace", "name", "span_id", "parent_id", "start", "duration", "attributes",
+        "error",
+    )
+
+    def __init__(
+        self,
+        trace: "Trace",
+        name: str,
+        parent_id: Optional[int],
+        attributes: Dict[str, Any],
+    ):
+        self.trace = trace
+        self.name = name
+        self.span_id = len(trace.spans)
+        self.parent_id = parent_id
+        self.start = time.perf_counter()
+        self.duration = None  # type: Optional[float]
+        self.attributes = attributes
+        self.error = None  # type: Optional[str]
+
+        trace.spans.append(self)
+
+    def set_attribute(self, key: str, value: Any):
+        self.attributes[key] = value
+
+    def finish(self):
+        self.duration = time.perf_counter() - self.start
+
+
+class _NoopSpan:
+    """Returned when there's no trace to record a span in, so callers don't have to
+    check.
+    """
+    def set_attribute(self, key: str, value: Any):
+        pass
+
+
+NOOP_SPAN = _NoopSpan()
+
+
+class Trace:
+    def __init__(self, name: str, attributes: Dict[str, Any]):
+        self.trace_id = secrets.token_hex(8)
+        self.started_at = time.time()
+        self.spans = []  # type: List[Span]
+        self.root = Span(self, name, None, attributes)
+
+    def to_dict(self) -> dict:
+        return {
+            "trace_id": self.trace_id,
+            "name": self.root.name,
+            "started_at": self.started_at,
+            "duration_ms": _ms(self.root.duration),
+            "spans": [
+                {
+                    "span_id": span.span_id,
+                    "parent_id": span.parent_id,
+                    "name": span.name,
+                    "offset_ms": _ms(span.start - self.root.start),
+                    "duration_ms": _ms(span.duration),
+                    "attributes": span.attributes,
+                    "error": span.error,
+                }
+                for span in self.spans
+            ],
+        }
+
+    def format_tree(self) -> str:
+        children = {}  # type: Dict[Optional[int], List[Span]]
+        for span in self.spans:
+            children.setdefault(span.parent_id, []).append(span)
+
+        lines = []
+
+        def add_lines(span: Span, depth: int):
+            duration = "unfinished" if span.duration is None else "%.1fms" % (
+                span.duration * 1e3
+            )
+            attributes = " ".join(f"{k}={v}" for k, v in span.attributes.items())
+            error = f" error={span.error}" if span.error else ""
+            lines.append(f"{'  ' * depth}{span.name} {duration} {attributes}{error}")
+
+            for child in children.get(span.span_id, []):
+                add_lines(child, depth + 1)
+
+        add_lines(self.root, 1)
+        return "\n".join(line.rstrip() for line in lines)
+
+
+def _ms(seconds: Optional[float]) -> Optional[float]:
+    return None if seconds is None else round(seconds * 1e3, 3)
+
+
+# The span the code currently running is part of, if any.
+_current_span = contextvars.ContextVar(
+    "current_span", default=None,
+)  # type: contextvars.ContextVar[Optional[Span]]
+
+
+class Tracer:
+    """Records traces and keeps the slow and sampled ones.
+
+    Args:
+        enabled: Whether to record traces at all.
+        sample_rate: Share of the traces to keep, between 0 and 1. Slow traces are
+            always kept.
+        slow_threshold: Number of seconds after which a trace is considered slow, and
+            logged.
+        buffer_size: Number of traces to keep in memory.
+        export_path: Path of a file to append the traces kept to, as JSON lines.
+    """
+    def __init__(
+        self,
+        enabled: bool = True,
+        sample_rate: float = 0.1,
+        slow_threshold: float = 2.0,
+        buffer_size: int = 100,
+        export_path: Optional[str] = None,
+    ):
+        self._export_file = None  # type: Optional[TextIO]
+        self.recent_traces = deque()  # type: Deque[dict]
+        self.configure(enabled, sample_rate, slow_threshold, buffer_size, export_path)
+
+    def configure(
+        self,
+        enabled: bool = True,
+        sample_rate: float = 0.1,
+        slow_threshold: float = 2.0,
+        buffer_size: int = 100,
+        export_path: Optional[str] = None,
+    ):
+        self.close()
+
+        self.enabled = enabled
+        self.sample_rate = sample_rate
+        self.slow_threshold = slow_threshold
+        self.recent_traces = deque(self.recent_traces, maxlen=buffer_size)
+        self.export_path = export_path
+
+        if enabled and export_path:
+            self._export_file = open(export_path, "a")
+
+    def close(self):
+        if self._export_file is not None:
+            self._export_file.close()
+            self._export_file = None
+
+    def start_trace(self, name: str, **attributes: Any) -> Optional[Trace]:
+        """Start a new trace. It's only finished once it's been activated and the
+        activation has ended, so the time until then (e.g. waiting in a queue) is
+        included in it.
+
+        Returns:
+            The trace, or None if tracing is disabled.
+        """
+        if not self.enabled:
+            return None
+
+        return Trace(name, attributes)
+
+    @contextlib.contextmanager
+    def activate(self, trace: Optional[Trace]) -> Iterator[None]:
+        """Record the spans started in the block in the given trace, then finish it."""
+        if trace is None:
+            yield
+            return
+
+        trace.root.set_attribute("wait_ms", _ms(time.perf_counter() - trace.root.start))
+
+        token = _current_span.set(trace.root)
+        try:
+            yield
+        except Exception as e:
+            trace.root.error = repr(e)
+            raise
+        finally:
+            _current_span.reset(token)
+            trace.root.finish()
+            self._trace_finished(trace)
+
+    @contextlib.contextmanager
+    def span(self, name: str, **attributes: Any) -> Iterator[Any]:
+        """Record a span for the block, if it's part of a trace.
+
+        Yields:
+            The span, on which attributes can be set.
+        """
+        parent = _current_span.get()
+        if parent is None:
+            yield NOOP_SPAN
+            return
+
+        span = Span(parent.trace, name, parent.span_id, attributes)
+        token = _current_span.set(span)
+        try:
+            yield span
+        except Exception as e:
+            span.error = repr(e)
+            raise
+        finally:
+            _current_span.reset(token)
+            span.finish()
+
+    def _trace_finished(self, trace: Trace):
+        slow = trace.root.duration >= self.slow_threshold
+        if not slow and random.random() >= self.sample_rate:
+            return
+
+        if slow:
+            logger.warning(
+                "Slow trace %s (%.1fms):\n%s",
+                trace.trace_id, trace.root.duration * 1e3, trace.format_tree(),
+            )
+
+        exported = trace.to_dict()
+        self.recent_traces.append(exported)
+
+        if self._export_file is not None:
+            try:
+                self._export_file.write(json.dumps(exported, default=str) + "\n")
+                self._export_file.flush()
+            except OSError:
+                logger.warning("Failed to export trace", exc_info=True)
+
+
+def is_tracing() -> bool:
+    """Whether the code currently running is part of a trace."""
+    return _current_span.get() is not None
+
+
+tracer = Tracer()
+span = tracer.span
@@ -1,9 +1,7 @@
 from typing import Dict, List, Tuple
 
-import dateutil.parser
-from markdown import markdown
-
 from matrix_monzo.utils.constants import DEFAULT_MSG_TYPE, LETTERS, MsgFormat
+from matrix_monzo.utils.snapshots import SearchIndex
 
 
 def to_event_content(
@@ -17,6 +15,9 @@ def to_event_content(
     }
 
     if format_markdown:
+        # Markdown is slow to import, and not needed until the first formatted reply.
+        from markdown import markdown
+
         content["format"] = MsgFormat.CUSTOM_HTML
         content["formatted_body"] = markdown(body)
 
@@ -33,47 +34,11 @@ def build_account_description(account: dict) -> str:
     return "{owners} current account".format(owners="and".join(owners))
 
 
-def search_through_accounts(
-        s: str, pots: Dict[str, str], accounts: Dict[Tuple, str],
-) -> List[Tuple[str, int]]:
-    # We can easily have duplicated entry if using a list, e.g. if there's only one
-    # account (so we inject the "account" search term) and the user uses the account's ID
-    # we'll end up with two matches for the same account ID.
-    matches = set()
-
-    # If there's only one account, then we can add "account" (so we match "my
-    # account", "main account", "current account", etc.) as the search term matching
-    # this account's ID.
-    if len(accounts) == 1:
-        # Before injecting the search term, make sure it doesn't clash with the name
-        # of a pot.
-        clashing_with_pot = False
-
-        for name in pots.keys():
-            if "account" in name:
-                clashing_with_pot = True
-                break
-
-        if not clashing_with_pot:
-            accounts[("account",)] = accounts[list(accounts.keys())[0]]
-
-    # Iterate over the accounts to see if one matches.
-    for search_params, account_id in accounts.items():
-        # If either the search term or the account's ID is mentioned, then consider
-        # it a match.
-        for term in search_params:
-            index = None
-
-            term_index = find_search_term_in_string(term, s)
-            if term_index >= 0:
-                index = term_index
-            elif account_id.casefold() in s:
-                index = s.index(account_id.casefold())
-
-            if index is not None:
-                matches.add((account_id, index))
-
-    return list(matches)
+def search_through_accounts(s: str, index: SearchIndex) -> List[Tuple[str, int]]:
+    """Return the ID of each account mentioned in the given string, along with the
+    position of the mention.
+    """
+    return [(hit.id, hit.index) for hit in index.search(s).accounts]
 
 
 def find_search_term_in_string(search_term: str, s: str) -> int:
@@ -94,6 +59,9 @@ def find_search_term_in_string(search_term: str, s: str) -> int:
 
 
 def format_date(date_iso: str) -> str:
+    # dateutil is slow to import, and not needed until a command shows a date.
+    import dateutil.parser
+
     creation_date = dateutil.parser.parse(date_iso)
 
     utc_offset = int(creation_date.utcoffset().total_seconds() / 3600)
@@ -0,0 +1,129 @@
+import time
+from collections import OrderedDict
+from typing import Any, Dict, Hashable, Optional, Tuple
+
+
+class TTLCache:
+    """A simple key/value cache whose entries optionally expire.
+
+    Args:
+        ttl: Number of seconds after which an entry expires. If None, entries never
+            expire and stay in the cache until they're invalidated.
+        max_size: Maximum number of entries to keep. If the cache is full, the least
+            recently used entry is evicted to make room for a new one. If None, the
+            cache isn't bounded.
+    """
+    def __init__(self, ttl: Optional[float] = None, max_size: Optional[int] = None):
+        self.ttl = ttl
+        self.max_size = max_size
+
+        self.hits = 0
+        self.misses = 0
+
+        # Least recently used entries first.
+        self._entries = OrderedDict()  # type: OrderedDict
+
+    def get(self, key: Hashable, default: Any = None) -> Any:
+        entry = self._entries.get(key)
+
+        if entry is None or (entry[0] is not None and entry[0] < time.monotonic()):
+            self.misses += 1
+            return default
+
+        self.hits += 1
+        self._entries.move_to_end(key)
+        return entry[1]
+
+    def set(self, key: Hashable, value: Any):
+        expires_at = None if self.ttl is None else time.monotonic() + self.ttl
+        self._entries[key] = (expires_at, value)
+        self._entries.move_to_end(key)
+
+        if self.max_size is not None and len(self._entries) > self.max_size:
+            self._entries.popitem(last=False)
+
+    def invalidate(self, key: Hashable):
+        self._entries.pop(key, None)
+
+
+class SnapshotCache:
+    """Per-user cache of snapshots of data retrieved from the Monzo API (e.g. the list
+    of accounts, or the pots of the selected account).
+
+    Entries expire after a configurable TTL, and are meant to be invalidated explicitly
+    as soon as the bot does something that changes the underlying data.
+
+    Because a snapshot might be retrieved while another command invalidates it, every
+    user has a generation number that's bumped on each invalidation; a snapshot that
+    was retrieved under an older generation is discarded instead of being cached.
+
+    Only the users with cached snapshots have their own generation. The others share
+    one, which is bumped whenever a user is forgotten, so memory only grows with the
+    number of users with cached snapshots rather than with every user ever seen.
+
+    Args:
+        ttl: Number of seconds after which an entry expires. If 0, nothing is cached.
+    """
+    def __init__(self, ttl: float):
+        self.ttl = ttl
+
+        self.hits = 0
+        self.misses = 0
+
+        self._entries = {}  # type: Dict[str, Dict[Hashable, Tuple[float, Any]]]
+        self._generations = {}  # type: Dict[str, int]
+        # The generation of users without their own, and the last generation given out.
+        self._shared_generation = 0
+        self._last_generation = 0
+
+    def __len__(self):
+        """The number of users anything is kept in memory for."""
+        return len(self._entries.keys() | self._generations.keys())
+
+    @property
+    def hit_rate(self) -> float:
+        total = self.hits + self.misses
+        return self.hits / total if total else 0.0
+
+    def generation(self, user_id: str) -> int:
+        return self._generations.get(user_id, self._shared_generation)
+
+    def get(self, user_id: str, key: Hashable) -> Optional[Any]:
+        entry = self._entries.get(user_id, {}).get(key)
+
+        if entry is None or entry[0] < time.monotonic():
+            self.misses += 1
+            return None
+
+        self.hits += 1
+        return entry[1]
+
+    def set(self, user_id: str, key: Hashable, value: Any, generation: int):
+        if self.ttl <= 0 or generation != self.generation(user_id):
+            return
+
+        self._entries.setdefault(user_id, {})[key] = (time.monotonic() + self.ttl, value)
+
+    def invalidate(self, user_id: str, *keys: Hashable):
+        entries = self._entries.get(user_id, {})
+        for key in keys:
+            entries.pop(key, None)
+
+        if entries:
+            self._generations[user_id] = self._next_generation()
+        else:
+            self.invalidate_user(user_id)
+
+    def invalidate_user(self, user_id: str):
+        """Forget everything about the user. Snapshots being retrieved for them, or for
+        any other user without their own generation, won't be cached.
+        """
+        self._entries.pop(user_id, None)
+        self._generations.pop(user_id, None)
+        self._shared_generation = self._next_generation()
+
+    def _next_generation(self) -> int:
+        # Generations only ever go up, so a user's new generation is always different
+        # from the ones snapshots being retrieved for them were started under.
+        self._last_generation += 1
+        return self._last_generation
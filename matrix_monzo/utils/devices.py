@@ -0,0 +1,67 @@
+import logging
+from typing import Dict, Set
+
+from nio import AsyncClient, KeysQueryResponse, SyncResponse
+from nio.crypto import OlmDevice
+
+logger = logging.getLogger(__name__)
+
+
+class VerifiedDevices:
+    """In-memory view of the devices we've verified, for each user.
+
+    A user's verified devices are read from the client's device store the first time
+    they're needed, then kept up to date when a device is verified through this class.
+    They're forgotten and read again lazily when the homeserver reports a change in the
+    user's device list.
+
+    Args:
+        nio_client: The client whose device store to read from.
+    """
+    def __init__(self, nio_client: AsyncClient):
+        self.nio_client = nio_client
+
+        self._verified = {}  # type: Dict[str, Set[str]]
+
+        self.nio_client.add_response_callback(self._on_sync, SyncResponse)
+        self.nio_client.add_response_callback(self._on_keys_query, KeysQueryResponse)
+
+    def has_verified_device(self, user_id: str) -> bool:
+        return bool(self._get_verified_devices(user_id))
+
+    def is_verified(self, user_id: str, device_id: str) -> bool:
+        return device_id in self._get_verified_devices(user_id)
+
+    def verify(self, device: OlmDevice):
+        """Mark the provided device as verified, in the client's store and in the view.
+
+        Args:
+            device: The device to verify.
+        """
+        self.nio_client.verify_device(device)
+        self._get_verified_devices(device.user_id).add(device.device_id)
+
+    def invalidate(self, *user_ids: str):
+        for user_id in user_ids:
+            self._verified.pop(user_id, None)
+
+    def _get_verified_devices(self, user_id: str) -> Set[str]:
+        devices = self._verified.get(user_id)
+        if devices is None:
+            devices = {
+                device.device_id
+                for device in self.nio_client.device_store.active_user_devices(user_id)
+                if device.verified
+            }
+            self._verified[user_id] = devices
+
+        return devices
+
+    async def _on_sync(self, response: SyncResponse):
+        changed = response.devices.changed + response.devices.left
+        if changed:
+            logger.debug("Device lists changed for %s", changed)
+            self.invalidate(*changed)
+
+    async def _on_keys_query(self, response: KeysQueryResponse):
+        self.invalidate(*response.changed.keys())
@@ -1,4 +1,4 @@
-from typing import Dict
+from typing import Dict, Optional
 
 
 class ConfigError(RuntimeError):
@@ -32,3 +32,27 @@ class InvalidParamsError(ClientError):
 
 class ProcessingError(ClientError):
     pass
+
+
+class MonzoAPIError(Exception):
+    """An error returned by the Monzo API.
+
+    Args:
+        message: The error message returned by the API.
+        status: The HTTP status code of the response, if any.
+    """
+    def __init__(self, message: str, status: Optional[int] = None):
+        super(MonzoAPIError, self).__init__(message)
+        self.status = status
+
+
+class MonzoBadRequestError(MonzoAPIError):
+    pass
+
+
+class MonzoUnauthorizedError(MonzoAPIError):
+    pass
+
+
+class MonzoForbiddenError(MonzoAPIError):
+    pass
@@ -1,27 +1,82 @@
+import asyncio
 import logging
-from typing import Dict, Tuple
-
-from monzo import Monzo, MonzoOAuth2Client
-from monzo.errors import UnauthorizedError
-from nio import AsyncClient, AsyncClientConfig
-from oauthlib.oauth2.rfc6749.errors import MissingTokenError
-
+import time
+from typing import (
+    Any,
+    Awaitable,
+    Callable,
+    Dict,
+    Hashable,
+    Iterable,
+    Optional,
+    Set,
+    Tuple,
+    Union,
+)
+
+import aiohttp
+from nio import AsyncClient, AsyncClientConfig, SyncError, SyncResponse
+
+from matrix_monzo import metrics, tracing
 from matrix_monzo.config import Config
 from matrix_monzo.messages import messages
+from matrix_monzo.monzo_api import MonzoClient, MonzoClientPool, MonzoSession
+from matrix_monzo.profiling import startup_profiler
 from matrix_monzo.storage import Storage
-from matrix_monzo.utils.errors import MonzoInvalidStateError, ProcessingError
+from matrix_monzo.utils.cache import SnapshotCache
+from matrix_monzo.utils.devices import VerifiedDevices
+from matrix_monzo.utils.errors import (
+    MonzoAPIError,
+    MonzoInvalidStateError,
+    ProcessingError,
+)
+from matrix_monzo.utils.scheduler import CommandScheduler
+from matrix_monzo.utils.sender import MessageSender
+from matrix_monzo.utils.snapshots import AccountsSnapshot, PotsSnapshot
+from matrix_monzo.utils.sync_filter import build_sync_filter, get_sync_filter_id
+from matrix_monzo.utils.transactions import TransactionsSyncer
 
 logger = logging.getLogger(__name__)
 
+# Errors the homeserver answers a sync with, along with a 400 status, when it doesn't
+# know the token to resume from (e.g. Synapse's "Invalid stream token").
+INVALID_SYNC_TOKEN_ERRCODES = {"M_UNKNOWN", "M_UNKNOWN_TOKEN", "M_INVALID_PARAM"}
+
+# Maximum number of seconds to wait between two attempts at resuming syncing.
+MAX_RESUME_RETRY_DELAY = 60
+
 
 class Instance:
     def __init__(self, config: Config):
         self.config = config
 
+        tracing.tracer.configure(
+            enabled=self.config.tracing_enabled,
+            sample_rate=self.config.tracing_sample_rate,
+            slow_threshold=self.config.tracing_slow_threshold,
+            buffer_size=self.config.tracing_buffer_size,
+            export_path=self.config.tracing_export_path,
+        )
+
         self.storage = Storage(self.config.database)
 
-        self._monzo_oauth_client = self.setup_monzo_oauth_client()
-        self.monzo_client: Monzo = Monzo.from_oauth_session(self._monzo_oauth_client)
+        self.monzo_session = MonzoSession(
+            max_connections=self.config.monzo_max_connections,
+        )
+        self.monzo_snapshots = SnapshotCache(ttl=self.config.monzo_cache_ttl)
+        self.monzo_clients = MonzoClientPool(
+            session=self.monzo_session,
+            client_id=self.config.monzo_client_id,
+            client_secret=self.config.monzo_client_secret,
+            load_token=self.storage.token_store.get_token,
+            save_token=self.storage.token_store.store_token,
+            max_clients=self.config.monzo_max_clients,
+            # Users whose client isn't in memory anymore probably haven't used the bot
+            # recently, so their snapshots won't be needed soon either.
+            on_evict=self.monzo_snapshots.invalidate_user,
+            api_url=self.config.monzo_api_url,
+        )
+        self.transactions_syncer = TransactionsSyncer(self.storage.transactions_store)
 
         self.nio_client = AsyncClient(
             self.config.homeserver_url,
@@ -34,118 +89,364 @@ class Instance:
             ),
             store_path=self.config.store_path,
         )
+        self.nio_client.add_response_callback(self._on_sync, SyncResponse)
+        self.verified_devices = VerifiedDevices(self.nio_client)
+        self.message_sender = MessageSender(
+            self.nio_client, typing_delay=self.config.typing_delay,
+        )
+        # The ID or definition of the filter to sync with, if any. Set when starting to
+        # sync, as it depends on the callbacks registered.
+        self.sync_filter = None  # type: Optional[Union[str, Dict[str, Any]]]
 
-        self.auths_in_progress = {}
-
-    def setup_monzo_oauth_client(self):
-        def refresh_token_in_store(token):
-            self.storage.token_store.store_token(self.config.owner_id, token)
-
-        existing_token = self.storage.token_store.get_token(self.config.owner_id)
-        if existing_token:
-            return MonzoOAuth2Client(
-                client_id=self.config.monzo_client_id,
-                client_secret=self.config.monzo_client_secret,
-                access_token=existing_token.get("access_token"),
-                refresh_token=existing_token.get("refresh_token"),
-                expires_at=existing_token.get("expires_at"),
-                refresh_callback=refresh_token_in_store,
-            )
-        else:
-            return MonzoOAuth2Client(
-                client_id=self.config.monzo_client_id,
-                client_secret=self.config.monzo_client_secret,
-                refresh_callback=refresh_token_in_store,
-            )
+        self.command_scheduler = CommandScheduler(
+            max_workers=self.config.command_workers,
+        )
+
+        # Maps the state of each login in progress to the room the login was started
+        # from and the user logging in.
+        self.auths_in_progress = {}  # type: Dict[str, Tuple[str, str]]
+
+        # IDs of the accounts we know Monzo sends webhooks to us for.
+        self.webhook_account_ids = set()  # type: Set[str]
+
+        # Messages sent before this time, in milliseconds since the epoch, aren't run as
+        # commands. Only set while retrieving the full state of the rooms without a sync
+        # token, as their recent messages might have been handled already.
+        self.ignore_messages_before = None  # type: Optional[int]
+
+    async def setup(self):
+        # Monzo clients are only created when a user needs one, so there's nothing to
+        # load for each user here.
+        await self.storage.setup()
 
     async def run(self):
-        # First do a sync with full_state = true to retrieve the state of the rooms.
-        await self.nio_client.sync(full_state=True)
+        # Commands can be received as soon as the first sync, so start running them now.
+        self.command_scheduler.start()
+
+        if self.config.sync_filter:
+            with startup_profiler.phase("Setting up the sync filter"):
+                self.sync_filter = await get_sync_filter_id(
+                    self.nio_client,
+                    build_sync_filter(
+                        self.nio_client,
+                        timeline_limit=self.config.sync_timeline_limit,
+                        lazy_load_members=self.config.sync_lazy_load_members,
+                    ),
+                    self.config.store_path,
+                )
+
+        await self._initial_sync()
         logger.info("Initialisation complete, now syncing")
+        startup_profiler.finish()
+
+        if self.config.monzo_transactions_sync_interval > 0:
+            asyncio.ensure_future(self._sync_monzo_transactions_forever())
 
         while True:
             try:
-                await self.nio_client.sync_forever(30000)
+                await self.nio_client.sync_forever(30000, sync_filter=self.sync_filter)
             except Exception:
+                metrics.sync_reconnects.inc()
                 logger.info("Connectivity to the homeserver has been lost, retrying...")
 
-    def get_monzo_login_url(self, room_id: str) -> str:
-        redirect_uri = self.config.http_baseurl + "/auth_callback"
+    async def _on_sync(self, response: SyncResponse):
+        metrics.sync_iterations.inc()
+
+    async def _initial_sync(self):
+        """Catch up with the homeserver before syncing continuously.
+
+        If the previous run stored a sync token, resume from it so only what changed
+        since then is retrieved. The full state of the rooms is only retrieved on the
+        first run, or if the homeserver doesn't know the stored token anymore.
+        """
+        token = self.nio_client.loaded_sync_token
+        if token and self.config.resume_sync:
+            start = time.perf_counter()
+            with startup_profiler.phase("Initial sync (resumed)"):
+                resumed = await self._resume_sync(token)
+
+            if resumed:
+                logger.info(
+                    f"Resumed syncing from the stored sync token in"
+                    f" {time.perf_counter() - start:.2f}s"
+                )
+                return
+
+            # Otherwise nio would use the stored token again.
+            self.nio_client.loaded_sync_token = None
+
+        # Without a token, the recent messages of each room are retrieved along with
+        # its state, and the previous run might have run them already.
+        if not self.nio_client.loaded_sync_token:
+            self.ignore_messages_before = int(time.time() * 1000)
+
+        start = time.perf_counter()
+        try:
+            with startup_profiler.phase("Initial sync (full state)"):
+                await self.nio_client.sync(full_state=True, sync_filter=self.sync_filter)
+        finally:
+            self.ignore_messages_before = None
+        logger.info(
+            f"Retrieved the full state of the rooms in {time.perf_counter() - start:.2f}s"
+        )
+
+    async def _resume_sync(self, token: str) -> bool:
+        """Sync from the given token, retrying until the homeserver either accepts it
+        or says it doesn't know it.
+
+        Returns:
+            Whether the homeserver accepted the token.
+        """
+        delay = 1
+        while True:
+            try:
+                res = await self.nio_client.sync(
+                    since=token, sync_filter=self.sync_filter,
+                )
+            except Exception as e:
+                res = e
+
+            if isinstance(res, SyncResponse):
+                return True
+
+            if self._is_invalid_sync_token(res):
+                logger.warning(
+                    f"The homeserver doesn't know the stored sync token ({res}),"
+                    f" retrieving the full state of the rooms instead"
+                )
+                return False
+
+            logger.warning(
+                f"Failed to resume syncing from the stored sync token ({res}), retrying"
+                f" in {delay}s"
+            )
+            await asyncio.sleep(delay)
+            delay = min(delay * 2, MAX_RESUME_RETRY_DELAY)
 
-        url, state = self._monzo_oauth_client.authorize_token_url(
-            redirect_uri=redirect_uri,
+    @staticmethod
+    def _is_invalid_sync_token(res: Any) -> bool:
+        # Server errors can come with the same error codes, so check the status too.
+        return (
+            isinstance(res, SyncError)
+            and res.transport_response is not None
+            and res.transport_response.status == 400
+            and res.status_code in INVALID_SYNC_TOKEN_ERRCODES
         )
 
-        self.auths_in_progress[state] = room_id
+    async def close(self):
+        await self.command_scheduler.close()
+        await self.message_sender.flush()
+        await self.nio_client.close()
+        await self.monzo_session.close()
+        self.storage.close()
+        tracing.tracer.close()
+
+    async def get_monzo_client(self, user_id: str) -> MonzoClient:
+        return await self.monzo_clients.get(user_id)
+
+    @property
+    def monzo_redirect_uri(self) -> str:
+        return self.config.http_baseurl + "/auth_callback"
+
+    async def get_monzo_login_url(self, user_id: str, room_id: str) -> str:
+        client = await self.get_monzo_client(user_id)
+        url, state = client.authorize_token_url(redirect_uri=self.monzo_redirect_uri)
+
+        self.auths_in_progress[state] = (room_id, user_id)
 
         return url
 
-    def get_monzo_access_token(self, code, state):
+    async def get_monzo_access_token(self, code, state):
         if state not in self.auths_in_progress:
             raise MonzoInvalidStateError()
 
-        return (
-            self._monzo_oauth_client.fetch_access_token(code=code),
-            self.auths_in_progress[state],
+        room_id, user_id = self.auths_in_progress.pop(state)
+
+        # The client given the token will store it.
+        client = await self.get_monzo_client(user_id)
+        token = await client.fetch_access_token(
+            code=code, redirect_uri=self.monzo_redirect_uri,
         )
 
-    def is_logged_in(self) -> bool:
-        existing_token = self.storage.token_store.get_token(self.config.owner_id)
-        if not existing_token:
-            return False
+        return token, room_id
+
+    async def is_logged_in(self, user_id: str) -> bool:
+        return await (await self.get_monzo_client(user_id)).is_authenticated()
 
+    async def invalidate_monzo_token(self, user_id: str):
         try:
-            self.monzo_client.get_accounts()
-            return True
-        except (UnauthorizedError, MissingTokenError):
-            return False
+            await (await self.get_monzo_client(user_id)).invalidate_token()
+        finally:
+            # Otherwise the token would be loaded again next time the user's client is
+            # created.
+            await self.storage.token_store.delete_token(user_id)
+            self.monzo_snapshots.invalidate_user(user_id)
 
-    def invalidate_monzo_token(self):
-        return self._monzo_oauth_client.invalidate_token()
+    @property
+    def monzo_webhook_url(self) -> Optional[str]:
+        if not self.config.http_webhook_secret:
+            return None
 
-    def get_monzo_accounts_for_search(self) -> Tuple[Dict[Tuple, str], dict]:
-        # Retrieve the list of accounts for this user against the Monzo API.
-        res = self.monzo_client.get_accounts()
+        return f'{self.config.http_baseurl}/webhook/{self.config.http_webhook_secret}'
 
-        # Iterate over the accounts and add the open accounts in a dict that maps search
-        # terms to an account's ID. Currently, the search terms is a comma-separated list
-        # of the account's owners.
-        accounts = {}
-        for account in res["accounts"]:
-            if account["closed"]:
-                continue
+    async def register_monzo_webhook(self, user_id: str):
+        """Make sure Monzo sends webhooks about the user's selected account to us.
 
-            owners_names = []
-            for owner in account["owners"]:
-                owners_names.append(owner["preferred_name"])
+        Failing to register the webhook isn't fatal, the bot still works without it but
+        relies on its cached snapshots expiring to see new transactions.
 
-            accounts[tuple(owners_names)] = account["id"]
+        Args:
+            user_id: The user whose selected account to register the webhook for.
+        """
+        if self.monzo_webhook_url is None:
+            return
 
-        return accounts, res
+        res = await self.storage.selected_account_store.get_selected_account(user_id)
+        if not res:
+            return
+
+        client = await self.get_monzo_client(user_id)
+        await self._register_monzo_webhook(client, res[0][0])
+
+    async def _register_monzo_webhook(self, client: MonzoClient, account_id: str):
+        url = self.monzo_webhook_url
+        if url is None or account_id in self.webhook_account_ids:
+            return
 
-    def get_monzo_pots_for_search(self) -> Tuple[Dict[str, str], dict]:
-        res = self.get_monzo_pots_for_selected_account()
+        try:
+            webhooks = (await client.list_webhooks(account_id))["webhooks"]
+            if not any(webhook["url"] == url for webhook in webhooks):
+                await client.register_webhook(account_id, url)
+                logger.info(f"Registered webhook for account {account_id}")
+        except (MonzoAPIError, aiohttp.ClientError) as e:
+            logger.warning(f"Failed to register webhook for account {account_id}: {e}")
+            return
+
+        self.webhook_account_ids.add(account_id)
+
+    async def sync_monzo_transactions(self, user_id: str) -> int:
+        """Store the new transactions of the user's selected account in the ledger.
+
+        Also registers the webhook for the account if that hasn't been done since the
+        bot started, e.g. because the account was selected before a restart.
+
+        Returns:
+            The number of transactions stored.
+        """
+        res = await self.storage.selected_account_store.get_selected_account(user_id)
+        if not res:
+            return 0
 
-        # Iterate over the pots and add the non-deleted pots in a dict that maps the
-        # pot's name to its ID.
-        pots = {}
-        for pot in res["pots"]:
-            if pot["deleted"]:
-                continue
+        # This runs for every owner in the background, so don't let it evict the
+        # clients (and with them the snapshots) of the users actively using the bot.
+        client = await self.monzo_clients.get(user_id, pool=False)
+        if not client.token:
+            return 0
 
-            # Case fold the pot's name so we don't run into issues because of the case.
-            pots[pot["name"].casefold()] = pot["id"]
+        account_id = res[0][0]
+        await self._register_monzo_webhook(client, account_id)
 
-        return pots, res
+        return await self.transactions_syncer.sync_account(client, account_id)
 
-    def get_monzo_pots_for_selected_account(self) -> dict:
-        res = self.storage.selected_account_store.get_selected_account(
-            self.config.owner_id,
+    async def _sync_monzo_transactions_forever(self):
+        while True:
+            for user_id in self.config.owner_ids:
+                try:
+                    await self.sync_monzo_transactions(user_id)
+                except Exception:
+                    logger.exception(f"Failed to sync transactions for {user_id}")
+
+            await asyncio.sleep(self.config.monzo_transactions_sync_interval)
+
+    async def handle_monzo_transaction(self, transaction: dict):
+        """Process a transaction Monzo has notified us about through a webhook.
+
+        Args:
+            transaction: The transaction, as sent in the webhook.
+        """
+        # Don't move the syncer's cursor, as it would skip any transaction it hasn't
+        # retrieved yet.
+        await self.storage.transactions_store.add_transactions(
+            transaction["account_id"], [transaction],
         )
 
+        # A transaction changes the account's balance, and can be a transfer from or to
+        # a pot. Joint accounts can be selected by more than one user.
+        user_ids = await self.storage.selected_account_store.get_users_for_account(
+            transaction["account_id"],
+        )
+        for user_id in user_ids:
+            self.invalidate_monzo_snapshots(
+                user_id, pots=True, account_ids=[transaction["account_id"]],
+            )
+
+    async def _get_monzo_snapshot(
+        self, user_id: str, key: Hashable, fetch: Callable[[], Awaitable[Any]],
+    ) -> Any:
+        res = self.monzo_snapshots.get(user_id, key)
+        if res is not None:
+            return res
+
+        generation = self.monzo_snapshots.generation(user_id)
+        res = await fetch()
+        self.monzo_snapshots.set(user_id, key, res, generation)
+
+        return res
+
+    def invalidate_monzo_snapshots(
+        self, user_id: str, pots: bool = False, account_ids: Iterable[str] = (),
+    ):
+        """Invalidate the cached snapshots of data that's just been changed by a command.
+
+        Args:
+            user_id: The user the snapshots belong to.
+            pots: Whether to invalidate the pots of the user's selected account.
+            account_ids: The accounts to invalidate the balance of.
+        """
+        keys = [("balance", account_id) for account_id in account_ids]
+        if pots:
+            keys.append(("pots",))
+
+        self.monzo_snapshots.invalidate(user_id, *keys)
+
+    async def get_monzo_accounts(self, user_id: str) -> dict:
+        return (await self.get_monzo_accounts_for_search(user_id)).raw
+
+    async def get_monzo_balance(self, user_id: str, account_id: str) -> dict:
+        return await self._get_monzo_snapshot(
+            user_id,
+            ("balance", account_id),
+            lambda: self._get_monzo_balance(user_id, account_id),
+        )
+
+    async def _get_monzo_balance(self, user_id: str, account_id: str) -> dict:
+        return await (await self.get_monzo_client(user_id)).get_balance(account_id)
+
+    async def get_monzo_accounts_for_search(self, user_id: str) -> AccountsSnapshot:
+        async def fetch():
+            # Retrieve the list of accounts for this user against the Monzo API.
+            client = await self.get_monzo_client(user_id)
+            return AccountsSnapshot(await client.get_accounts())
+
+        return await self._get_monzo_snapshot(user_id, ("accounts",), fetch)
+
+    async def get_selected_account_id(self, user_id: str) -> str:
+        res = await self.storage.selected_account_store.get_selected_account(user_id)
+
         if not res:
             raise ProcessingError(messages.get_content("no_selected_account_error"))
 
-        # Retrieve the list of pots for this user against the Monzo API.
-        return self.monzo_client.get_pots(res[0][0])
+        return res[0][0]
+
+    async def get_monzo_pots_for_search(self, user_id: str) -> PotsSnapshot:
+        async def fetch():
+            account_id = await self.get_selected_account_id(user_id)
+
+            # Retrieve the list of pots for this user against the Monzo API.
+            client = await self.get_monzo_client(user_id)
+            return PotsSnapshot(await client.get_pots(account_id))
+
+        return await self._get_monzo_snapshot(user_id, ("pots",), fetch)
 
+    async def get_monzo_pots_for_selected_account(self, user_id: str) -> dict:
+        return (await self.get_monzo_pots_for_search(user_id)).raw
@@ -0,0 +1,93 @@
+from collections import deque
+from typing import Dict, List
+
+from matrix_monzo.utils.constants import LETTERS
+
+
+class TermMatcher:
+    """Finds occurrences of many search terms in a string in a single pass over it,
+    using an Aho-Corasick automaton built once from the terms.
+
+    Args:
+        terms: Maps each search term to whether it should only be matched as a whole
+            word, i.e. not when the characters surrounding it are letters.
+    """
+    def __init__(self, terms: Dict[str, bool]):
+        self._whole_word = terms
+
+        # The automaton's nodes: transitions, failure links and the terms ending at each
+        # node. The root node is node 0.
+        self._goto = [{}]  # type: List[Dict[str, int]]
+        self._fail = [0]  # type: List[int]
+        self._out = [[]]  # type: List[List[str]]
+
+        for term in terms.keys():
+            if term:
+                self._insert(term)
+
+        self._build_failure_links()
+
+    def first_indexes(self, s: str) -> Dict[str, int]:
+        """Scan the given string and return, for each term found in it, the index of its
+        first valid occurrence.
+        """
+        indexes = {}  # type: Dict[str, int]
+
+        goto = self._goto
+        fail = self._fail
+        out = self._out
+
+        state = 0
+        for i, c in enumerate(s):
+            while state and c not in goto[state]:
+                state = fail[state]
+            state = goto[state].get(c, 0)
+
+            for term in out[state]:
+                if term in indexes:
+                    continue
+
+                start = i - len(term) + 1
+                if self._whole_word[term] and not self._is_whole_word(s, start, i + 1):
+                    continue
+
+                indexes[term] = start
+
+        return indexes
+
+    def _insert(self, term: str):
+        node = 0
+        for c in term:
+            next_node = self._goto[node].get(c)
+            if next_node is None:
+                next_node = len(self._goto)
+                self._goto.append({})
+                self._fail.append(0)
+                self._out.append([])
+                self._goto[node][c] = next_node
+            node = next_node
+
+        self._out[node].append(term)
+
+    def _build_failure_links(self):
+        queue = deque(self._goto[0].values())
+
+        while queue:
+            node = queue.popleft()
+            for c, child in self._goto[node].items():
+                queue.append(child)
+
+                fallback = self._fail[node]
+                while fallback and c not in self._goto[fallback]:
+                    fallback = self._fail[fallback]
+
+                self._fail[child] = self._goto[fallback].get(c, 0)
+                # Terms ending at the failure node also end here.
+                self._out[child] = self._out[child] + self._out[self._fail[child]]
+
+    @staticmethod
+    def _is_whole_word(s: str, start: int, end: int) -> bool:
+        return not (
+            (start > 0 and s[start - 1] in LETTERS)
+            or (end < len(s) and s[end] in LETTERS)
+        )
@@ -0,0 +1,102 @@
+from typing import Any, Dict, FrozenSet, Iterable, NamedTuple, Optional
+
+
+class _Node:
+    __slots__ = ("children", "value", "skip_words")
+
+    def __init__(self):
+        self.children = {}  # type: Dict[str, _Node]
+        self.value = None  # type: Any
+        self.skip_words = frozenset()  # type: FrozenSet[str]
+
+
+class Route(NamedTuple):
+    value: Any
+    # The prefix the value was registered with.
+    prefix: str
+
+
+class CommandRouter:
+    """Maps command prefixes to values using a trie of the prefixes' words, so that a
+    message is matched against every prefix in a single walk over its first words, and
+    the longest matching prefix always wins regardless of registration order.
+
+    Messages whose words don't all line up with a prefix's (e.g. "showpots") fall back
+    to matching the words as plain string prefixes, as commands always have been.
+    """
+    def __init__(self):
+        self._root = _Node()
+
+    def add(self, prefix: str, value: Any, skip_words: Iterable[str] = ()):
+        """Register a prefix.
+
+        Args:
+            prefix: The prefix, made of one or more words.
+            value: The value to return when a message starts with this prefix.
+            skip_words: Words to ignore in the message after this prefix when looking
+                for longer prefixes.
+        """
+        node = self._root
+        for word in prefix.split():
+            node = node.children.setdefault(word, _Node())
+
+        node.value = Route(value, prefix)
+        node.skip_words = frozenset(skip_words)
+
+    def resolve(self, body: str) -> Optional[Route]:
+        """Return the route registered for the longest prefix of the given message, or
+        None if no prefix matches.
+        """
+        node = self._root
+        route = None  # type: Optional[Route]
+        skip_words = frozenset()  # type: FrozenSet[str]
+
+        for word in body.split():
+            child = node.children.get(word)
+            if child is None:
+                if word in skip_words:
+                    continue
+
+                # The rest of the message is usually the command's parameters, unless
+                # a longer prefix could still match without spaces between words.
+                if node.children:
+                    fallback = self._resolve_unspaced(body)
+                    if fallback is not None and (
+                        route is None or len(fallback.prefix) > len(route.prefix)
+                    ):
+                        route = fallback
+                break
+
+            node = child
+            skip_words = skip_words | node.skip_words
+            if node.value is not None:
+                route = node.value
+
+        return route
+
+    def _resolve_unspaced(self, body: str) -> Optional[Route]:
+        """Same as resolve, but matching each word of the prefixes as the start of the
+        rest of the message, so words don't need to be followed by spaces.
+        """
+        node = self._root
+        route = None  # type: Optional[Route]
+        skip_words = frozenset()  # type: FrozenSet[str]
+        rest = body.lstrip()
+
+        while rest:
+            # Try the longest words first, e.g. "accounts" before "account".
+            for word in sorted(node.children, key=len, reverse=True):
+                if rest.startswith(word):
+                    node = node.children[word]
+                    rest = rest[len(word):].lstrip()
+                    skip_words = skip_words | node.skip_words
+                    if node.value is not None:
+                        route = node.value
+                    break
+            else:
+                first_word, _, remainder = rest.partition(" ")
+                if first_word not in skip_words:
+                    break
+                rest = remainder.lstrip()
+
+        return route
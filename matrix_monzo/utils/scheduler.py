@@ -0,0 +1,123 @@
+import asyncio
+import logging
+import time
+from collections import deque
+from typing import Awaitable, Callable, Deque, Dict, List, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+Job = Callable[[], Awaitable[None]]
+
+
+class CommandScheduler:
+    """Runs the commands sent to the bot outside of the sync loop, on a bounded number
+    of workers.
+
+    Each user has their own queue of commands. A user's commands are run one at a time,
+    in the order they were submitted, while commands from different users run in
+    parallel. Users with pending commands take turns, so a user sending lots of
+    commands doesn't hold up the others.
+
+    Args:
+        max_workers: Maximum number of commands running at the same time.
+    """
+    def __init__(self, max_workers: int = 10):
+        self.max_workers = max_workers
+
+        # Pending commands of each user, along with the time they were submitted at.
+        # Users are removed once they don't have any command left to run.
+        self._queues = {}  # type: Dict[str, Deque[Tuple[float, Job]]]
+        # Users with pending commands and none currently running, in the order they're
+        # going to be served.
+        self._ready = None  # type: Optional[asyncio.Queue]
+        self._workers = []  # type: List[asyncio.Future]
+
+        self.submitted = 0
+        self.completed = 0
+        self.failed = 0
+        # Total and maximum number of seconds commands waited for before running.
+        self.total_wait_time = 0.0
+        self.max_wait_time = 0.0
+
+    @property
+    def queue_depth(self) -> int:
+        """The number of commands queued for all users, including the running ones."""
+        return sum(len(queue) for queue in self._queues.values())
+
+    def user_queue_depth(self, user_id: str) -> int:
+        """The number of commands queued for the given user, including the running one."""
+        queue = self._queues.get(user_id)
+        return len(queue) if queue is not None else 0
+
+    @property
+    def average_wait_time(self) -> float:
+        started = self.completed + self.failed
+        return self.total_wait_time / started if started else 0.0
+
+    def start(self):
+        # The queue is created here rather than in the constructor so it's bound to the
+        # running event loop.
+        if self._ready is None:
+            self._ready = asyncio.Queue()
+
+        for _ in range(self.max_workers - len(self._workers)):
+            self._workers.append(asyncio.ensure_future(self._work()))
+
+    async def close(self):
+        for worker in self._workers:
+            worker.cancel()
+
+        await asyncio.gather(*self._workers, return_exceptions=True)
+        self._workers = []
+
+    def submit(self, user_id: str, job: Job):
+        """Queue a command to run on behalf of the given user.
+
+        Args:
+            user_id: The user who sent the command.
+            job: Coroutine function running the command.
+        """
+        if self._ready is None:
+            self._ready = asyncio.Queue()
+
+        self.submitted += 1
+
+        queue = self._queues.get(user_id)
+        if queue is not None:
+            # The user is either waiting for a worker or being served by one, which will
+            # pick this command up after the current one.
+            queue.append((time.monotonic(), job))
+            return
+
+        self._queues[user_id] = deque([(time.monotonic(), job)])
+        self._ready.put_nowait(user_id)
+
+    async def _work(self):
+        while True:
+            user_id = await self._ready.get()
+            queue = self._queues[user_id]
+
+            submitted_at, job = queue[0]
+            wait_time = time.monotonic() - submitted_at
+            self.total_wait_time += wait_time
+            self.max_wait_time = max(self.max_wait_time, wait_time)
+            logger.debug(f"Running command from {user_id} after {wait_time:.3f}s")
+
+            try:
+                await job()
+                self.completed += 1
+            except asyncio.CancelledError:
+                raise
+            except Exception:
+                self.failed += 1
+                logger.exception(f"Failed to run command from {user_id}")
+            finally:
+                # Only remove the command now, so the user's queue still exists while
+                # it's running and new commands are queued behind it.
+                queue.popleft()
+
+                if queue:
+                    # Go to the back of the line so other users get served too.
+                    self._ready.put_nowait(user_id)
+                else:
+                    del self._queues[user_id]
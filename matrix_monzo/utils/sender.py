@@ -0,0 +1,201 @@
+import asyncio
+import html
+import logging
+from contextlib import asynccontextmanager
+from typing import AsyncIterator, Dict, List
+
+from nio import AsyncClient, RoomSendError
+
+from matrix_monzo.utils.constants import MsgFormat
+
+logger = logging.getLogger(__name__)
+
+# Number of times sending a message is retried after being rate limited, before giving
+# up on it.
+MAX_RETRIES = 5
+
+# How long to wait before retrying after being rate limited, if the homeserver doesn't
+# say.
+DEFAULT_RETRY_AFTER_MS = 5000
+
+# Maximum length of the body of an event made of several messages, so merged messages
+# stay well below the size limit of Matrix events.
+MAX_MERGED_BODY_LENGTH = 16384
+
+# The only keys the contents of messages merged together can have.
+MERGEABLE_KEYS = {"body", "msgtype", "format", "formatted_body"}
+
+
+def _formatted_body(content: dict) -> str:
+    if content.get("format") == MsgFormat.CUSTOM_HTML:
+        return content["formatted_body"]
+
+    return "<p>%s</p>" % html.escape(content["body"]).replace("\n", "<br />")
+
+
+def _merge(contents: List[dict]) -> dict:
+    merged = {
+        "body": "\n\n".join(content["body"] for content in contents),
+        "msgtype": contents[0]["msgtype"],
+    }
+
+    if any(content.get("format") == MsgFormat.CUSTOM_HTML for content in contents):
+        merged["format"] = MsgFormat.CUSTOM_HTML
+        merged["formatted_body"] = "\n".join(
+            _formatted_body(content) for content in contents
+        )
+
+    return merged
+
+
+def _is_mergeable(content: dict) -> bool:
+    return (
+        set(content.keys()) <= MERGEABLE_KEYS
+        and isinstance(content.get("body"), str)
+        and "msgtype" in content
+    )
+
+
+def _can_merge(group: List[dict], content: dict) -> bool:
+    return (
+        _is_mergeable(group[0])
+        and _is_mergeable(content)
+        and group[0]["msgtype"] == content["msgtype"]
+        and sum(len(c["body"]) for c in group) + len(content["body"])
+        <= MAX_MERGED_BODY_LENGTH
+    )
+
+
+def merge_contents(contents: List[dict]) -> List[dict]:
+    """Merge consecutive messages into as few events as possible.
+
+    Only plain messages of the same type are merged, and only as long as the merged body
+    doesn't get too long.
+
+    Args:
+        contents: The contents of the messages to send, in order.
+
+    Returns:
+        The contents of the events to send, in order.
+    """
+    groups = []  # type: List[List[dict]]
+    for content in contents:
+        if groups and _can_merge(groups[-1], content):
+            groups[-1].append(content)
+        else:
+            groups.append([content])
+
+    return [_merge(group) if len(group) > 1 else group[0] for group in groups]
+
+
+class MessageSender:
+    """Sends the bot's messages from a queue per room.
+
+    Messages to a room are sent in the order they were queued, one request at a time.
+    Messages queued while a previous one is being sent are merged into a single event
+    where possible. Rate limited requests are retried once the homeserver allows it.
+
+    Args:
+        nio_client: The client to send messages with.
+        typing_delay: Number of seconds a command needs to run for before the bot is
+            shown as typing.
+    """
+    def __init__(self, nio_client: AsyncClient, typing_delay: float = 1.0):
+        self.nio_client = nio_client
+        self.typing_delay = typing_delay
+
+        # Messages waiting to be sent to each room.
+        self._queues = {}  # type: Dict[str, List[dict]]
+        # The task sending the queued messages of each room, if any.
+        self._senders = {}  # type: Dict[str, asyncio.Future]
+
+        self.queued_messages = 0
+        self.sent_events = 0
+        self.failed_events = 0
+        self.rate_limited = 0
+        self.typing_notifications = 0
+
+    def send(self, room_id: str, content: dict):
+        """Queue a message to send to a room. Errors are logged.
+
+        Args:
+            room_id: The room to send the message to.
+            content: The content of the m.room.message event.
+        """
+        self.queued_messages += 1
+        self._queues.setdefault(room_id, []).append(content)
+
+        if room_id not in self._senders:
+            self._senders[room_id] = asyncio.ensure_future(self._send_queued(room_id))
+
+    async def flush(self):
+        """Wait for all of the queued messages to be sent."""
+        while self._senders:
+            await asyncio.gather(*self._senders.values(), return_exceptions=True)
+
+    @asynccontextmanager
+    async def typing(self, room_id: str) -> AsyncIterator[None]:
+        """Show the bot as typing in a room while the block runs, if it runs for longer
+        than typing_delay seconds.
+        """
+        started = asyncio.Event()
+
+        async def start_typing():
+            await asyncio.sleep(self.typing_delay)
+            started.set()
+            await self._set_typing(room_id, True)
+
+        task = asyncio.ensure_future(start_typing())
+        try:
+            yield
+        finally:
+            task.cancel()
+            if started.is_set():
+                await self._set_typing(room_id, False)
+
+    async def _set_typing(self, room_id: str, typing_state: bool):
+        self.typing_notifications += 1
+        try:
+            await self.nio_client.room_typing(room_id, typing_state=typing_state)
+        except Exception:
+            # Not worth failing a command for.
+            logger.warning(f"Failed to update typing state in {room_id}", exc_info=True)
+
+    async def _send_queued(self, room_id: str):
+        try:
+            # Messages queued while sending are picked up on the next iteration.
+            while self._queues.get(room_id):
+                contents = self._queues.pop(room_id)
+                for content in merge_contents(contents):
+                    await self._send_event(room_id, content)
+        finally:
+            del self._senders[room_id]
+
+    async def _send_event(self, room_id: str, content: dict):
+        for attempt in range(MAX_RETRIES + 1):
+            try:
+                res = await self.nio_client.room_send(
+                    room_id, "m.room.message", content, ignore_unverified_devices=True,
+                )
+            except Exception:
+                self.failed_events += 1
+                logger.exception(f"Failed to send message to {room_id}")
+                return
+
+            if not isinstance(res, RoomSendError):
+                self.sent_events += 1
+                return
+
+            if res.status_code != "M_LIMIT_EXCEEDED" or attempt == MAX_RETRIES:
+                break
+
+            self.rate_limited += 1
+            retry_after_ms = res.retry_after_ms or DEFAULT_RETRY_AFTER_MS
+            logger.warning(
+                f"Rate limited when sending message to {room_id}, retrying in"
+                f" {retry_after_ms}ms"
+            )
+            await asyncio.sleep(retry_after_ms / 1000)
+
+        self.failed_events += 1
+        logger.error(f"Failed to send message to {room_id}: {res}")
@@ -0,0 +1,155 @@
+from typing import Any, Dict, List, NamedTuple, Optional, Tuple
+
+from matrix_monzo.utils.matcher import TermMatcher
+
+# The search term matching the user's account if they have only one, so we can match
+# "my account", "current account", etc.
+GENERIC_ACCOUNT_TERM = "account"
+
+
+class PotsSnapshot:
+    """The pots of an account, as retrieved from the Monzo API.
+
+    Args:
+        raw: The response to the pots listing request.
+    """
+    def __init__(self, raw: dict):
+        self.raw = raw
+
+        # Map the names of the non-deleted pots to their IDs. Case fold the pots' names
+        # so we don't run into issues because of the case.
+        self.pots = {}  # type: Dict[str, str]
+        for pot in raw["pots"]:
+            if pot["deleted"]:
+                continue
+
+            self.pots[pot["name"].casefold()] = pot["id"]
+
+
+class AccountsSnapshot:
+    """The accounts of a user, as retrieved from the Monzo API.
+
+    Args:
+        raw: The response to the accounts listing request.
+    """
+    def __init__(self, raw: dict):
+        self.raw = raw
+
+        # Map the open accounts' search terms to their ID. Currently, the search terms
+        # are the names of the account's owners.
+        self.accounts = {}  # type: Dict[Tuple, str]
+        for account in raw["accounts"]:
+            if account["closed"]:
+                continue
+
+            owners_names = []
+            for owner in account["owners"]:
+                owners_names.append(owner["preferred_name"])
+
+            self.accounts[tuple(owners_names)] = account["id"]
+
+        # The last search index built, along with the pots snapshot it was built for.
+        self._search_index = None  # type: Optional[Tuple[Optional[PotsSnapshot], Any]]
+
+    def search_index(self, pots: Optional[PotsSnapshot] = None) -> "SearchIndex":
+        """Return an index to search for these accounts and the given pots, building it
+        only if it hasn't already been built for the same snapshots.
+        """
+        if self._search_index is None or self._search_index[0] is not pots:
+            self._search_index = (pots, SearchIndex(self, pots))
+
+        return self._search_index[1]
+
+
+class SearchHit(NamedTuple):
+    id: str
+    index: int
+    # Whether the pot or account was mentioned by its ID rather than its name.
+    exact: bool
+
+
+class SearchResult(NamedTuple):
+    # The pots matching the search, at most one hit per pot.
+    pots: List[SearchHit]
+    # The accounts matching the search, one hit per distinct position at which an
+    # account is mentioned.
+    accounts: List[SearchHit]
+
+
+class SearchIndex:
+    """Finds mentions of pots and accounts (by name or ID) in a string in a single pass.
+
+    Pot names and accounts owners' names only match whole words, whereas IDs match
+    anywhere.
+    """
+    def __init__(self, accounts: AccountsSnapshot, pots: Optional[PotsSnapshot] = None):
+        self._pots = pots.pots if pots else {}
+        self._accounts = dict(accounts.accounts)
+
+        # If there's only one account, then we can add "account" as the search term
+        # matching this account's ID, unless it clashes with the name of a pot.
+        if len(self._accounts) == 1 and not any(
+            GENERIC_ACCOUNT_TERM in name for name in self._pots.keys()
+        ):
+            account_id = list(self._accounts.values())[0]
+            self._accounts[(GENERIC_ACCOUNT_TERM,)] = account_id
+
+        # Map each search term to whether it must be matched as a whole word, and to
+        # the pots and accounts it identifies, so that building the search results
+        # only costs as much as the number of terms found.
+        terms = {}  # type: Dict[str, bool]
+        self._pots_by_name = {}  # type: Dict[str, str]
+        self._pots_by_id = {}  # type: Dict[str, str]
+        self._accounts_by_name = {}  # type: Dict[str, List[str]]
+        self._accounts_by_id = {}  # type: Dict[str, Tuple[str, List[str]]]
+
+        for name, pot_id in self._pots.items():
+            terms[name] = True
+            terms.setdefault(pot_id.casefold(), False)
+            self._pots_by_name[name] = pot_id
+            self._pots_by_id[pot_id.casefold()] = pot_id
+
+        for search_params, account_id in self._accounts.items():
+            names = [term.casefold() for term in search_params]
+            for name in names:
+                terms[name] = True
+                self._accounts_by_name.setdefault(name, []).append(account_id)
+
+            terms.setdefault(account_id.casefold(), False)
+            self._accounts_by_id.setdefault(account_id.casefold(), (account_id, []))
+            self._accounts_by_id[account_id.casefold()][1].extend(names)
+
+        self._matcher = TermMatcher(terms)
+
+    def search(self, s: str) -> SearchResult:
+        indexes = self._matcher.first_indexes(s)
+
+        # A pot matches if either its name or its ID is mentioned, its name taking
+        # precedence.
+        pots = {}  # type: Dict[str, SearchHit]
+        for term, index in indexes.items():
+            if term in self._pots_by_name:
+                pot_id = self._pots_by_name[term]
+                pots[pot_id] = SearchHit(pot_id, index, exact=False)
+        for term, index in indexes.items():
+            if term in self._pots_by_id:
+                pot_id = self._pots_by_id[term]
+                pots.setdefault(pot_id, SearchHit(pot_id, index, exact=True))
+
+        # An account matches once for each of its search terms that is mentioned, and
+        # once for each of the ones that aren't if its ID is mentioned. We can easily
+        # have duplicated entries if using a list, e.g. if there's only one account (so
+        # we inject the "account" search term) and the user uses the account's ID we'll
+        # end up with two matches for the same account ID.
+        accounts = set()
+        for term, index in indexes.items():
+            for account_id in self._accounts_by_name.get(term, []):
+                accounts.add(SearchHit(account_id, index, exact=False))
+
+            if term in self._accounts_by_id:
+                account_id, names = self._accounts_by_id[term]
+                if any(name not in indexes for name in names):
+                    accounts.add(SearchHit(account_id, index, exact=True))
+
+        return SearchResult(pots=list(pots.values()), accounts=list(accounts))
+
@@ -0,0 +1,71 @@
+from datetime import date, timedelta
+from typing import Dict, Iterable, List, Tuple
+
+WEEK = "week"
+MONTH = "month"
+
+
+def period_start(day: date, period: str) -> date:
+    """Return the first day of the week (starting on Monday) or month the given day
+    is in.
+    """
+    if period == WEEK:
+        return day - timedelta(days=day.weekday())
+
+    return day.replace(day=1)
+
+
+def shift_period_start(start: date, periods: int, period: str) -> date:
+    """Return the first day of the period the given number of periods after the one
+    starting on the given day. The number of periods can be negative.
+    """
+    if period == WEEK:
+        return start + timedelta(weeks=periods)
+
+    months = start.year * 12 + start.month - 1 + periods
+    return date(months // 12, months % 12 + 1, 1)
+
+
+def bucket_daily_totals(
+    daily_totals: Iterable[Tuple[str, int]], period: str, first: date, last: date,
+) -> List[Tuple[date, int]]:
+    """Sum daily totals per week or month.
+
+    Args:
+        daily_totals: (date as YYYY-MM-DD, total) tuples, at most one per day.
+        period: The length of the buckets, either WEEK or MONTH.
+        first: The first day of the first bucket.
+        last: A day in the last bucket.
+
+    Returns:
+        A (first day of the period, total) tuple per period between first and last,
+        oldest first, including the periods without any total.
+    """
+    buckets = {}  # type: Dict[date, int]
+    start = first
+    while start <= last:
+        buckets[start] = 0
+        start = shift_period_start(start, 1, period)
+
+    for day, total in daily_totals:
+        start = period_start(date.fromisoformat(day), period)
+        if start in buckets:
+            buckets[start] += total
+
+    return list(buckets.items())
+
+
+def rolling_averages(values: List[int], window: int) -> List[float]:
+    """Compute the average of each value and the window - 1 ones preceding it. The
+    first values are averaged with as many preceding values as there are.
+    """
+    averages = []
+    total = 0
+    for i, value in enumerate(values):
+        total += value
+        if i >= window:
+            total -= values[i - window]
+
+        averages.append(total / min(i + 1, window))
+
+    return averages
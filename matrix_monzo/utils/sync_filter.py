@@ -0,0 +1,175 @@
+import hashlib
+import json
+import logging
+import os
+from typing import Any, Dict, List, Optional, Union
+
+from nio import (
+    AsyncClient,
+    InviteMemberEvent,
+    MegolmEvent,
+    RedactionEvent,
+    RoomMemberEvent,
+    RoomMessage,
+    UploadFilterResponse,
+)
+
+logger = logging.getLogger(__name__)
+
+# The Matrix event types behind nio's event classes, for the classes the bot might
+# register callbacks for. Subclasses map to the type of their closest parent here, e.g.
+# RoomMessageText to m.room.message.
+EVENT_TYPES = {
+    RoomMessage: "m.room.message",
+    RoomMemberEvent: "m.room.member",
+    InviteMemberEvent: "m.room.member",
+    RedactionEvent: "m.room.redaction",
+    MegolmEvent: "m.room.encrypted",
+}
+
+# Event types that must always be synced: encrypted events are only turned into the
+# event classes callbacks are registered for once they've been decrypted, and nio needs
+# to know which rooms are encrypted and who's in them to send messages there.
+TIMELINE_EVENT_TYPES = ["m.room.encrypted"]
+STATE_EVENT_TYPES = ["m.room.create", "m.room.encryption", "m.room.member"]
+
+# Filters matching no event at all.
+NO_EVENTS = {"not_types": ["*"]}
+
+# Name of the file in the store directory mapping the filters uploaded to the
+# homeserver to their ID.
+FILTERS_FILE = "sync_filters.json"
+
+
+def _callback_event_types(nio_client: AsyncClient) -> Optional[List[str]]:
+    """Return the types of the events the client's callbacks are registered for, or None
+    if at least one of them is registered for events we don't know the type of.
+    """
+    types = set()
+    for callback in nio_client.event_callbacks:
+        if callback.filter is None:
+            # The callback is called for every event.
+            return None
+
+        classes = callback.filter if isinstance(callback.filter, tuple) else (
+            callback.filter,
+        )
+        for cls in classes:
+            event_type = next(
+                (t for base, t in EVENT_TYPES.items() if issubclass(cls, base)), None,
+            )
+            if event_type is None:
+                return None
+
+            types.add(event_type)
+
+    return sorted(types)
+
+
+def build_sync_filter(
+    nio_client: AsyncClient, timeline_limit: int, lazy_load_members: bool,
+) -> Dict[str, Any]:
+    """Build a sync filter only letting through what the client has callbacks for.
+
+    Presence, account data and ephemeral events are left out, unless callbacks are
+    registered for them.
+
+    Args:
+        nio_client: The client whose callbacks to build the filter from. Must be called
+            after all of the callbacks have been registered.
+        timeline_limit: Maximum number of events in the timeline of each room.
+        lazy_load_members: Whether to only sync the members of a room that sent the
+            events being synced, rather than all of them.
+
+    Returns:
+        The filter definition, as described in the Matrix specification.
+    """
+    timeline = {
+        "limit": timeline_limit,
+        "lazy_load_members": lazy_load_members,
+    }  # type: Dict[str, Any]
+    state = {"lazy_load_members": lazy_load_members}  # type: Dict[str, Any]
+
+    types = _callback_event_types(nio_client)
+    if types is not None:
+        timeline["types"] = sorted(set(types + TIMELINE_EVENT_TYPES))
+        state["types"] = sorted(set(types + STATE_EVENT_TYPES))
+
+    room = {
+        "timeline": timeline,
+        "state": state,
+        "account_data": NO_EVENTS,
+    }  # type: Dict[str, Any]
+    if not nio_client.ephemeral_callbacks:
+        room["ephemeral"] = NO_EVENTS
+
+    sync_filter = {"room": room}  # type: Dict[str, Any]
+    if not nio_client.presence_callbacks:
+        sync_filter["presence"] = NO_EVENTS
+    if not nio_client.global_account_data_callbacks:
+        sync_filter["account_data"] = NO_EVENTS
+
+    return sync_filter
+
+
+def _filter_key(user_id: str, sync_filter: Dict[str, Any]) -> str:
+    definition = json.dumps(sync_filter, sort_keys=True)
+    return hashlib.sha256(f"{user_id}\n{definition}".encode("utf-8")).hexdigest()
+
+
+def _load_filter_ids(path: str) -> Dict[str, str]:
+    try:
+        with open(path) as f:
+            return json.load(f)
+    except FileNotFoundError:
+        return {}
+    except (OSError, ValueError):
+        logger.warning(f"Ignoring unreadable sync filters file {path}", exc_info=True)
+        return {}
+
+
+async def get_sync_filter_id(
+    nio_client: AsyncClient, sync_filter: Dict[str, Any], store_path: str,
+) -> Union[str, Dict[str, Any]]:
+    """Upload the given filter to the homeserver, unless it's been uploaded already, and
+    return its ID.
+
+    The ID of each filter uploaded is remembered in the store directory, so the same
+    filter isn't uploaded again on each startup.
+
+    Args:
+        nio_client: The logged in client to upload the filter with.
+        sync_filter: The filter definition.
+        store_path: The directory to remember the filter's ID in.
+
+    Returns:
+        The filter's ID, or the filter definition itself if it couldn't be uploaded,
+        which syncs accept too.
+    """
+    path = os.path.join(store_path, FILTERS_FILE)
+    key = _filter_key(nio_client.user_id, sync_filter)
+
+    filter_ids = _load_filter_ids(path)
+    if key in filter_ids:
+        return filter_ids[key]
+
+    res = await nio_client.upload_filter(
+        presence=sync_filter.get("presence"),
+        account_data=sync_filter.get("account_data"),
+        room=sync_filter.get("room"),
+    )
+    if not isinstance(res, UploadFilterResponse):
+        logger.warning(f"Failed to upload the sync filter ({res}), sending it in full")
+        return sync_filter
+
+    filter_ids[key] = res.filter_id
+    try:
+        with open(path, "w") as f:
+            json.dump(filter_ids, f)
+    except OSError:
+        logger.warning(f"Failed to save the sync filter's ID to {path}", exc_info=True)
+
+    logger.info(f"Uploaded sync filter {res.filter_id}")
+
+    return res.filter_id
+
@@ -0,0 +1,128 @@
+import logging
+from datetime import datetime, timedelta, timezone
+from typing import AsyncIterator, List, Optional
+
+from matrix_monzo.monzo_api import MonzoClient
+from matrix_monzo.storage.stores.transactions import TransactionsStore
+
+logger = logging.getLogger(__name__)
+
+# Maximum number of transactions the Monzo API returns in a single page.
+PAGE_SIZE = 100
+
+# Number of transactions written to the database in a single transaction.
+BATCH_SIZE = 1000
+
+# Monzo only lets apps retrieve transactions older than 90 days in the few minutes
+# following the user's login, so the first sync of an account starts a bit later.
+INITIAL_SYNC_DAYS = 89
+
+# Transactions keep changing after they're first retrieved, e.g. when they settle or get
+# declined, so each sync retrieves again the ones created in the last few days before
+# the previous sync's last transaction.
+REFETCH_DAYS = 3
+
+
+async def fetch_pages(
+    client: MonzoClient, account_id: str, since: Optional[str],
+) -> AsyncIterator[List[dict]]:
+    """Retrieve the transactions of an account that happened after the given cursor, one
+    page at a time, oldest first.
+
+    Args:
+        client: The client to use to talk to the Monzo API.
+        account_id: The account to retrieve the transactions of.
+        since: The ID of the last transaction already retrieved, or an RFC 3339
+            timestamp to start from.
+    """
+    while True:
+        res = await client.get_transactions(account_id, since=since, limit=PAGE_SIZE)
+
+        page = res["transactions"]
+        if page:
+            yield page
+
+        if len(page) < PAGE_SIZE:
+            return
+
+        since = page[-1]["id"]
+
+
+async def batch_pages(
+    pages: AsyncIterator[List[dict]], batch_size: int,
+) -> AsyncIterator[List[dict]]:
+    """Group pages of transactions into batches of at least batch_size transactions,
+    except for the last one.
+    """
+    batch = []  # type: List[dict]
+    async for page in pages:
+        batch.extend(page)
+
+        if len(batch) >= batch_size:
+            yield batch
+            batch = []
+
+    if batch:
+        yield batch
+
+
+class TransactionsSyncer:
+    """Copies the transactions of Monzo accounts into the local ledger.
+
+    Each account is synced from a few days (REFETCH_DAYS) before the last transaction
+    the syncer has stored for it, so only the transactions that happened since the
+    previous sync, or that may have changed since, are retrieved.
+
+    Args:
+        store: The store holding the ledger.
+        batch_size: Number of transactions to write in a single database transaction.
+        initial_sync_days: How many days of history to retrieve for an account that's
+            never been synced.
+    """
+    def __init__(
+        self,
+        store: TransactionsStore,
+        batch_size: int = BATCH_SIZE,
+        initial_sync_days: int = INITIAL_SYNC_DAYS,
+    ):
+        self.store = store
+        self.batch_size = batch_size
+        self.initial_sync_days = initial_sync_days
+
+    async def sync_account(self, client: MonzoClient, account_id: str) -> int:
+        """Retrieve and store the transactions of the given account that aren't in the
+        ledger yet, and update the recent ones that are.
+
+        Args:
+            client: The client of a user with access to the account.
+            account_id: The account to sync.
+
+        Returns:
+            The number of transactions stored or updated.
+        """
+        start = datetime.now(timezone.utc) - timedelta(days=self.initial_sync_days)
+
+        last_created = await self.store.get_sync_cursor(account_id)
+        if last_created is not None:
+            # Only keep the seconds, since Monzo doesn't always include milliseconds.
+            last = datetime.strptime(last_created[:19], "%Y-%m-%dT%H:%M:%S")
+            last = last.replace(tzinfo=timezone.utc)
+            start = max(start, last - timedelta(days=REFETCH_DAYS))
+
+        since = start.strftime("%Y-%m-%dT%H:%M:%SZ")
+
+        count = 0
+        pages = fetch_pages(client, account_id, since)
+        async for batch in batch_pages(pages, self.batch_size):
+            # Move the cursor along with each batch, so an interrupted sync resumes from
+            # the last batch written.
+            count += await self.store.add_transactions(
+                account_id, batch, update_sync_cursor=True,
+            )
+
+        if count:
+            logger.info(
+                f"Stored {count} new or updated transactions for account {account_id}"
+            )
+
+        return count
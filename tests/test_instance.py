@@ -0,0 +1,80 @@
+import asyncio
+import os
+import tempfile
+
+import yaml
+
+from matrix_monzo.config import Config
+from matrix_monzo.utils.instance import Instance
+
+MAX_CLIENTS = 2
+OWNERS = [f"@owner{i}:example.com" for i in range(MAX_CLIENTS * 3)]
+
+
+def make_instance(tmp_dir: str) -> Instance:
+    path = os.path.join(tmp_dir, "config.yaml")
+    with open(path, "w") as f:
+        yaml.dump({
+            "matrix": {
+                "user_id": "@bot:example.com",
+                "password": "password",
+                "device_id": "TEST",
+                "homeserver_url": "http://127.0.0.1:1",
+                "owner_ids": OWNERS,
+                "store_path": tmp_dir,
+            },
+            "monzo": {"max_clients": MAX_CLIENTS},
+            "database": {"engine": "sqlite", "path": os.path.join(tmp_dir, "test.db")},
+            "http": {
+                "bind_address": "127.0.0.1",
+                "port": 8080,
+                "public_baseurl": "http://127.0.0.1:8080",
+            },
+            "logging": {"level": "ERROR", "console_logging": {"enabled": False}},
+        }, f)
+
+    return Instance(Config(path))
+
+
+async def sync_more_owners_than_clients(tmp_dir: str):
+    instance = make_instance(tmp_dir)
+    await instance.setup()
+
+    synced = []
+
+    async def sync_account(client, account_id):
+        synced.append(account_id)
+        return 0
+
+    instance.transactions_syncer.sync_account = sync_account
+
+    for i, user_id in enumerate(OWNERS):
+        await instance.storage.token_store.store_token(
+            user_id, {"access_token": f"token{i}", "refresh_token": f"refresh{i}"},
+        )
+        await instance.storage.selected_account_store.set_selected_account(
+            user_id, f"acc_{i}",
+        )
+
+    # The users actively using the bot, with their clients pooled and snapshots cached.
+    active = OWNERS[:MAX_CLIENTS]
+    for user_id in active:
+        await instance.get_monzo_client(user_id)
+        snapshots = instance.monzo_snapshots
+        snapshots.set(user_id, "pots", "snapshot", snapshots.generation(user_id))
+
+    for user_id in OWNERS:
+        await instance.sync_monzo_transactions(user_id)
+
+    try:
+        assert synced == [f"acc_{i}" for i in range(len(OWNERS))]
+        assert list(instance.monzo_clients._clients) == active
+        for user_id in active:
+            assert instance.monzo_snapshots.get(user_id, "pots") == "snapshot"
+    finally:
+        await instance.close()
+
+
+def test_sync_does_not_evict_active_users():
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        asyncio.run(sync_more_owners_than_clients(tmp_dir))
@@ -0,0 +1,39 @@
+from matrix_monzo.utils.router import CommandRouter
+
+
+def make_router() -> CommandRouter:
+    router = CommandRouter()
+    router.add("show", ("show", None), skip_words=["my", "of"])
+    for sub_command in ["accounts", "account", "all accounts", "pots", "pot"]:
+        router.add(f"show {sub_command}", ("show", sub_command))
+    router.add("move", ("move", None))
+    return router
+
+
+def resolve(router: CommandRouter, body: str):
+    route = router.resolve(body)
+    return route.value if route is not None else None
+
+
+def test_words():
+    router = make_router()
+
+    assert resolve(router, "show pots") == ("show", "pots")
+    assert resolve(router, "show my pots") == ("show", "pots")
+    assert resolve(router, "show account current") == ("show", "account")
+    assert resolve(router, "show all accounts") == ("show", "all accounts")
+    assert resolve(router, "move 10 GBP from savings to holidays") == ("move", None)
+    assert resolve(router, "show") == ("show", None)
+    assert resolve(router, "unknown command") is None
+
+
+def test_words_without_spaces():
+    router = make_router()
+
+    assert resolve(router, "showpots") == ("show", "pots")
+    assert resolve(router, "showmy pots") == ("show", "pots")
+    assert resolve(router, "showaccounts") == ("show", "accounts")
+    assert resolve(router, "showpot holidays") == ("show", "pot")
+    assert resolve(router, "show potsnow") == ("show", "pots")
+    assert resolve(router, "move10 GBP") == ("move", None)
+    assert resolve(router, "unknowncommand") is None
@@ -0,0 +1,72 @@
+import asyncio
+import json
+from types import SimpleNamespace
+from typing import List
+
+from aiohttp import web
+from aiohttp.test_utils import TestClient, TestServer
+
+from matrix_monzo.http.handlers.webhook import WebhookHandler
+
+SECRET = "s3cret"
+
+TRANSACTION = {
+    "id": "tx_1",
+    "account_id": "acc_1",
+    "created": "2020-05-17T13:45:12.345Z",
+    "amount": -500,
+    "currency": "GBP",
+}
+
+
+class FakeInstance:
+    def __init__(self):
+        self.config = SimpleNamespace(http_webhook_secret=SECRET)
+        self.transactions = []  # type: List[dict]
+
+    async def handle_monzo_transaction(self, transaction: dict):
+        self.transactions.append(transaction)
+
+
+async def post_webhooks(requests: List[tuple]) -> tuple:
+    """Send the given (path, body) webhooks, and return the status of each response
+    and the transactions handled.
+    """
+    instance = FakeInstance()
+    app = web.Application()
+    app.router.add_post("/webhook/{secret}", WebhookHandler(instance).handler)
+
+    statuses = []
+    async with TestClient(TestServer(app)) as client:
+        for path, body in requests:
+            async with client.post(path, data=body) as res:
+                statuses.append(res.status)
+
+    return statuses, instance.transactions
+
+
+def test_secret():
+    body = json.dumps({"type": "transaction.created", "data": TRANSACTION})
+    statuses, transactions = asyncio.run(post_webhooks([
+        (f"/webhook/{SECRET}", body),
+        ("/webhook/wrong", body),
+        # Non-ASCII characters, percent-encoded.
+        ("/webhook/%C3%A9%E2%82%AC", body),
+    ]))
+
+    assert statuses == [200, 404, 404]
+    assert transactions == [TRANSACTION]
+
+
+def test_malformed_payloads():
+    path = f"/webhook/{SECRET}"
+    statuses, transactions = asyncio.run(post_webhooks([
+        (path, "not json"),
+        (path, "[]"),
+        (path, json.dumps({"type": "transaction.created"})),
+        (path, json.dumps({"type": "transaction.created", "data": {"id": "tx_1"}})),
+        (path, json.dumps({"type": "something.else"})),
+    ]))
+
+    assert statuses == [400, 400, 400, 400, 200]
+    assert transactions == []